@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+"""Замеры производительности на синтетических профилях.
+
+    python bench.py schema     # старая схема (TEXT + strftime) против миграции с day_num
+    python bench.py replica --share-dir DIR   # работа с базой на шаре против локальной копии
+    python bench.py render     # обновления сетки: кнопки против холста
+    python bench.py pay        # целочисленный расчёт оплаты против Decimal (сверка - tests/test_calculations.py)
+    python bench.py batch      # пакетный расчёт периода против поштучного (сверка - tests/test_payroll.py)
+    python bench.py reprice    # пересчёт сохранённых смен после смены оклада
+    python bench.py navigate   # переходы по месяцам: сколько рисуется из памяти
+    python bench.py tooltip    # окна и запросы при проходе мышью по сетке
+    python bench.py year       # обзор года: агрегаты против load_shift на каждый день
+    python bench.py settings   # запросы и коммиты при чтении и записи настроек профиля
+    python bench.py registry   # обращения к каталогу профилей при открытии выбора профиля
+    python bench.py switch     # переключение профилей в одном окне: первый вход и возврат
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from salary_calendar import calculations, database, payroll
+from salary_calendar.constants import cents_to_money, format_cents
+from salary_calendar.replica import LocalReplica
+
+LEGACY_SCHEMA = """CREATE TABLE shifts (
+    day TEXT PRIMARY KEY, activation TEXT, end TEXT, duration_min INTEGER, undertime_min INTEGER,
+    overtime_min INTEGER, day_pay_cents INTEGER, overtime_pay_cents INTEGER, notes TEXT)"""
+
+def synthetic_rows(years=10, start=date(2016, 1, 1), seed=1):
+    """Рабочие дни за years лет: обычные смены, недоработки и неоплаченные переработки."""
+    rnd = random.Random(seed); d = start; end = date(start.year + years, 1, 1)
+    while d < end:
+        if d.weekday() < 5:
+            duration = rnd.choice([540, 540, 540, 480, 600, 660])
+            undertime = max(0, 540 - duration); overtime = max(0, duration - 540)
+            ot_pay = 0 if overtime and rnd.random() < 0.5 else overtime * 9
+            yield (d.isoformat(), "08:00", "17:00", duration, undertime, overtime, 412400, ot_pay, "")
+        d += timedelta(days=1)
+
+def make_legacy_db(path, years=10):
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany("INSERT INTO shifts VALUES(?,?,?,?,?,?,?,?,?)", synthetic_rows(years))
+    conn.commit()
+    return conn
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); dt = time.perf_counter() - t0
+        best = dt if best is None or dt < best else best
+    return best * 1000
+
+def bench_schema(args):
+    months = [(y, m) for y in range(2016, 2016 + args.years) for m in range(1, 13)]
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = make_legacy_db(os.path.join(tmp, "profile.db"), args.years)
+        rows = conn.execute("SELECT COUNT(*) FROM shifts").fetchone()[0]
+        print(f"synthetic profile: {args.years} years, {rows} shifts")
+
+        def legacy_pending():
+            for y, m in months:
+                conn.execute("""SELECT day, overtime_min FROM shifts WHERE overtime_min > 0
+                                AND (overtime_pay_cents IS NULL OR overtime_pay_cents = 0)
+                                AND strftime('%Y', day) = ? AND strftime('%m', day) = ? ORDER BY day""",
+                             (str(y), f"{m:02d}")).fetchall()
+        def legacy_salary():
+            for y, m in months:
+                rows = conn.execute("SELECT * FROM shifts WHERE day BETWEEN ? AND ? ORDER BY day",
+                                    (date(y, m, 1).isoformat(), date(y, m, 15).isoformat())).fetchall()
+                sum((s[6] or 0) + (s[7] or 0) for s in rows)
+        t_legacy_pending = timed(legacy_pending); t_legacy_salary = timed(legacy_salary)
+
+        t0 = time.perf_counter(); applied = database.migrate(conn); t_migrate = (time.perf_counter() - t0) * 1000
+        print(f"migration {applied}: {t_migrate:.1f} ms")
+
+        def new_pending():
+            for y, m in months: database.find_pending_overtimes(conn, y, m)
+        def new_salary():
+            for y, m in months: database.sum_pay_between(conn, date(y, m, 1).isoformat(), date(y, m, 15).isoformat())
+        def aggregate_panel():
+            # обе зарплаты и переработка месяца одним чтением pay_periods
+            for y, m in months: database.load_pay_periods(conn, (y - 1, 12) if m == 1 else (y, m - 1), (y, m))
+        t_new_pending = timed(new_pending); t_new_salary = timed(new_salary); t_aggregate = timed(aggregate_panel)
+        n = len(months)
+        print(f"find_pending_overtimes x{n}: strftime {t_legacy_pending:.1f} ms -> day_num {t_new_pending:.1f} ms")
+        print(f"half-month salary x{n}:     SELECT * {t_legacy_salary:.1f} ms -> covering index {t_new_salary:.1f} ms")
+        print(f"salary panel x{n} (2 salaries + pending): {2 * t_new_salary + t_new_pending:.1f} ms -> pay_periods {t_aggregate:.1f} ms")
+        conn.close()
+
+def bench_replica(args):
+    """Задержка операций интерфейса: база в share_dir против локальной копии.
+
+    Вместо настоящей шары можно передать любой каталог (по умолчанию временный),
+    например смонтированный сетевой диск.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        share_dir = args.share_dir or os.path.join(tmp, "share")
+        os.makedirs(share_dir, exist_ok=True)
+        share_path = os.path.join(share_dir, "bench_profile.db")
+        if os.path.exists(share_path): os.remove(share_path)
+        make_legacy_db(share_path, args.years).close()
+        conn = sqlite3.connect(share_path); database.migrate(conn); conn.close()
+
+        def workload(path):
+            conn = sqlite3.connect(path)
+            def month_loads():
+                for m in range(1, 13):
+                    database.load_shifts_between(conn, date(2020, m, 1).isoformat(), date(2020, m, 28).isoformat())
+            def saves():
+                for i in range(1, 21):
+                    database.save_shift(conn, date(2030, 1, i).isoformat(), "08:00", "17:00", 540, 0, 0, 412400, 0, "")
+            result = timed(month_loads, args.repeat) / 12, timed(saves, 1) / 20
+            conn.close()
+            return result
+
+        share_read, share_write = workload(share_path)
+        replica = LocalReplica(share_path, os.path.join(tmp, "cache"))
+        t0 = time.perf_counter(); local_path = replica.open(); t_open = (time.perf_counter() - t0) * 1000
+        local_read, local_write = workload(local_path)
+        t0 = time.perf_counter(); replica.sync(); t_sync = (time.perf_counter() - t0) * 1000
+        print(f"share dir: {share_dir}")
+        print(f"month load:  share {share_read:.2f} ms -> local {local_read:.2f} ms")
+        print(f"save+commit: share {share_write:.2f} ms -> local {local_write:.2f} ms")
+        print(f"replica open (backup copy) {t_open:.1f} ms, sync back {t_sync:.1f} ms")
+        os.remove(share_path)
+
+class _StubWidget:
+    """Виджет без дисплея: только считает вызовы."""
+    def __init__(self, counter): self.counter = counter
+    def config(self, **kw): self.counter["config"] += 1
+    def grid(self): self.counter["grid"] += 1
+    def grid_remove(self): self.counter["grid"] += 1
+
+def bench_render(args):
+    import calendar
+    from types import SimpleNamespace
+    from salary_calendar.interface import CalendarApp
+    from salary_calendar.model import CalendarModel
+    from salary_calendar.profile_manager import ProfileManager
+    from salary_calendar.render import CanvasGridRenderer, GridRenderer
+    from salary_calendar.shift_cache import ShiftCache
+
+    conn = sqlite3.connect(":memory:"); database.init_db(conn)
+    conn.executemany("INSERT INTO shifts(day, activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes) VALUES(?,?,?,?,?,?,?,?,?)",
+                     synthetic_rows(1, start=date(2026, 1, 1)))
+    counter = {"config": 0, "grid": 0}
+    cells = {(r, c): _StubWidget(counter) for r in range(1, 7) for c in range(1, 8)}
+    model = CalendarModel(ShiftCache(conn), Decimal("90610.50"), 60, today=date(2026, 6, 15))
+    app = SimpleNamespace(colors=ProfileManager.default_colors(None), model=model, shifts=model.shifts,
+                          cur_year=2026, cur_month=6, cell_dates={})
+    app._month_model = lambda weeks, placeholder=False: CalendarApp._month_model(app, weeks, placeholder)
+    canvas = _StubCanvas(counter)
+    renderers = [("widgets", GridRenderer(cells, {r: _StubWidget(counter) for r in range(1, 7)})),
+                 ("canvas", CanvasGridRenderer(canvas, app.colors["header_bg"]))]
+    renderers[1][1].resize(1134, 560)
+    print(f"widgets: {len(cells)} buttons + {6 + 8} labels; canvas: 1 widget, {canvas.items} items")
+
+    def redraw(label):
+        weeks = calendar.Calendar().monthdatescalendar(app.cur_year, app.cur_month)
+        app.shifts.load(weeks[0][0], weeks[-1][-1])
+        line = f"{label:<28}"
+        for name, renderer in renderers:
+            app.renderer = renderer
+            before = dict(counter); t0 = time.perf_counter()
+            CalendarApp._render_grid(app, weeks)
+            ms = (time.perf_counter() - t0) * 1000
+            calls = sum(counter.values()) - sum(before.values())
+            line += f" {name}: {renderer.stats['last_updates']:>2} cells, {calls:>3} Tk calls, {ms:.2f} ms;"
+        print(line)
+
+    redraw("first draw")
+    redraw("timer tick, no changes")
+    app.shifts.save(date(2026, 6, 10), "08:00", "12:00", 240, 300, 0, 412400, 0, "")
+    redraw("one shift edited")
+    app.cur_month = 7; redraw("next month")
+    app.cur_month = 6; redraw("back to previous month")
+    for name, renderer in renderers:
+        print(f"{name}: {renderer.stats['redraws']} redraws, {renderer.stats['updates']} cell updates"
+              f" (without diffing: {renderer.stats['redraws'] * (42 + 6)})")
+    if not args.no_tk:
+        bench_render_tk()
+
+def bench_render_tk():
+    """Те же перерисовки с настоящим Tk, если есть дисплей."""
+    import calendar
+    import tkinter as tk
+    from salary_calendar.render import CanvasGridRenderer, GridRenderer
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"no display, Tk timing skipped ({e})"); return
+    colors = ["#ffffff", "#e0f0ff", "#ffe0e0", "#e0ffe0"]
+    frame = tk.Frame(root); frame.pack(fill="both", expand=True)
+    t0 = time.perf_counter()
+    buttons = {(r, c): tk.Button(frame, width=12, height=6, relief="flat") for r in range(1, 7) for c in range(1, 8)}
+    labels = {r: tk.Label(frame) for r in range(1, 7)}
+    for (r, c), b in buttons.items(): b.grid(row=r, column=c, sticky="nsew")
+    for r, l in labels.items(): l.grid(row=r, column=8, sticky="nsew")
+    root.update(); build_widgets = (time.perf_counter() - t0) * 1000
+    canvas = tk.Canvas(root, width=1134, height=560); canvas.pack()
+    t0 = time.perf_counter()
+    grid = CanvasGridRenderer(canvas, "#dddddd"); grid.resize(1134, 560)
+    root.update(); build_canvas = (time.perf_counter() - t0) * 1000
+    print(f"build: widgets {build_widgets:.1f} ms, canvas {build_canvas:.1f} ms")
+    for name, renderer in (("widgets", GridRenderer(buttons, labels)), ("canvas", grid)):
+        t0 = time.perf_counter()
+        for i in range(50):
+            cells = {(r, c): {"text": str((i + r * 7 + c) % 31 + 1), "bg": colors[(i + c) % 4], "state": "normal"}
+                     for r in range(1, 7) for c in range(1, 8)}
+            renderer.apply(cells, {r: {"text": f"{i}:00"} for r in range(1, 7)}, 5 + i % 2)
+            root.update()
+        print(f"{name}: 50 full redraws {(time.perf_counter() - t0) * 1000:.1f} ms")
+    root.destroy()
+
+class _StubCanvas:
+    """Холст без дисплея: выдаёт номера элементов и считает вызовы."""
+    def __init__(self, counter): self.counter = counter; self.items = 0
+    def _create(self, *args, **kw): self.items += 1; return self.items
+    create_rectangle = create_text = _create
+    def itemconfigure(self, item, **kw): self.counter["config"] += 1
+    def coords(self, item, *args): self.counter["grid"] += 1
+
+class _StubLabel(_StubWidget):
+    def __init__(self, counter): super().__init__(counter); self.text = ""
+    def config(self, **kw): super().config(**kw); self.text = kw.get("text", self.text)
+    def cget(self, key): return self.text
+    def delete(self, *args): pass
+    def insert(self, *args): pass
+    def current(self, *args): pass
+
+class _FakeMaster:
+    """Очередь after/after_idle без Tk; run() крутит её, пока есть готовые задачи."""
+    def __init__(self):
+        self.queue = {}; self.next_id = 0
+    def after(self, ms, fn):
+        self.next_id += 1; self.queue[self.next_id] = (time.perf_counter() + ms / 1000, fn)
+        return self.next_id
+    def after_idle(self, fn): return self.after(0, fn)
+    def title(self, text=None): self.text = text
+    def after_cancel(self, after_id): self.queue.pop(after_id, None)
+    def run(self, until=None, timeout=2.0):
+        stop = time.perf_counter() + timeout
+        while time.perf_counter() < stop and not (until and until()):
+            due = [(t, i) for i, (t, _) in self.queue.items() if t <= time.perf_counter()]
+            if not due:
+                time.sleep(0.001); continue
+            _, i = min(due)
+            _, fn = self.queue.pop(i); fn()
+
+def counting_tooltip(master):
+    """HoverTooltip без окна: вместо Toplevel счётчики, логика задержек настоящая."""
+    from salary_calendar import widgets
+    class CountingTooltip(widgets.HoverTooltip):
+        def _build(self): self.window = True
+        def _update(self, lines, with_button, background): self.lines = lines
+        def _place(self, x, y): pass
+        def _withdraw(self): pass
+    return CountingTooltip(master)
+
+def headless_app(db_path, today):
+    """CalendarApp без окна: заглушки вместо виджетов, настоящие модель, кэш и пул запросов."""
+    from salary_calendar.background import QueryExecutor
+    from salary_calendar.interface import CalendarApp
+    from salary_calendar.model import CalendarModel
+    from salary_calendar.profile_manager import ProfileManager
+    from salary_calendar.render import GridRenderer
+    from salary_calendar.shift_cache import ShiftCache
+    from collections import OrderedDict
+    counter = {"config": 0, "grid": 0}
+    app = CalendarApp.__new__(CalendarApp)
+    app.master = _FakeMaster()
+    app.conn = sqlite3.connect(db_path)
+    app.colors = ProfileManager.default_colors(None)
+    app.queries = QueryExecutor(app.master, db_path)
+    app.model = CalendarModel(ShiftCache(app.conn), Decimal("90610.50"), 60, today=today)
+    app.cur_year, app.cur_month = today.year, today.month
+    app._today_row = None; app.after_id = None
+    app._dirty = set(); app._reload_month = False; app._render_id = None
+    app._loading = {}; app._month_seqs = {}; app._info_cache = OrderedDict(); app._info_gen = 0
+    app._year_window = None; app._year_data = None; app._settings_dialog = None
+    app.tooltip = counting_tooltip(app.master)
+    app.render_stats = {"passes": 0, "invalidations": 0}
+    for name in ("lbl_month", "spin_year", "cmb_month", "lbl_salary_second_prev", "lbl_salary_first",
+                 "lbl_pending_overtime", "lbl_allocated", "lbl_expected_end", "lbl_today_earn"):
+        setattr(app, name, _StubLabel(counter))
+    cells = {(r, c): _StubWidget(counter) for r in range(1, 7) for c in range(1, 8)}
+    app.cell_dates = {}
+    app.renderer = GridRenderer(cells, {r: _StubWidget(counter) for r in range(1, 7)})
+    return app
+
+def bench_year(args):
+    from types import SimpleNamespace
+    from salary_calendar import widgets
+    from salary_calendar.model import CalendarModel, fetch_year_overview
+    from salary_calendar.shift_cache import ShiftCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profile.db")
+        make_legacy_db(path, 10).close()
+        conn = sqlite3.connect(path); database.migrate(conn)
+        model = CalendarModel(ShiftCache(conn), Decimal("90610.50"), 60)
+        year = conn.execute("SELECT MAX(substr(day, 1, 4)) FROM shifts").fetchone()[0]
+        year = int(year) - 1  # последний полный год
+        counter = {"config": 0, "grid": 0}
+        win = widgets.YearOverviewWindow.__new__(widgets.YearOverviewWindow)
+        win.canvas = _StubCanvas(counter); win.lbl_year = _StubLabel(counter); win.empty_color = "#e8e8e8"
+        win.metric = SimpleNamespace(get=lambda: "worked")
+        win.cells = {(m, d): win.canvas.create_rectangle() for m in range(1, 13) for d in range(1, 32)}
+        win.totals = {m: win.canvas.create_text() for m in range(1, 13)}
+        win.salaries = {m: win.canvas.create_text() for m in range(1, 13)}
+        statements = []
+        conn.set_trace_callback(statements.append)
+        overview = fetch_year_overview(conn, year)
+        conn.set_trace_callback(None)
+        t_fetch = timed(lambda: fetch_year_overview(conn, year))
+        t_view = timed(lambda: model.year_view(year, overview, "worked"))
+        t_show = timed(lambda: win.show(year, model.year_view(year, overview, "worked")))
+        days = [date(year, 1, 1) + timedelta(days=i) for i in range(date(year, 12, 31).timetuple().tm_yday)]
+        t_naive = timed(lambda: [database.load_shift(conn, d.isoformat()) for d in days], repeat=3)
+        rows = model.year_view(year, overview, "worked")
+        print(f"year {year}: {len(overview[0])} shifts, {len(statements)} queries")
+        print(f"aggregate queries {t_fetch:.2f} ms, heatmap model {t_view:.2f} ms,"
+              f" model + canvas update {t_show:.2f} ms")
+        print(f"load_shift per day: {len(days)} queries, {t_naive:.2f} ms")
+        print(f"salary total {sum(r.salary_cents for r in rows) / 100:.2f},"
+              f" worked {sum(r.total_min for r in rows) // 60} h")
+        conn.close()
+
+def bench_settings(args):
+    from salary_calendar.profile_manager import ProfileManager
+    from salary_calendar.settings import color_settings
+    manager = ProfileManager.__new__(ProfileManager)  # без создания каталогов на шаре
+    defaults = manager.default_colors()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profile.db")
+        conn = sqlite3.connect(path); database.init_db(conn)
+        statements = []
+        conn.set_trace_callback(statements.append)
+        count = lambda word: sum(1 for s in statements if s.lstrip().upper().startswith(word))
+
+        def load_per_key():
+            colors = {k: manager.load_setting(conn, f"color_{k}") or v for k, v in defaults.items()}
+            return colors, manager.load_setting(conn, "salary"), manager.load_setting(conn, "lunch_min")
+        def load_store():
+            store = manager.settings_store(conn)
+            return store.colors(defaults), store.get("salary"), store.get("lunch_min")
+
+        for label, save in (("per key", lambda colors: [manager.save_setting(conn, k, v) for k, v in color_settings(colors).items()]),
+                            ("store", lambda colors: manager.settings_store(conn).update(color_settings(colors)))):
+            statements.clear(); save({k: "#000001" for k in defaults})
+            saved = (count("INSERT"), count("COMMIT"))
+            statements.clear(); save(defaults)
+            print(f"save 11 colours {label:<8} {saved[0]:>2} inserts, {saved[1]:>2} commits")
+        for label, load in (("per key", load_per_key), ("store", load_store)):
+            statements.clear(); result = load()
+            queries = count("SELECT")
+            conn.set_trace_callback(None); ms = timed(lambda: [load() for _ in range(100)]); conn.set_trace_callback(statements.append)
+            print(f"load colours + pay {label:<8} {queries:>2} queries, 100 loads {ms:.2f} ms")
+        assert load_per_key() == load_store()
+        conn.close()
+
+def bench_registry(args):
+    from salary_calendar.registry import PinStore, ProfileRegistry
+    with tempfile.TemporaryDirectory() as tmp:
+        profiles_dir = os.path.join(tmp, "profiles"); os.makedirs(profiles_dir)
+        for i in range(args.profiles):
+            with open(os.path.join(profiles_dir, f"Профиль {i:04d}.db"), "wb") as f: f.write(b"\0" * 4096)
+        index = os.path.join(tmp, "profiles_index.json")
+        t_listdir = timed(lambda: [f[:-3] for f in os.listdir(profiles_dir) if f.endswith(".db")])
+        first = ProfileRegistry(profiles_dir, index)
+        t0 = time.perf_counter(); first.names(); t_scan = (time.perf_counter() - t0) * 1000
+        other = ProfileRegistry(profiles_dir, index)  # второй клиент: индекс уже на шаре
+        t0 = time.perf_counter(); names = other.names(); t_index = (time.perf_counter() - t0) * 1000
+        first.revalidate_s = 0
+        t_stat = timed(first.names)
+        first.revalidate_s = 2.0; first.invalidate(); first.names()
+        t_hit = timed(first.names)
+        assert names == first.names() and len(names) == args.profiles
+        print(f"{args.profiles} profiles: listdir every lookup {t_listdir:.2f} ms")
+        print(f"registry: first scan {t_scan:.2f} ms, second client from index {t_index:.2f} ms,"
+              f" revalidate (dir stat) {t_stat:.3f} ms, in-memory {t_hit:.4f} ms")
+        print(f"first client {first.stats}, second client {other.stats}")
+        os.remove(os.path.join(profiles_dir, "Профиль 0000.db"))
+        first.invalidate()
+        print(f"after a profile is deleted: {len(first.names())} profiles, scans {first.stats['scans']}")
+        # два клиента меняют разные пин-коды: обе правки сохраняются
+        pins_path = os.path.join(tmp, "pins.json")
+        a, b = PinStore(pins_path), PinStore(pins_path)
+        pins_a, pins_b = a.load(), b.load()
+        pins_a["Профиль 0001"] = "1111"; pins_b["Профиль 0002"] = "2222"
+        a.save(pins_a); merged = b.save(pins_b)
+        print(f"pins after two clients saved: {merged}")
+
+def bench_switch(args):
+    from salary_calendar.profile_manager import ProfileManager
+    from salary_calendar.sessions import ProfileSession, SessionPool
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ProfileManager.__new__(ProfileManager)  # без создания каталогов на шаре
+        manager.profiles_dir = tmp; manager.replica_mode = False
+        names = [f"Руководитель {i + 1}" for i in range(args.profiles)]
+        today = date.today()
+        for name in names:
+            conn = sqlite3.connect(manager.profile_path(name))
+            conn.execute(LEGACY_SCHEMA); conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+            conn.executemany("INSERT INTO shifts VALUES(?,?,?,?,?,?,?,?,?)",
+                             synthetic_rows(2, start=date(today.year - 1, 1, 1)))
+            conn.commit(); database.migrate(conn); conn.close()
+        app = headless_app(manager.profile_path(names[0]), today)
+        app.queries.close(); app.conn.close()  # вместо них - сессии профилей
+        app.manager = manager
+        app.sessions = SessionPool(lambda name: ProfileSession(manager, name, app.master), app._close_session, args.pool)
+        app.session = None
+        idle = lambda: app._render_id is None and not app.queries.active
+
+        def switch(name, label):
+            t0 = time.perf_counter()
+            if app.session is None: app._attach(app.sessions.get(name))
+            else: app.switch_profile(name)
+            t_switch = (time.perf_counter() - t0) * 1000
+            app.master.run(until=idle)
+            t_shown = (time.perf_counter() - t0) * 1000
+            print(f"{label:<34} switch {t_switch:6.2f} ms, month and salary shown {t_shown:6.2f} ms ({app.profile_name})")
+
+        for name in names:
+            switch(name, "first open")
+        for name in names[-args.pool:] * 2:
+            switch(name, "back to a pooled profile")
+        if len(names) > args.pool:
+            switch(names[0], "evicted profile, opened again")
+        print(f"pool: {app.sessions.stats}, open profiles {len(app.sessions.sessions)}")
+        app._detach(); app.sessions.close_all()
+
+def bench_navigate(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profile.db")
+        make_legacy_db(path, 10).close()
+        conn = sqlite3.connect(path); database.migrate(conn); conn.close()
+        app = headless_app(path, date(2025, 6, 15))
+        submitted = []
+        submit = app.queries.submit
+        def counting_submit(fn, *a, **kw):
+            submitted.append(kw.get("tag")); return submit(fn, *a, **kw)
+        app.queries.submit = counting_submit
+        idle = lambda: app._render_id is None and not app.queries.active
+        app._draw_calendar(); app.master.run(until=idle)
+
+        def step(label, action):
+            submitted.clear(); hits = app.shifts.stats["hits"]
+            t0 = time.perf_counter(); action(); app.master.run(until=lambda: app._render_id is None, timeout=1)
+            t_render = (time.perf_counter() - t0) * 1000
+            from_memory = app.shifts.stats["hits"] > hits and app.lbl_salary_first.text != "…"
+            foreground = [t for t in submitted if t in ("month", "info")]
+            app.master.run(until=idle)
+            print(f"{label:<22} first render {t_render:5.1f} ms, from memory: {'yes' if from_memory else 'no '},"
+                  f" blocking queries {len(foreground)}, prefetches {len(submitted) - len(foreground)}")
+
+        for _ in range(3): step("next month", app._next_month)
+        for _ in range(3): step("previous month", app._prev_month)
+        def jump():
+            app.cur_year -= 5; app._invalidate("header", "grid", "weeks", "salary")
+        step("jump 5 years back", jump)
+        step("next month", app._next_month)
+        print(f"month cache: {len(app.shifts.ranges)} ranges, {app.shifts.stats}")
+        app.queries.close(); app.conn.close()
+
+def bench_tooltip(args):
+    from types import SimpleNamespace
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profile.db")
+        make_legacy_db(path, 2).close()
+        conn = sqlite3.connect(path); database.migrate(conn); conn.close()
+        app = headless_app(path, date(2017, 6, 15))
+        app._draw_calendar(); app.master.run(until=lambda: app._render_id is None and not app.queries.active)
+        statements = []
+        app.conn.set_trace_callback(statements.append)
+        cells = sorted(rc for rc, d in app.cell_dates.items() if d)
+        for sweep_ms, dwell in ((args.cell_ms, False), (args.cell_ms, True)):
+            before = dict(app.tooltip.stats); statements.clear()
+            for rc in cells:
+                app._show_tooltip(SimpleNamespace(x_root=100, y_root=100), rc)
+                app.master.run(timeout=sweep_ms / 1000)
+                app._hide_tooltip()
+            if dwell:  # задержаться на одном дне, пока не появится подсказка
+                app._show_tooltip(SimpleNamespace(x_root=100, y_root=100), cells[10])
+                app.master.run(timeout=app.tooltip.delay_ms / 1000 + 0.1)
+                app._hide_tooltip()
+            app.master.run(timeout=app.tooltip.hide_ms / 1000 + 0.05)
+            s = {k: app.tooltip.stats[k] - before[k] for k in before}
+            label = f"sweep {len(cells)} cells at {sweep_ms} ms" + (" + dwell" if dwell else "")
+            print(f"{label:<34} windows created {s['windows']}, shown {s['shows']}, lines built {s['provided']},"
+                  f" queries {len(statements)} (per-Enter tooltip: {s['hovers']} windows, {s['hovers']} queries)")
+        app.queries.close(); app.conn.close()
+
+def bench_pay(args):
+    rng = random.Random(3)
+    sample = [(rng.randint(5000, 370000), rng.randint(0, 600), rng.random() < 0.3) for _ in range(100000)]
+    dec_sample = [(Decimal(r) / 100, m, w) for r, m, w in sample]
+    t_dec = timed(lambda: [calculations.calc_overtime_pay_minutes(m, r, w) for r, m, w in dec_sample], 3)
+    t_int = timed(lambda: [calculations.calc_overtime_pay_minutes_int(m, r, w) for r, m, w in sample], 3)
+    print(f"calc_overtime_pay_minutes x{len(sample)}: Decimal {t_dec:.1f} ms -> int {t_int:.1f} ms")
+    cents = [rng.randint(0, 2000000) for _ in range(100000)]
+    t_dec = timed(lambda: f"{sum(cents_to_money(c) for c in cents):.2f}", 3)
+    t_int = timed(lambda: format_cents(sum(cents)), 3)
+    print(f"sum of {len(cents)} amounts: cents_to_money {t_dec:.1f} ms -> int {t_int:.2f} ms")
+
+def price_one(d, duration, rates, holidays, required, lunch):
+    """То же, что CalendarApp._price_day."""
+    rate_c = rates.hourly_rate_cents(d.year, d.month)
+    if d.weekday() >= 5 or d in holidays:
+        return 0, 0, calculations.weekend_pay_for_duration_int(duration, rate_c, lunch), 0
+    return (max(0, required - duration), max(0, duration - required), calculations.day_base_pay_int(rate_c),
+            calculations.calc_overtime_pay_minutes_int(max(0, duration - required), rate_c))
+
+def bench_batch(args):
+    rnd = random.Random(5)
+    start = date(2026 - args.years, 1, 1); days = []
+    d = start
+    while d < date(2026, 1, 1):
+        days.append(d); d += timedelta(days=1)
+    durations = [rnd.choice([0, 200, 241, 480, 540, 545, 660, 725, 900]) + rnd.randint(0, 30) for _ in days]
+    holidays = {date(y, 1, m) for y in range(start.year, 2026) for m in range(1, 9)}
+    for salary, required, lunch in ((Decimal("75000.00"), 540, 60), (Decimal("123456.78"), 480, 30)):
+        rates = calculations.RateTable(holidays, salary)
+        t_one = timed(lambda: [price_one(d, m, rates, holidays, required, lunch) for d, m in zip(days, durations)], 3)
+        t_batch = timed(lambda: payroll.price_days(days, durations, rates, holidays, required, lunch), 3)
+        print(f"salary {salary}, {len(days)} days: per-day {t_one:.1f} ms -> batch {t_batch:.1f} ms")
+
+def bench_reprice(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = make_legacy_db(os.path.join(tmp, "profile.db"), args.years)
+        database.migrate(conn)
+        rows = conn.execute("SELECT COUNT(*) FROM shifts").fetchone()[0]
+        holidays = set(); since = date(2016, 1, 1).isoformat()
+        for salary, lunch in ((Decimal("75000.00"), 60), (Decimal("98000.00"), 30)):
+            rates = calculations.RateTable(holidays, salary)
+            t0 = time.perf_counter()
+            result = payroll.reprice_shifts(conn, since, rates, holidays, 480 + lunch, lunch)
+            print(f"reprice {rows} shifts ({args.years} years), salary {salary}, lunch {lunch}: "
+                  f"{result.changed} changed in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("schema", help="запросы до и после миграции схемы")
+    p.add_argument("--years", type=int, default=10)
+    p.set_defaults(func=bench_schema)
+    p = sub.add_parser("replica", help="шара против локальной копии профиля")
+    p.add_argument("--share-dir", help="каталог, изображающий шару (по умолчанию временный)")
+    p.add_argument("--years", type=int, default=10)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_replica)
+    p = sub.add_parser("render", help="обновления сетки при перерисовке: кнопки против холста")
+    p.add_argument("--no-tk", action="store_true", help="не замерять с настоящим Tk")
+    p.set_defaults(func=bench_render)
+    p = sub.add_parser("pay", help="целочисленный расчёт оплаты против Decimal")
+    p.set_defaults(func=bench_pay)
+    p = sub.add_parser("batch", help="пакетный расчёт периода против поштучного")
+    p.add_argument("--years", type=int, default=10)
+    p.set_defaults(func=bench_batch)
+    p = sub.add_parser("reprice", help="пересчёт сохранённых смен")
+    p.add_argument("--years", type=int, default=5)
+    p.set_defaults(func=bench_reprice)
+    p = sub.add_parser("navigate", help="переходы по месяцам с предзагрузкой соседних")
+    p.set_defaults(func=bench_navigate)
+    p = sub.add_parser("year", help="обзор года из агрегатов")
+    p.set_defaults(func=bench_year)
+    p = sub.add_parser("settings", help="чтение и запись настроек профиля")
+    p.set_defaults(func=bench_settings)
+    p = sub.add_parser("registry", help="реестр профилей и пин-коды")
+    p.add_argument("--profiles", type=int, default=300)
+    p.set_defaults(func=bench_registry)
+    p = sub.add_parser("switch", help="переключение профилей без пересоздания окна")
+    p.add_argument("--profiles", type=int, default=4)
+    p.add_argument("--pool", type=int, default=3)
+    p.set_defaults(func=bench_switch)
+    p = sub.add_parser("tooltip", help="подсказка дня при проходе мышью по сетке")
+    p.add_argument("--cell-ms", type=int, default=40, help="время над одной клеткой")
+    p.set_defaults(func=bench_tooltip)
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
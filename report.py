@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Сводка по всем профилям за месяц без открытия GUI.
+
+    python report.py --month 2026-03 -o report.csv
+    python report.py --profiles-dir D:\\Calendar --month 2026-03 -o report.json
+    python report.py --rebuild-aggregates   # пересобрать pay_periods во всех профилях
+
+Для каждого *.db в каталоге профилей: зарплата 14 числа (16-30(31)
+предыдущего месяца), зарплата 29 числа (1-15 месяца), нераспределённая
+переработка, недоработка, закрытые переработкой минуты, доп.оплата и
+начисленное с начала года. Профили обрабатываются в пуле процессов;
+для отчёта каждый открывается только на чтение.
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from urllib.parse import quote
+
+from salary_calendar import database
+from salary_calendar.constants import format_cents, format_minutes_hhmm
+from salary_calendar.model import fetch_period_info
+from salary_calendar.profile_manager import ProfileManager
+
+FIELDS = ["profile", "period", "salary_14_cents", "salary_29_cents", "pending_overtime_min",
+          "undertime_min", "allocated_min", "extra_cents", "year_to_date_cents", "error"]
+
+def open_read_only(path):
+    """Соединение только на чтение; профиль старой схемы мигрируется в памяти, файл не меняется."""
+    conn = sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)
+    try:
+        version = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+    except sqlite3.OperationalError:
+        version = 0
+    if version >= database.SCHEMA_VERSION:
+        return conn
+    mem = sqlite3.connect(":memory:")
+    conn.backup(mem); conn.close()
+    database.migrate(mem)
+    return mem
+
+def profile_report(path, year, month):
+    """Строка отчёта для одного профиля; выполняется в рабочем процессе."""
+    row = dict.fromkeys(FIELDS)
+    row["profile"] = os.path.basename(path)[:-len(".db")]
+    row["period"] = f"{year:04d}-{month:02d}"
+    try:
+        conn = open_read_only(path)
+        try:
+            info = fetch_period_info(conn, year, month, None)  # смена «сегодня» отчёту не нужна
+            row.update(salary_14_cents=info["second_prev_cents"], salary_29_cents=info["first_cents"],
+                       pending_overtime_min=info["pending_ot"], undertime_min=info["undertime_min"],
+                       allocated_min=info["allocated_min"], extra_cents=info["extra_cents"],
+                       year_to_date_cents=database.year_to_date_cents(conn, year, month))
+        finally:
+            conn.close()
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+def rebuild_profile(path):
+    """Миграция и пересборка итогов полумесяцев; пишет в файл, профиль должен быть закрыт."""
+    row = {"profile": os.path.basename(path)[:-len(".db")], "error": None}
+    try:
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            database.migrate(conn)
+            with conn: database.rebuild_pay_periods(conn, commit=False)
+        finally:
+            conn.close()
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+def _report_one(job):
+    return profile_report(*job)
+
+def profile_paths(profiles_dir):
+    return sorted(os.path.join(profiles_dir, f) for f in os.listdir(profiles_dir) if f.endswith(".db"))
+
+def build_report(profiles_dir, year, month, jobs=None):
+    paths = profile_paths(profiles_dir)
+    if not paths: return []
+    work = [(p, year, month) for p in paths]
+    if jobs == 1 or len(paths) == 1:
+        return [_report_one(w) for w in work]
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_report_one, work, chunksize=max(1, len(work) // (4 * jobs))))
+
+def write_csv(rows, out):
+    # суммы и время в привычном для бухгалтерии виде
+    writer = csv.writer(out)
+    writer.writerow(["Профиль", "Период", "Зарплата 14 числа", "Зарплата 29 числа", "Нераспределенная переработка",
+                     "Недоработка", "Закрыто переработкой", "Доп.оплата", "С начала года", "Ошибка"])
+    for r in rows:
+        if r["error"]:
+            writer.writerow([r["profile"], r["period"]] + [""] * 7 + [r["error"]]); continue
+        writer.writerow([r["profile"], r["period"], format_cents(r["salary_14_cents"]), format_cents(r["salary_29_cents"]),
+                         format_minutes_hhmm(r["pending_overtime_min"]), format_minutes_hhmm(r["undertime_min"]),
+                         format_minutes_hhmm(r["allocated_min"]), format_cents(r["extra_cents"]),
+                         format_cents(r["year_to_date_cents"]), ""])
+
+def write_json(rows, out):
+    json.dump(rows, out, ensure_ascii=False, indent=2)
+    out.write("\n")
+
+def parse_period(text):
+    year, month = map(int, text.split("-"))
+    if not 1 <= month <= 12: raise ValueError(text)
+    return year, month
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles-dir", default=ProfileManager.profiles_dir)
+    parser.add_argument("--month", type=parse_period, default=(date.today().year, date.today().month),
+                        help="ГГГГ-ММ, по умолчанию текущий месяц")
+    parser.add_argument("-o", "--output", help="файл отчёта (.csv или .json), по умолчанию stdout")
+    parser.add_argument("--format", choices=["csv", "json"], help="по умолчанию по расширению файла, иначе csv")
+    parser.add_argument("-j", "--jobs", type=int, help="число процессов (по умолчанию по числу ядер)")
+    parser.add_argument("--rebuild-aggregates", action="store_true",
+                        help="вместо отчёта пересобрать итоги полумесяцев (профили должны быть закрыты)")
+    args = parser.parse_args()
+    if args.rebuild_aggregates:
+        rows = [rebuild_profile(p) for p in profile_paths(args.profiles_dir)]
+        for r in rows:
+            if r["error"]: print(f"{r['profile']}: {r['error']}", file=sys.stderr)
+        failed = sum(1 for r in rows if r["error"])
+        print(f"пересобрано профилей: {len(rows) - failed}, с ошибками: {failed}", file=sys.stderr)
+        return 1 if failed else 0
+    fmt = args.format or ("json" if (args.output or "").lower().endswith(".json") else "csv")
+    rows = build_report(args.profiles_dir, *args.month, jobs=args.jobs)
+    write = write_json if fmt == "json" else write_csv
+    if args.output:
+        with open(args.output, "w", newline="" if fmt == "csv" else None, encoding="utf-8-sig" if fmt == "csv" else "utf-8") as out:
+            write(rows, out)
+    else:
+        write(rows, sys.stdout)
+    failed = sum(1 for r in rows if r["error"])
+    print(f"профилей: {len(rows)}, с ошибками: {failed}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
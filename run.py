@@ -1,36 +1,20 @@
 #!/usr/bin/env python3
 import tkinter as tk
-from tkinter import ttk
 from salary_calendar.interface import CalendarApp
 from salary_calendar.profile_manager import ProfileManager
 
-def choose_profile(root, manager):
-    profile = None
-    dlg = tk.Toplevel(root)
-    dlg.title("Календарь")
-    dlg.resizable(False, False)
-    ttk.Button(dlg, text="Создать профиль", command=lambda: manager.create_profile_window(dlg)).pack(padx=10, pady=5)
-    ttk.Button(dlg, text="Выбрать существующий", command=lambda: select(dlg)).pack(padx=10, pady=5)
-    def select(d):
-        nonlocal profile
-        profile = manager.select_profile_window(dlg)
-        if profile:
-            d.destroy()
-    dlg.grab_set()
-    root.wait_window(dlg)
-    return profile
-
 def main():
+    # одно окно на всё время работы: смена профиля и выход из него происходят внутри CalendarApp
     manager = ProfileManager()
-    while True:
-        root = tk.Tk()
-        root.withdraw()
-        profile = choose_profile(root, manager)
-        if not profile:
-            break
-        app = CalendarApp(root, profile, manager)
-        root.deiconify()  # Показать окно после выбора профиля
-        root.mainloop()
+    root = tk.Tk()
+    root.withdraw()
+    profile = manager.choose_profile_window(root)
+    if not profile:
+        root.destroy()
+        return
+    CalendarApp(root, profile, manager)
+    root.deiconify()  # Показать окно после выбора профиля
+    root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -6,7 +6,16 @@ __all__ = [
     "widgets",
     "calculations",
     "constants",
-    "events"
+    "events",
+    "shift_cache",
+    "background",
+    "replica",
+    "render",
+    "payroll",
+    "model",
+    "settings",
+    "registry",
+    "sessions"
 ]
 
 # provide version
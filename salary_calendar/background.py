@@ -0,0 +1,195 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class WriteBehindWriter:
+    """Фоновая запись в базу профиля.
+
+    Мутации - функции вида fn(conn, *args, commit=False) из database/ProfileManager.
+    Поток-писатель забирает их из очереди, группирует в одну транзакцию и
+    возвращает результат или ошибку в главный поток через master.after.
+    """
+    def __init__(self, master, db_path, on_commit=None, on_error=None, batch_size=64, poll_ms=50):
+        self.master = master
+        self.db_path = db_path
+        self.on_commit = on_commit  # вызывается в главном потоке после каждой записанной пачки
+        self.on_error = on_error  # on_error([ошибки]) - один раз на все ошибки, полученные за одну раздачу
+        self.batch_size = batch_size
+        self.poll_ms = poll_ms
+        self.jobs = queue.Queue()
+        self.done = queue.Queue()
+        self.pending = 0  # меняется только в главном потоке
+        self._poll_id = None
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, on_done=None, on_error=None):
+        """on_done(результат) / on_error(ошибка) - в главном потоке, для этой записи."""
+        self.pending += 1
+        self.jobs.put((fn, args, on_done, on_error))
+        if self._poll_id is None:
+            self._poll_id = self.master.after(self.poll_ms, self._poll)
+
+    def flush(self):
+        """Блокирует до записи всей очереди и сразу раздаёт результаты."""
+        self.jobs.join()
+        self._dispatch()
+
+    def close(self):
+        self.flush()
+        self.jobs.put(None)
+        self._thread.join()
+        if self._poll_id is not None:
+            try: self.master.after_cancel(self._poll_id)
+            except Exception: pass
+            self._poll_id = None
+
+    def _poll(self):
+        self._poll_id = None
+        self._dispatch()
+        if self.pending > 0:
+            self._poll_id = self.master.after(self.poll_ms, self._poll)
+
+    def _dispatch(self):
+        committed = False; errors = []
+        while True:
+            try: (fn, args, on_done, on_fail), result, error = self.done.get_nowait()
+            except queue.Empty: break
+            self.pending -= 1
+            if error is not None:
+                if on_fail: on_fail(error)
+                errors.append(error)
+                continue
+            committed = True
+            if on_done: on_done(result)
+        if committed and self.on_commit: self.on_commit()
+        if errors and self.on_error: self.on_error(errors)
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            stop = False
+            while not stop:
+                job = self.jobs.get()
+                if job is None: break
+                batch = [job]
+                while len(batch) < self.batch_size:
+                    try: job = self.jobs.get_nowait()
+                    except queue.Empty: break
+                    if job is None:
+                        stop = True; break
+                    batch.append(job)
+                self._apply(conn, batch)
+                for _ in batch: self.jobs.task_done()
+            self.jobs.task_done()  # за None
+        finally:
+            conn.close()
+
+    def _apply(self, conn, batch):
+        try:
+            with conn:
+                results = [fn(conn, *args, commit=False) for fn, args, *_ in batch]
+            for job, result in zip(batch, results): self.done.put((job, result, None))
+        except Exception:
+            # пачка откатилась целиком - повторяем по одной, чтобы ошибка не потеряла остальные записи
+            for job in batch:
+                fn, args, *_ = job
+                try:
+                    with conn: result = fn(conn, *args, commit=False)
+                    self.done.put((job, result, None))
+                except Exception as e:
+                    self.done.put((job, None, e))
+
+
+class QueryTicket:
+    __slots__ = ("tag", "future", "on_result", "on_error", "cancelled")
+
+    def __init__(self, tag, on_result, on_error):
+        self.tag = tag
+        self.future = None
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None: self.future.cancel()
+
+
+class QueryExecutor:
+    """Пул потоков для чтения из базы профиля.
+
+    У каждого рабочего потока своё соединение SQLite. Запрос - функция
+    fn(conn, *args); её результат передаётся в главный поток через master.after.
+    Запросы с общим tag можно отменить разом: ещё не начатые снимаются с
+    очереди, результаты уже выполняющихся выбрасываются.
+    """
+    def __init__(self, master, db_path, workers=2, poll_ms=30):
+        self.master = master
+        self.db_path = db_path
+        self.poll_ms = poll_ms
+        self.done = queue.Queue()
+        self.active = set()  # меняется только в главном потоке
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._poll_id = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-reader")
+
+    def submit(self, fn, *args, on_result=None, on_error=None, tag=None):
+        ticket = QueryTicket(tag, on_result, on_error)
+        self.active.add(ticket)
+        ticket.future = self._pool.submit(self._run, ticket, fn, args)
+        if self._poll_id is None:
+            self._poll_id = self.master.after(self.poll_ms, self._poll)
+        return ticket
+
+    def cancel(self, tag=None):
+        for ticket in list(self.active):
+            if tag is None or ticket.tag == tag:
+                ticket.cancel()
+                self.active.discard(ticket)
+
+    def close(self):
+        self.cancel()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            for conn in self._connections: conn.close()
+            self._connections.clear()
+        if self._poll_id is not None:
+            try: self.master.after_cancel(self._poll_id)
+            except Exception: pass
+            self._poll_id = None
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+            with self._lock: self._connections.append(conn)
+        return conn
+
+    def _run(self, ticket, fn, args):
+        if ticket.cancelled: return
+        try:
+            self.done.put((ticket, fn(self._connection(), *args), None))
+        except Exception as e:
+            self.done.put((ticket, None, e))
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try: ticket, result, error = self.done.get_nowait()
+            except queue.Empty: break
+            if ticket.cancelled or ticket not in self.active: continue
+            self.active.discard(ticket)
+            if error is not None:
+                if ticket.on_error: ticket.on_error(error)
+            elif ticket.on_result:
+                ticket.on_result(result)
+        # снятые до старта задачи в очередь результатов не попадают
+        self.active = {t for t in self.active if not t.future.cancelled()}
+        if self.active:
+            self._poll_id = self.master.after(self.poll_ms, self._poll)
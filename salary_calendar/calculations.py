@@ -1,21 +1,24 @@
 import calendar
+from collections import OrderedDict
+from datetime import date
 from decimal import Decimal
 from .constants import DEC, money_to_cents
 
 def working_days_in_month(year:int, month:int, holidays_set:set) -> int:
-    cal = calendar.Calendar(firstweekday=0); cnt = 0
-    for week in cal.monthdatescalendar(year, month):
-        for d in week:
-            if d.month != month: continue
-            if d.weekday() >= 5: continue
-            if d in holidays_set: continue
-            cnt += 1
+    first_wd, days = calendar.monthrange(year, month); cnt = 0
+    for i in range(days):
+        if (first_wd + i) % 7 >= 5: continue
+        if holidays_set and date(year, month, i + 1) in holidays_set: continue
+        cnt += 1
     return cnt
 
 def hourly_rate_for_month(year:int, month:int, holidays_set:set, base_amount: Decimal) -> Decimal:
-    wd = working_days_in_month(year, month, holidays_set)
-    if wd <= 0: return DEC('0.00')
-    return (base_amount / DEC(wd) / DEC(8)).quantize(DEC('0.01'))
+    return hourly_rate_for_days(working_days_in_month(year, month, holidays_set), base_amount)
+
+def hourly_rate_for_days(working_days:int, base_amount: Decimal) -> Decimal:
+    """Часовая ставка месяца с working_days рабочими днями по 8 часов."""
+    if working_days <= 0: return DEC('0.00')
+    return (base_amount / DEC(working_days) / DEC(8)).quantize(DEC('0.01'))
 
 def day_base_pay(hourly_rate:Decimal) -> int:
     return money_to_cents((hourly_rate * DEC(8)).quantize(DEC('0.01')))
@@ -34,4 +37,87 @@ def weekend_pay_for_duration(duration_min:int, hourly_rate:Decimal, lunch_min:in
     work_minutes = duration_min or 0
     if work_minutes > 240:
         work_minutes -= lunch_min
-    return calc_overtime_pay_minutes(work_minutes, hourly_rate, is_weekend=True)
\ No newline at end of file
+    return calc_overtime_pay_minutes(work_minutes, hourly_rate, is_weekend=True)
+
+# Целочисленный путь: ставка в копейках, минуты - числитель дроби над 60.
+# Результаты совпадают с Decimal-функциями выше: вне ровной половины копейки
+# погрешность Decimal (28 знаков) не может изменить округление, а ровную
+# половину считаем через Decimal, чтобы повторить его округление в точности.
+
+def rate_to_cents(hourly_rate:Decimal) -> int:
+    return money_to_cents(hourly_rate)
+
+def _round_cents(num:int, den:int, fallback) -> int:
+    q, r = divmod(num, den)
+    if 2 * r < den: return q
+    if 2 * r > den: return q + 1
+    return fallback()
+
+def day_base_pay_int(rate_cents:int) -> int:
+    return rate_cents * 8
+
+def calc_overtime_pay_minutes_int(overtime_min:int, rate_cents:int, is_weekend=False) -> int:
+    if overtime_min <= 0: return 0
+    if is_weekend:
+        # ставка * 2.0 * мин/60 = ставка * мин / 30
+        num, den = rate_cents * overtime_min, 30
+    else:
+        # ставка * (1.5 * первые 120 мин + 2.0 * остальные) / 60
+        first = min(overtime_min, 120); rest = max(0, overtime_min - 120)
+        num, den = rate_cents * (3 * first + 4 * rest), 120
+    return _round_cents(num, den, lambda: calc_overtime_pay_minutes(overtime_min, DEC(rate_cents) / 100, is_weekend))
+
+def weekend_pay_for_duration_int(duration_min:int, rate_cents:int, lunch_min:int) -> int:
+    work_minutes = duration_min or 0
+    if work_minutes > 240:
+        work_minutes -= lunch_min
+    return calc_overtime_pay_minutes_int(work_minutes, rate_cents, is_weekend=True)
+
+class RateTable:
+    """Рабочие дни и часовая ставка по (год, месяц) для одного профиля.
+
+    Значения считаются один раз и хранятся с LRU-вытеснением (maxsize месяцев).
+    При смене оклада или набора праздников таблица сбрасывается.
+    """
+    def __init__(self, holidays_set:set, base_amount:Decimal, maxsize:int=240):
+        self.holidays_set = holidays_set
+        self.base_amount = base_amount
+        self.maxsize = maxsize
+        self._table = OrderedDict()
+        self.hits = 0; self.misses = 0
+
+    def entry(self, year:int, month:int):
+        """(рабочих дней, часовая ставка, ставка в копейках)."""
+        key = (year, month)
+        row = self._table.get(key)
+        if row is not None:
+            self._table.move_to_end(key); self.hits += 1
+            return row
+        self.misses += 1
+        wd = working_days_in_month(year, month, self.holidays_set)
+        rate = hourly_rate_for_days(wd, self.base_amount)
+        row = self._table[key] = (wd, rate, rate_to_cents(rate))
+        if len(self._table) > self.maxsize:
+            self._table.popitem(last=False)
+        return row
+
+    def working_days(self, year:int, month:int) -> int:
+        return self.entry(year, month)[0]
+
+    def hourly_rate(self, year:int, month:int) -> Decimal:
+        return self.entry(year, month)[1]
+
+    def hourly_rate_cents(self, year:int, month:int) -> int:
+        return self.entry(year, month)[2]
+
+    def set_base_amount(self, base_amount:Decimal):
+        if base_amount != self.base_amount:
+            self.base_amount = base_amount
+            self.invalidate()
+
+    def set_holidays(self, holidays_set:set):
+        self.holidays_set = holidays_set
+        self.invalidate()
+
+    def invalidate(self):
+        self._table.clear()
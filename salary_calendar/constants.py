@@ -8,6 +8,12 @@ def money_to_cents(amount: Decimal) -> int:
 def cents_to_money(cents: int) -> Decimal:
     return (DEC(cents) / 100).quantize(DEC('0.01'), rounding=ROUND_HALF_UP)
 
+def format_cents(cents: int) -> str:
+    """Копейки в строку рубли.копейки без Decimal: то же, что f"{cents_to_money(cents):.2f}"."""
+    sign = "-" if cents < 0 else ""
+    rub, kop = divmod(abs(cents), 100)
+    return f"{sign}{rub}.{kop:02d}"
+
 def format_minutes_hhmm(minutes: int) -> str:
     sign = ""
     if minutes < 0:
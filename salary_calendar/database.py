@@ -1,6 +1,21 @@
 import sqlite3
+import calendar
+import re
+from collections import Counter
+from datetime import date
+from decimal import Decimal
+from .constants import money_to_cents
 
-def init_db(conn):
+# Целочисленный ключ дня: date.toordinal(). В SQL тот же номер даёт julianday(day) - 1721424.5
+_DAY_NUM_SQL = "CAST(julianday(day) - 1721424.5 AS INTEGER)"
+
+def day_key(day_iso):
+    return date.fromisoformat(day_iso).toordinal()
+
+def month_keys(year, month):
+    return date(year, month, 1).toordinal(), date(year, month, calendar.monthrange(year, month)[1]).toordinal()
+
+def _migration_base(conn):
     cur = conn.cursor()
     cur.execute("""CREATE TABLE IF NOT EXISTS shifts (
         day TEXT PRIMARY KEY,
@@ -17,48 +32,264 @@ def init_db(conn):
         key TEXT PRIMARY KEY,
         value TEXT
     )""")
-    conn.commit()
+
+def _migration_ledger(conn):
+    cur = conn.cursor()
+    # Журнал переработок и доп.оплат: source_day -> target_day на minutes минут,
+    # доп.оплата записывается с source_day = NULL и суммой в cents
+    cur.execute("""CREATE TABLE IF NOT EXISTS ledger (
+        id INTEGER PRIMARY KEY,
+        source_day TEXT,
+        target_day TEXT NOT NULL,
+        minutes INTEGER NOT NULL DEFAULT 0,
+        cents INTEGER NOT NULL DEFAULT 0,
+        created TEXT
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ledger_target ON ledger(target_day, minutes, cents)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ledger_source ON ledger(source_day, minutes)")
+    migrate_notes_to_ledger(conn, commit=False)  # коммит вместе с записью версии в migrate()
+
+def _migration_day_num(conn):
+    cur = conn.cursor()
+    columns = [r[1] for r in cur.execute("PRAGMA table_info(shifts)")]
+    if "day_num" not in columns:
+        cur.execute("ALTER TABLE shifts ADD COLUMN day_num INTEGER")
+    cur.execute(f"UPDATE shifts SET day_num = {_DAY_NUM_SQL} WHERE day_num IS NULL")
+    cur.execute("UPDATE shifts SET overtime_pay_cents = 0 WHERE overtime_pay_cents IS NULL")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_shifts_day_num ON shifts(day_num)")
+    # покрывающий индекс для сумм зарплаты за период
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_shifts_pay ON shifts(day_num, day_pay_cents, overtime_pay_cents)")
+    cur.execute("""CREATE INDEX IF NOT EXISTS idx_shifts_pending ON shifts(day_num, day, overtime_min, overtime_pay_cents)
+                   WHERE overtime_min > 0 AND overtime_pay_cents = 0""")
+    # страховка для INSERT, которые не передают day_num
+    cur.execute(f"""CREATE TRIGGER IF NOT EXISTS shifts_fill_day_num AFTER INSERT ON shifts
+                    WHEN NEW.day_num IS NULL
+                    BEGIN UPDATE shifts SET day_num = {_DAY_NUM_SQL} WHERE rowid = NEW.rowid; END""")
+
+# Вклад строки смены в итоги полумесяца pay_periods; {r} - NEW/OLD в триггерах или shifts
+_PERIOD_COLUMNS = ("year", "month", "half", "day_pay_cents", "overtime_pay_cents", "pending_ot_min", "undertime_min", "shifts")
+_PERIOD_EXPRS = (
+    "CAST(substr({r}.day, 1, 4) AS INTEGER)",
+    "CAST(substr({r}.day, 6, 2) AS INTEGER)",
+    "CASE WHEN CAST(substr({r}.day, 9, 2) AS INTEGER) <= 15 THEN 1 ELSE 2 END",
+    "COALESCE({r}.day_pay_cents, 0)",
+    "COALESCE({r}.overtime_pay_cents, 0)",
+    "CASE WHEN {r}.overtime_min > 0 AND {r}.overtime_pay_cents = 0 THEN {r}.overtime_min ELSE 0 END",
+    "COALESCE({r}.undertime_min, 0)",
+    "1",
+)
+
+def _period_upsert(r, sign):
+    exprs = [e.format(r=r) for e in _PERIOD_EXPRS]
+    values = exprs[:3] + [f"{sign}({e})" for e in exprs[3:]]
+    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in _PERIOD_COLUMNS[3:])
+    return (f"INSERT INTO pay_periods({', '.join(_PERIOD_COLUMNS)}) VALUES({', '.join(values)}) "
+            f"ON CONFLICT(year, month, half) DO UPDATE SET {updates};")
+
+def rebuild_pay_periods(conn, commit=True):
+    """Пересобирает pay_periods из shifts (для профилей, где итоги могли разойтись)."""
+    cur = conn.cursor()
+    exprs = [e.format(r="shifts") for e in _PERIOD_EXPRS]
+    cur.execute("DELETE FROM pay_periods")
+    cur.execute(f"""
+        INSERT INTO pay_periods({', '.join(_PERIOD_COLUMNS)})
+        SELECT {', '.join(exprs[:3])}, {', '.join(f'SUM({e})' for e in exprs[3:])}
+        FROM shifts GROUP BY 1, 2, 3
+    """)
+    if commit: conn.commit()
+
+def _migration_pay_periods(conn):
+    cur = conn.cursor()
+    cur.execute("""CREATE TABLE IF NOT EXISTS pay_periods (
+        year INTEGER NOT NULL, month INTEGER NOT NULL, half INTEGER NOT NULL,
+        day_pay_cents INTEGER NOT NULL DEFAULT 0, overtime_pay_cents INTEGER NOT NULL DEFAULT 0,
+        pending_ot_min INTEGER NOT NULL DEFAULT 0, undertime_min INTEGER NOT NULL DEFAULT 0,
+        shifts INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (year, month, half)) WITHOUT ROWID""")
+    watched = "day, day_pay_cents, overtime_pay_cents, overtime_min, undertime_min"
+    cur.execute(f"""CREATE TRIGGER IF NOT EXISTS shifts_pay_periods_insert AFTER INSERT ON shifts
+                    BEGIN {_period_upsert("NEW", "+")} END""")
+    cur.execute(f"""CREATE TRIGGER IF NOT EXISTS shifts_pay_periods_delete AFTER DELETE ON shifts
+                    BEGIN {_period_upsert("OLD", "-")} END""")
+    cur.execute(f"""CREATE TRIGGER IF NOT EXISTS shifts_pay_periods_update AFTER UPDATE OF {watched} ON shifts
+                    BEGIN {_period_upsert("OLD", "-")} {_period_upsert("NEW", "+")} END""")
+    rebuild_pay_periods(conn, commit=False)
+
+MIGRATIONS = [
+    (1, _migration_base),
+    (2, _migration_ledger),
+    (3, _migration_day_num),
+    (4, _migration_pay_periods),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(conn):
+    cur = conn.cursor()
+    cur.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, applied TEXT)")
+    return cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def migrate(conn):
+    """Доводит схему профиля до SCHEMA_VERSION. Возвращает список применённых версий."""
+    current = schema_version(conn); applied = []
+    for version, step in MIGRATIONS:
+        if version <= current: continue
+        with conn:
+            # sqlite3 сам открывает транзакцию только перед DML: без BEGIN CREATE/ALTER шага коммитились бы сразу
+            if not conn.in_transaction: conn.execute("BEGIN")
+            step(conn)
+            conn.execute("INSERT INTO schema_version(version, applied) VALUES(?, datetime('now'))", (version,))
+        applied.append(version)
+    return applied
+
+def init_db(conn):
+    migrate(conn)
 
 def load_shift(conn, day_iso):
     cur = conn.cursor()
     cur.execute("SELECT activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes FROM shifts WHERE day=?", (day_iso,))
     return cur.fetchone()
 
-def save_shift(conn, day_iso, activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes):
+def load_shifts_between(conn, start_iso, end_iso):
+    cur = conn.cursor()
+    cur.execute("SELECT day, activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes FROM shifts WHERE day_num BETWEEN ? AND ?", (day_key(start_iso), day_key(end_iso)))
+    return {r[0]: r[1:] for r in cur.fetchall()}
+
+def save_shift(conn, day_iso, activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes, commit=True):
     cur = conn.cursor()
     cur.execute("""
-        INSERT INTO shifts(day, activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes)
-        VALUES(?,?,?,?,?,?,?,?,?)
+        INSERT INTO shifts(day, day_num, activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes)
+        VALUES(?,?,?,?,?,?,?,?,?,?)
         ON CONFLICT(day) DO UPDATE SET
           activation=excluded.activation, end=excluded.end, duration_min=excluded.duration_min,
           undertime_min=excluded.undertime_min, overtime_min=excluded.overtime_min,
           day_pay_cents=excluded.day_pay_cents, overtime_pay_cents=excluded.overtime_pay_cents, notes=excluded.notes
-    """, (day_iso, activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes))
-    conn.commit()
+    """, (day_iso, day_key(day_iso), activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents or 0, notes))
+    if commit: conn.commit()
 
-def delete_shift(conn, day_iso):
-    cur = conn.cursor(); cur.execute("DELETE FROM shifts WHERE day=?", (day_iso,)); conn.commit()
+def delete_shift(conn, day_iso, commit=True):
+    cur = conn.cursor(); cur.execute("DELETE FROM shifts WHERE day=?", (day_iso,))
+    if commit: conn.commit()
 
 def find_pending_overtimes(conn, year=None, month=None):
     cur = conn.cursor()
     if year and month:
         cur.execute("""
             SELECT day, overtime_min FROM shifts
-            WHERE overtime_min > 0
-              AND (overtime_pay_cents IS NULL OR overtime_pay_cents = 0)
-              AND strftime('%Y', day) = ? 
-              AND strftime('%m', day) = ?
-            ORDER BY day
-        """, (str(year), f"{month:02d}"))
+            WHERE overtime_min > 0 AND overtime_pay_cents = 0
+              AND day_num BETWEEN ? AND ?
+            ORDER BY day_num
+        """, month_keys(year, month))
     else:
         cur.execute("""
             SELECT day, overtime_min FROM shifts
-            WHERE overtime_min > 0 
-              AND (overtime_pay_cents IS NULL OR overtime_pay_cents = 0)
-            ORDER BY day
+            WHERE overtime_min > 0 AND overtime_pay_cents = 0
+            ORDER BY day_num
         """)
     return cur.fetchall()
 
 def list_shifts_between(conn, start_iso, end_iso):
-    cur = conn.cursor(); cur.execute("SELECT * FROM shifts WHERE day BETWEEN ? AND ? ORDER BY day", (start_iso, end_iso))
-    return cur.fetchall()
\ No newline at end of file
+    cur = conn.cursor()
+    cur.execute("SELECT day, activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes FROM shifts WHERE day_num BETWEEN ? AND ? ORDER BY day_num", (day_key(start_iso), day_key(end_iso)))
+    return cur.fetchall()
+
+def sum_pay_between(conn, start_iso, end_iso):
+    """Сумма day_pay_cents + overtime_pay_cents за период (по покрывающему индексу)."""
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(SUM(COALESCE(day_pay_cents, 0) + overtime_pay_cents), 0) FROM shifts WHERE day_num BETWEEN ? AND ?", (day_key(start_iso), day_key(end_iso)))
+    return cur.fetchone()[0]
+
+def load_pay_periods(conn, first, last):
+    """Итоги полумесяцев из pay_periods для месяцев first..last ((год, месяц) включительно).
+
+    {(год, месяц, половина): (оплата дня, оплата ОТ, неоплаченная переработка, недоработка, смен)}
+    """
+    cur = conn.cursor()
+    cur.execute("""SELECT year, month, half, day_pay_cents, overtime_pay_cents, pending_ot_min, undertime_min, shifts
+                   FROM pay_periods WHERE (year, month) BETWEEN (?, ?) AND (?, ?)""", (*first, *last))
+    return {r[:3]: r[3:] for r in cur.fetchall()}
+
+def year_to_date_cents(conn, year, month):
+    """Начислено с начала года по конец месяца month."""
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(SUM(day_pay_cents + overtime_pay_cents), 0) FROM pay_periods WHERE year = ? AND month <= ?", (year, month))
+    return cur.fetchone()[0]
+
+def year_day_minutes(conn, year):
+    """{номер дня: (длительность, недоработка, переработка)} завершённых смен года одним запросом."""
+    cur = conn.cursor()
+    cur.execute("""SELECT day_num, duration_min, undertime_min, overtime_min FROM shifts
+                   WHERE day_num BETWEEN ? AND ? AND duration_min IS NOT NULL""",
+                (date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal()))
+    return {r[0]: r[1:] for r in cur.fetchall()}
+
+def month_pay_totals(conn, year):
+    """{месяц: (начислено, неоплаченная переработка, недоработка, смен)} за год по pay_periods."""
+    cur = conn.cursor()
+    cur.execute("""SELECT month, SUM(day_pay_cents + overtime_pay_cents), SUM(pending_ot_min), SUM(undertime_min), SUM(shifts)
+                   FROM pay_periods WHERE year = ? GROUP BY month""", (year,))
+    return {r[0]: r[1:] for r in cur.fetchall()}
+
+def add_ledger_entries(conn, entries):
+    # entries: (source_day, target_day, minutes, cents, created); коммит делает вызывающий
+    conn.executemany("INSERT INTO ledger(source_day, target_day, minutes, cents, created) VALUES(?,?,?,?,?)", entries)
+
+def ledger_totals_between(conn, start_iso, end_iso):
+    """{day: (закрыто минут, использовано минут, доп.оплата в копейках)} за период."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT day, SUM(closed), SUM(used), SUM(extra) FROM (
+            SELECT target_day AS day, minutes AS closed, 0 AS used, cents AS extra FROM ledger WHERE target_day BETWEEN ? AND ?
+            UNION ALL
+            SELECT source_day, 0, minutes, 0 FROM ledger WHERE source_day BETWEEN ? AND ?
+        ) GROUP BY day
+    """, (start_iso, end_iso, start_iso, end_iso))
+    return {r[0]: (r[1], r[2], r[3]) for r in cur.fetchall()}
+
+def ledger_summary_between(conn, start_iso, end_iso):
+    """(распределено минут, доп.оплата в копейках) по дням-получателям периода."""
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(SUM(minutes), 0), COALESCE(SUM(cents), 0) FROM ledger WHERE target_day BETWEEN ? AND ?", (start_iso, end_iso))
+    return cur.fetchone()
+
+_NOTE_CLOSED = re.compile(r"^Закрыто переработкой (\d+) мин \(источник (\S+)\)$")
+_NOTE_USED = re.compile(r"^Использовано для закрытия: (.*)$")
+_NOTE_EXTRA = re.compile(r"^Добавлена доп\.оплата: ([\d.]+) руб$")
+
+def migrate_notes_to_ledger(conn, commit=True):
+    """Переносит служебные строки из shifts.notes в ledger и убирает их из заметок.
+
+    Одно распределение записывалось в заметки обоих дней, поэтому пары
+    (источник, получатель, минуты) сводятся: берётся большее число вхождений
+    с любой из сторон. Повторный запуск ничего не меняет.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT day, notes FROM shifts
+        WHERE notes LIKE '%Закрыто переработкой%' OR notes LIKE '%Использовано для закрытия%' OR notes LIKE '%Добавлена доп.оплата%'
+    """)
+    rows = cur.fetchall()
+    if not rows: return 0
+    closed = Counter(); used = Counter(); extra = []; cleaned = []
+    for day_iso, notes in rows:
+        keep = []
+        for line in notes.split("\n"):
+            m = _NOTE_CLOSED.match(line.strip())
+            if m:
+                closed[(m.group(2), day_iso, int(m.group(1)))] += 1; continue
+            m = _NOTE_USED.match(line.strip())
+            if m:
+                for item in m.group(1).split(";"):
+                    target, _, minutes = item.strip().rpartition(":")
+                    if target and minutes.endswith("min") and minutes[:-3].isdigit():
+                        used[(day_iso, target, int(minutes[:-3]))] += 1
+                continue
+            m = _NOTE_EXTRA.match(line.strip())
+            if m:
+                extra.append((None, day_iso, 0, money_to_cents(Decimal(m.group(1))), None)); continue
+            keep.append(line)
+        cleaned.append(("\n".join(keep).strip(), day_iso))
+    entries = [(s, t, mins, 0, None) for (s, t, mins) in sorted((closed | used).elements())]
+    add_ledger_entries(conn, entries + extra)
+    conn.executemany("UPDATE shifts SET notes=? WHERE day=?", cleaned)
+    if commit: conn.commit()
+    return len(entries) + len(extra)
@@ -1,20 +1,27 @@
-from .constants import cents_to_money
 import calendar
-from datetime import date
+from collections import namedtuple
+from datetime import date, datetime
+from . import database
+
+Allocation = namedtuple("Allocation", "source target minutes")
+AllocationPlan = namedtuple("AllocationPlan", "allocations undertime overtime")
+
+def _month_halves(year:int, month:int):
+    last = calendar.monthrange(year, month)[1]
+    return ((date(year, month, 1).isoformat(), date(year, month, 15).isoformat()),
+            (date(year, month, 16).isoformat(), date(year, month, last).isoformat()))
+
+def _now_iso():
+    return datetime.now().isoformat(timespec="seconds")
 
 def add_overtime_pay(conn, day_iso:str, add_cents:int):
     if add_cents <= 0: return
-    cur = conn.cursor(); cur.execute("SELECT overtime_pay_cents, notes FROM shifts WHERE day=?", (day_iso,))
-    row = cur.fetchone()
-    if row:
-        cur_val = row[0] or 0; notes = row[1] or ""
-        new_val = cur_val + add_cents
-        notes = (notes + "\n" if notes else "") + f"Добавлена доп.оплата: {cents_to_money(add_cents)} руб"
-        cur.execute("UPDATE shifts SET overtime_pay_cents=?, notes=? WHERE day=?", (new_val, notes, day_iso))
-    else:
-        notes = f"Добавлена доп.оплата: {cents_to_money(add_cents)} руб"
-        cur.execute("INSERT INTO shifts(day, activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes) VALUES(?,?,?,?,?,?,?,?,?)", (day_iso, None, None, None, 0, 0, 0, add_cents, notes))
-    conn.commit()
+    with conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE shifts SET overtime_pay_cents=COALESCE(overtime_pay_cents, 0)+? WHERE day=?", (add_cents, day_iso))
+        if cur.rowcount == 0:
+            cur.execute("INSERT INTO shifts(day, day_num, activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes) VALUES(?,?,?,?,?,?,?,?,?,?)", (day_iso, database.day_key(day_iso), None, None, None, 0, 0, 0, add_cents, ""))
+        database.add_ledger_entries(conn, [(None, day_iso, 0, add_cents, _now_iso())])
 
 def distribute_overtime_minutes(conn, year:int, month:int, half:int, source_day_iso:str, available_overtime_min:int):
     cur = conn.cursor(); used_map = {}
@@ -24,29 +31,68 @@ def distribute_overtime_minutes(conn, year:int, month:int, half:int, source_day_
     else:
         last = calendar.monthrange(year, month)[1]
         start = date(year, month, 16); end = date(year, month, last)
-    cur.execute("SELECT day, undertime_min FROM shifts WHERE day BETWEEN ? AND ? AND undertime_min>0 ORDER BY day ASC", (start.isoformat(), end.isoformat()))
-    rows = cur.fetchall()
+    cur.execute("SELECT day, undertime_min FROM shifts WHERE day_num BETWEEN ? AND ? AND undertime_min>0 ORDER BY day_num ASC", (start.toordinal(), end.toordinal()))
+    rows = cur.fetchall(); updates = []
     for r in rows:
         day_iso, undertime = r[0], r[1] or 0
         if day_iso == source_day_iso: continue
         if available_overtime_min <= 0: break
         if undertime <= 0: continue
         take = min(undertime, available_overtime_min)
-        new_undertime = undertime - take
-        cur.execute("SELECT notes FROM shifts WHERE day=?", (day_iso,)); nrow = cur.fetchone(); notes_target = (nrow[0] or "")
-        notes_target = (notes_target + "\n" if notes_target else "") + f"Закрыто переработкой {take} мин (источник {source_day_iso})"
-        cur.execute("UPDATE shifts SET undertime_min=?, notes=? WHERE day=?", (new_undertime, notes_target, day_iso))
-        conn.commit()
+        updates.append((undertime - take, day_iso))
         used_map[day_iso] = take
         available_overtime_min -= take
     if used_map:
-        total_used = sum(used_map.values())
-        cur.execute("SELECT overtime_min, notes FROM shifts WHERE day=?", (source_day_iso,)); row = cur.fetchone()
-        if row:
-            cur_overtime = row[0] or 0; cur_notes = row[1] or ""
-            new_overtime = max(0, cur_overtime - total_used)
-            used_info = "; ".join([f"{d}:{m}min" for d,m in used_map.items()])
-            cur_notes = (cur_notes + "\n" if cur_notes else "") + f"Использовано для закрытия: {used_info}"
-            cur.execute("UPDATE shifts SET overtime_min=?, notes=? WHERE day=?", (new_overtime, cur_notes, source_day_iso))
-            conn.commit()
-    return available_overtime_min, used_map
\ No newline at end of file
+        total_used = sum(used_map.values()); created = _now_iso()
+        with conn:
+            conn.executemany("UPDATE shifts SET undertime_min=? WHERE day=?", updates)
+            conn.execute("UPDATE shifts SET overtime_min=MAX(0, COALESCE(overtime_min, 0)-?) WHERE day=?", (total_used, source_day_iso))
+            database.add_ledger_entries(conn, [(source_day_iso, d, m, 0, created) for d, m in used_map.items()])
+    return available_overtime_min, used_map
+
+def allocate_month_overtime(conn, year:int, month:int) -> AllocationPlan:
+    """Закрывает недоработки месяца переработками за один проход.
+
+    Результат совпадает с вызовом distribute_overtime_minutes для каждого дня из
+    find_pending_overtimes, но месяц читается одним запросом, а все изменения
+    записываются одной транзакцией.
+    """
+    cur = conn.cursor(); halves = _month_halves(year, month)
+    cur.execute("""
+        SELECT day, undertime_min, overtime_min, overtime_pay_cents FROM shifts
+        WHERE day_num BETWEEN ? AND ?
+          AND (undertime_min > 0 OR (overtime_min > 0 AND overtime_pay_cents = 0))
+        ORDER BY day_num
+    """, database.month_keys(year, month))
+    state = {}; allocations = []
+    per_half = ([[], []], [[], []])  # (источники, цели) для 1-15 и 16-конец
+    for day_iso, undertime, overtime, ot_pay in cur.fetchall():
+        state[day_iso] = [undertime or 0, overtime or 0]
+        half = per_half[0] if day_iso <= halves[0][1] else per_half[1]
+        if (overtime or 0) > 0 and not ot_pay: half[0].append(day_iso)
+        if (undertime or 0) > 0: half[1].append(day_iso)
+    changed = set()
+    for sources, targets in per_half:
+        first = 0  # цели до этого индекса уже закрыты полностью
+        for source in sources:
+            available = state[source][1]; used = 0
+            i = first
+            while available > 0 and i < len(targets):
+                target = targets[i]; i += 1
+                if target == source or state[target][0] <= 0: continue
+                take = min(state[target][0], available)
+                state[target][0] -= take; available -= take; used += take
+                allocations.append(Allocation(source, target, take)); changed.add(target)
+            while first < len(targets) and state[targets[first]][0] <= 0: first += 1
+            if used:
+                state[source][1] = max(0, state[source][1] - used)
+                changed.add(source)
+    rows = [(state[d][0], state[d][1], d) for d in sorted(changed)]
+    if rows:
+        created = _now_iso()
+        with conn:
+            conn.executemany("UPDATE shifts SET undertime_min=?, overtime_min=? WHERE day=?", rows)
+            database.add_ledger_entries(conn, [(a.source, a.target, a.minutes, 0, created) for a in allocations])
+    return AllocationPlan(allocations,
+                          {a.target: state[a.target][0] for a in allocations},
+                          {a.source: state[a.source][1] for a in allocations})
\ No newline at end of file
@@ -1,16 +1,26 @@
 #!/usr/bin/env python3
 import tkinter as tk
-from tkinter import ttk, messagebox, colorchooser
-from datetime import date, datetime, timedelta
+from tkinter import ttk, messagebox
+from collections import OrderedDict
+from datetime import date, datetime
 import calendar, traceback
 from decimal import Decimal
-import os
-import sqlite3
 
-from .constants import cents_to_money, format_minutes_hhmm
-from . import database, calculations, events, widgets
+from .constants import format_cents, format_minutes_hhmm
+from . import events, payroll, widgets
+from .model import fetch_period_info, fetch_year_overview
+from .shift_cache import ShiftCache
+from .registry import LockTimeout
+from .replica import ReplicaConflict
+from .sessions import ProfileSession, SessionPool, pay_settings
+from .render import CanvasGridRenderer, GridRenderer
+from .settings import COLOR_PREFIX, color_settings
 from .profile_manager import ProfileManager, parse_hhmm_to_min, format_min_to_hhmm
 
+VIEW_PARTS = ("header", "grid", "weeks", "salary", "today")
+INFO_CACHE_SIZE = 6  # месяцев с готовыми суммами нижней панели
+SESSION_POOL_SIZE = 3  # профилей, которые остаются открытыми для быстрого переключения
+
 def center_window(window, width=None, height=None):
     window.update_idletasks()
     if width is None:
@@ -24,94 +34,174 @@ def center_window(window, width=None, height=None):
     window.geometry(f"{width}x{height}+{x}+{y}")
 
 class CalendarApp:
+    grid_renderer = "widgets"  # "canvas" - сетка на одном tk.Canvas (CanvasGridRenderer)
+
     def __init__(self, master, profile_name, manager: ProfileManager):
         self.master = master
-        self.master.title(f"Salary Calendar (Рабочий календарь) - {profile_name}")
         self.master.geometry("1150x740")
         center_window(self.master, 1150, 740)  # ← добавить эту строку
         self.master.resizable(False, False)
-        self.profile_name = profile_name
         self.manager = manager
-        self.db_path = os.path.join(manager.profiles_dir, f"{profile_name}.db")
-        self.conn = sqlite3.connect(self.db_path)
-        if not self._db_exists():
-            database.init_db(self.conn)
-            self.manager.save_default_colors(self.conn)
-        self.base_amount = Decimal(self.manager.load_setting(self.conn, 'salary', '90610.5'))
-        self.lunch_min = int(self.manager.load_setting(self.conn, 'lunch_min', '60'))
-        self.required_minutes = 480 + self.lunch_min  # 8h + lunch
-        self.colors = self.manager.load_colors(self.conn)
-        self.holidays_set, self.holidays_names = self._load_manual_holidays(range(2024,2028))
-        self.today = date.today(); self.cur_year = self.today.year; self.cur_month = self.today.month
-        self.tooltip = None
+        # профиль - сменная сессия (база, настройки, модель); окно и виджеты живут, пока живёт приложение
+        self.sessions = SessionPool(lambda name: ProfileSession(self.manager, name, self.master), self._close_session,
+                                    SESSION_POOL_SIZE)
+        self.session = None
+        self.colors = self.manager.default_colors()  # до подключения профиля
+        self._today_row = None
+        self.cur_year = date.today().year; self.cur_month = date.today().month
+        self.tooltip = widgets.HoverTooltip(self.master)
         self.after_id = None
-        self._build_ui(); self._draw_calendar(); self._start_timer()
+        self._dirty = set(); self._reload_month = False; self._render_id = None
+        self._loading = {}  # ("month", start, end) / ("info", год, месяц) -> тег запроса в пуле
+        self._month_seqs = {}  # (start, end) -> shifts.seq на момент запроса месяца (см. _prune_written)
+        self._info_cache = OrderedDict(); self._info_gen = 0  # словарь подменяется кэшем активной сессии
+        self.render_stats = {"passes": 0, "invalidations": 0}
+        self._year_window = None; self._year_data = None  # окно обзора года и (год, данные) в нём
+        self._settings_dialog = None  # строится при первом открытии и дальше только прячется
+        self.master.protocol("WM_DELETE_WINDOW", self._logout)
+        self._build_ui()
+        self._attach(self.sessions.get(profile_name))
+
+    @property
+    def shifts(self):
+        return self.model.shifts
+
+    def _pay_settings(self):
+        return pay_settings(self.settings)
+
+    # --- профили ---
+
+    def _attach(self, session):
+        """Подключает сессию профиля к окну: виджеты прежние, меняются данные и цвета."""
+        self.session = session
+        self.profile_name = session.name
+        self.replica, self.db_path, self.conn = session.replica, session.db_path, session.conn
+        self.writer, self.queries, self.settings, self.model = session.writer, session.queries, session.settings, session.model
+        self._info_cache = session.info_cache
+        session.on_commit = self._on_writes_committed; session.on_error = self._on_write_error
+        self.settings.subscribe(self._on_settings_changed)
+        self.master.title(f"Salary Calendar (Рабочий календарь) - {session.name}")
+        if self.model.roll_date(date.today()):
+            session.info_cache.clear()  # профиль лежал с прошлого дня: «сегодня» в суммах устарело
+            session.view = None
+        self.cur_year, self.cur_month = session.view or (self.model.today.year, self.model.today.month)
+        self._apply_colors(self.settings.colors(self.manager.default_colors()))
+        self._draw_calendar()
+        self._schedule_clock()
+
+    def _detach(self):
+        """Отключает активную сессию от окна; она остаётся открытой в пуле."""
+        session = self.session
+        if session is None: return
+        session.park()
+        session.view = (self.cur_year, self.cur_month)
+        session.settings.unsubscribe(self._on_settings_changed)
+        self._cancel_render()
+        if self.after_id is not None:
+            self.master.after_cancel(self.after_id)
+            self.after_id = None
+        self._loading.clear(); self._info_gen += 1; self._today_row = None
+        self.tooltip.hide()
+        if self._year_window is not None: self._year_window.withdraw()
+        self._year_data = None
+        self.session = None
+
+    def switch_profile(self, name):
+        """Переключение в том же окне; недавние профили берутся из пула уже открытыми."""
+        if name == self.profile_name: return
+        previous = self.session
+        self._detach()
+        try:
+            session = self.sessions.get(name)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть профиль {name}: {e}")
+            session = self.sessions.get(previous.name)
+        self._attach(session)
+
+    def _close_session(self, session):
+        session.close()
+        self._close_replica(session.replica)
+
+    def _on_settings_changed(self, changed):
+        # подписчик SettingsStore: новые цвета и ставки применяются без чтения с диска
+        colors = {k[len(COLOR_PREFIX):]: v for k, v in changed.items()
+                  if k.startswith(COLOR_PREFIX) and k[len(COLOR_PREFIX):] in self.colors}
+        if colors:
+            self._apply_colors(colors)
+        if "salary" in changed or "lunch_min" in changed:
+            self.model.set_pay_settings(*self._pay_settings())
+            self._invalidate("grid", "weeks", "salary", "today")
 
     def _start_shift_today(self):
-        if self.today.month != self.cur_month or self.today.year != self.cur_year:
+        today = self.model.today
+        if today.month != self.cur_month or today.year != self.cur_year:
             messagebox.showinfo("Инфо", "Кнопки работают только для текущего дня в текущем месяце")
             return
         now = datetime.now().strftime("%H:%M")
-        day_iso = self.today.isoformat()
-        shift = database.load_shift(self.conn, day_iso)
+        shift = self.shifts.get(today)
         if shift and shift[0]:  # Уже есть активация
             messagebox.showinfo("Инфо", "Смена уже начата")
             return
         # Сохраняем только активацию
-        database.save_shift(self.conn, day_iso, now, None, None, 0, 0, 0, 0, "")
-        self._draw_calendar()
+        self.shifts.save(today, now, None, None, 0, 0, 0, 0, "")
+        self._invalidate("grid", "weeks", "today")
 
     def _end_shift_today(self):
-        if self.today.month != self.cur_month or self.today.year != self.cur_year:
+        today = self.model.today
+        if today.month != self.cur_month or today.year != self.cur_year:
             messagebox.showinfo("Инфо", "Кнопки работают только для текущего дня")
             return
         now = datetime.now().strftime("%H:%M")
-        day_iso = self.today.isoformat()
-        shift = database.load_shift(self.conn, day_iso)
+        shift = self.shifts.get(today)
         if not shift or not shift[0]:
             messagebox.showinfo("Инфо", "Смена не начата")
             return
         if shift[1]:  # Уже есть конец
             messagebox.showinfo("Инфо", "Смена уже закончена")
             return
-        self._on_day_click(self.today)  # Открываем редактирование, чтобы пользователь подтвердил/изменил
-        activation = shift[0]
-        database.save_shift(self.conn, day_iso, activation, now, None, 0, 0, 0, 0, shift[7] or "")
-        self._draw_calendar()
+        self.model.record_shift(today, shift[0], now, shift[7] or "")
+        self._invalidate("grid", "weeks", "salary", "today")
+        self._on_day_click(today)  # Открываем редактирование, чтобы пользователь подтвердил/изменил
+
+    def _on_writes_committed(self):
+        # кэш уже показывает новые значения, из базы перечитываются только суммы
+        self._forget_info()
+        self._prune_written()
+        self._invalidate("salary")
+        if self._year_window is not None and self._year_window.winfo_viewable():
+            self._load_year(self._year_window.year, flush=False)
+
+    def _on_write_error(self, errors):
+        # несохранённые значения неудачных записей кэш уже забыл (ShiftCache.discard_unsaved)
+        self._forget_months()
+        more = f" (и ещё ошибок: {len(errors) - 1})" if len(errors) > 1 else ""
+        messagebox.showerror("Ошибка записи", f"Не удалось сохранить изменения: {errors[0]}{more}")
+        self._draw_calendar(reload=True)
+
+    def _close_replica(self, replica):
+        """Последняя синхронизация локальной копии с шарой; при конфликте спрашивает пользователя."""
+        if replica is None: return
+        replica.stop_background()
+        try:
+            replica.sync()
+        except ReplicaConflict:
+            if messagebox.askyesno("Конфликт", "Профиль изменён на другом компьютере.\n"
+                                   "Перезаписать данные на сервере вашими изменениями?"):
+                replica.sync(force=True)
+            else:
+                path = replica.keep_conflict_copy()
+                messagebox.showinfo("Конфликт", f"Ваши изменения сохранены в {path}")
+                replica.reload()
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить профиль на сервер: {e}")
 
     def _distribute_overtime(self):
-        # Простая реализация: распределить все доступные переработки за текущий месяц
-        pending = database.find_pending_overtimes(self.conn, self.cur_year, self.cur_month)
-        for day_iso, ot_min in pending:
-            if ot_min > 0:
-                events.distribute_overtime_minutes(self.conn, self.cur_year, self.cur_month,
-                                                   1 if day_iso <= f"{self.cur_year}-{self.cur_month:02d}-15" else 2,
-                                                   day_iso, ot_min)
-        self._draw_calendar()
-        messagebox.showinfo("Готово", "Переработки обработаны")
-
-    def _db_exists(self):
-        cur = self.conn.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cur.fetchall()
-        return bool(tables)
-
-    def _load_manual_holidays(self, years):
-        hset = set(); names = {}
-        for y in years:
-            for mday in range(1,10):
-                from datetime import date as _d
-                hset.add(_d(y,1,mday)); names[_d(y,1,mday)]="Новогодние каникулы"
-            from datetime import date as _d
-            names[_d(y,1,7)]="Рождество"; hset.add(_d(y,1,7))
-            names[_d(y,2,23)]="День защитника Отечества"; hset.add(_d(y,2,23))
-            names[_d(y,3,8)]="Международный женский день"; hset.add(_d(y,3,8))
-            names[_d(y,5,1)]="Праздник труда"; hset.add(_d(y,5,1))
-            names[_d(y,5,9)]="День Победы"; hset.add(_d(y,5,9))
-            names[_d(y,6,12)]="День России"; hset.add(_d(y,6,12))
-            names[_d(y,11,4)]="День единства"; hset.add(_d(y,11,4))
-            names[_d(y, 12, 31)] = "Новый год"; hset.add(_d(y, 12, 31))
-        return hset, names
+        # Распределить все доступные переработки за текущий месяц одним проходом
+        self.shifts.flush()
+        plan = events.allocate_month_overtime(self.conn, self.cur_year, self.cur_month)
+        self._draw_calendar(reload=True)
+        total = sum(a.minutes for a in plan.allocations)
+        messagebox.showinfo("Готово", f"Переработки обработаны: распределено {format_minutes_hhmm(total)}")
 
     def _build_ui(self):
         top = ttk.Frame(self.master)
@@ -133,6 +223,10 @@ class CalendarApp:
         self.btn_settings = ttk.Button(top, text="⚙", width=3, command=self._on_settings)
         self.btn_settings.pack(side="right", padx=5)
         self.create_tooltip(self.btn_settings, "Настройки вида")
+
+        self.btn_year = ttk.Button(top, text="📅", width=3, command=self._on_year_view)
+        self.btn_year.pack(side="right", padx=5)
+        self.create_tooltip(self.btn_year, "Обзор года")
         # Панель статуса сверху по центру
         # Две отдельные рамки сверху по центру
         status_container = ttk.Frame(self.master)
@@ -158,8 +252,9 @@ class CalendarApp:
         self.cmb_month.current(self.cur_month-1); self.cmb_month.bind("<<ComboboxSelected>>", self._on_combo)
         self.cmb_month.pack(side="left", padx=6)
         self.cal_frame = ttk.Frame(self.master); self.cal_frame.pack(padx=8, pady=6, fill="both", expand=True)
-        self.day_buttons = {}
-        self._create_calendar_grid()
+        self.cell_dates = {}  # (row, col) -> дата в клетке или None
+        self._hover_rc = None
+        self.renderer = self._create_canvas_grid() if self.grid_renderer == "canvas" else self._create_calendar_grid()
         self.info_frame = ttk.Frame(self.master)
         self.info_frame.pack(side="bottom", fill="x", pady=10)
 
@@ -183,6 +278,8 @@ class CalendarApp:
         left_info.pack(side="left", padx=20)
         self.lbl_pending_overtime = ttk.Label(left_info, text="")
         self.lbl_pending_overtime.pack()
+        self.lbl_allocated = ttk.Label(left_info, text="")
+        self.lbl_allocated.pack()
 
         buttons_frame = ttk.Frame(self.master)
         buttons_frame.pack(side="bottom", fill="x", pady=5)
@@ -194,18 +291,10 @@ class CalendarApp:
 
     def create_tooltip(self, widget, text):
         def enter(event):
-            x = widget.winfo_rootx() + 25
-            y = widget.winfo_rooty() + 25
-            self.tw = tk.Toplevel(widget)
-            self.tw.wm_overrideredirect(True)
-            self.tw.wm_geometry(f"+{x}+{y}")
-            label = tk.Label(self.tw, text=text, background="yellow", relief="solid", borderwidth=1)
-            label.pack()
-        def leave(event):
-            if hasattr(self, 'tw'):
-                self.tw.destroy()
+            self.tooltip.hover(widget, lambda: [text], widget.winfo_rootx() + 25, widget.winfo_rooty() + 25,
+                               background="yellow")
         widget.bind("<Enter>", enter)
-        widget.bind("<Leave>", leave)
+        widget.bind("<Leave>", lambda e: self.tooltip.leave())
 
     def _on_profile(self):
         popup = tk.Menu(self.master, tearoff=0)
@@ -217,10 +306,8 @@ class CalendarApp:
         popup.tk_popup(x, y, 0)
 
     def _change_profile(self):
-        if self.after_id is not None:
-            self.master.after_cancel(self.after_id)
-            self.after_id = None
-        self.master.destroy()
+        name = self.manager.choose_profile_window(self.master)
+        if name: self.switch_profile(name)
 
     def _edit_profile(self):
         dlg = tk.Toplevel(self.master)
@@ -228,8 +315,8 @@ class CalendarApp:
         dlg.resizable(False, False)
         dlg.geometry("400x400")  # ← можно задать размер
         center_window(dlg, 400, 400)  # ← центрируем
-        current_salary = self.base_amount
-        current_lunch = self.lunch_min
+        current_salary = self.model.base_amount
+        current_lunch = self.model.lunch_min
         current_name = self.profile_name
         ttk.Label(dlg, text="Фамилия и Имя:").grid(row=0, column=0, sticky="w", padx=5, pady=2)
         ent_name = ttk.Entry(dlg); ent_name.insert(0, current_name); ent_name.grid(row=0, column=1)
@@ -241,10 +328,11 @@ class CalendarApp:
         ent_pin = ttk.Entry(dlg, show="*"); ent_pin.grid(row=3, column=1)
         ttk.Label(dlg, text="Повторите Пин-Код:").grid(row=4, column=0, sticky="w", padx=5, pady=2)
         ent_repeat = ttk.Entry(dlg, show="*"); ent_repeat.grid(row=4, column=1)
+        ttk.Label(dlg, text="Пересчитать смены с (ГГГГ-ММ-ДД):").grid(row=5, column=0, sticky="w", padx=5, pady=2)
+        ent_since = ttk.Entry(dlg); ent_since.insert(0, self.model.today.replace(day=1).isoformat()); ent_since.grid(row=5, column=1)
         def on_save():
             new_name = ent_name.get().strip()
-            profiles = self.manager.get_profiles()
-            if new_name != current_name and new_name in profiles:
+            if new_name != current_name and self.manager.profile_exists(new_name):
                 messagebox.showerror("Ошибка", "Имя существует")
                 return
             try:
@@ -266,115 +354,158 @@ class CalendarApp:
             if pin and not pin.isdigit():
                 messagebox.showerror("Ошибка", "Пин цифры")
                 return
-            self.manager.save_setting(self.conn, 'salary', str(salary))
-            self.manager.save_setting(self.conn, 'lunch_min', str(lunch_min))
-            self.base_amount = salary
-            self.lunch_min = lunch_min
-            self.required_minutes = 480 + lunch_min
+            since = None
+            if (salary != current_salary or lunch_min != current_lunch) and ent_since.get().strip():
+                try:
+                    since = date.fromisoformat(ent_since.get().strip())
+                except ValueError:
+                    messagebox.showerror("Ошибка", "Дата пересчёта ГГГГ-ММ-ДД")
+                    return
+            self.settings.update({'salary': str(salary), 'lunch_min': str(lunch_min)})  # подписчик обновит модель
+            repriced = self._reprice_shifts(since) if since else None
+            message = "Данные обновлены"
+            if new_name != current_name:
+                view = (self.cur_year, self.cur_month)
+                self._detach()
+                self.sessions.close(current_name)  # файл переименовывается закрытым
+                try:
+                    self.manager.rename_profile(current_name, new_name)
+                except OSError as e:
+                    # файл остался под прежним именем: окно снова открывает его
+                    message += f"\nПрофиль не переименован: {'имя уже занято' if isinstance(e, FileExistsError) else e}"
+                    new_name = current_name
+                else:
+                    if current_name in self.manager.pins:
+                        self.manager.pins[new_name] = self.manager.pins.pop(current_name)
+                session = self.sessions.get(new_name)
+                session.view = view
+                self._attach(session)
             if pin:
                 self.manager.pins[new_name] = pin
-            if new_name != current_name:
-                old_db = self.db_path
-                new_db = os.path.join(self.manager.profiles_dir, f"{new_name}.db")
-                self.conn.close()
-                os.rename(old_db, new_db)
-                self.db_path = new_db
-                self.conn = sqlite3.connect(new_db)
-                if current_name in self.manager.pins:
-                    self.manager.pins[new_name] = self.manager.pins.pop(current_name)
-                self.profile_name = new_name
-                self.master.title(f"Salary Calendar (Рабочий календарь) - {new_name}")
-            self.manager.save_pins()
-            messagebox.showinfo("Успех", "Данные обновлены")
+            try:
+                self.manager.save_pins()
+            except (LockTimeout, OSError) as e:
+                message += f"\nПин-код не сохранён ({e}), запись повторится при следующем сохранении"
+            if repriced:
+                message += (f"\nПересчитано смен: {repriced.changed} из {repriced.scanned}"
+                            f", изменение: {format_cents(repriced.delta_cents)} руб")
+            messagebox.showinfo("Успех", message)
             dlg.destroy()
-            self._draw_calendar()  # Refresh if needed
-        ttk.Button(dlg, text="Сохранить", command=on_save).grid(row=5, column=0, columnspan=2, pady=5)
+            self._draw_calendar(reload=bool(repriced))  # зарплата и обед меняют все части вида
+        ttk.Button(dlg, text="Сохранить", command=on_save).grid(row=6, column=0, columnspan=2, pady=5)
         dlg.grab_set()
         self.master.wait_window(dlg)
 
+    def _reprice_shifts(self, since):
+        """Пересчёт сохранённых смен с даты since по новым окладу и обеду; None при ошибке."""
+        self.shifts.flush()
+        win = tk.Toplevel(self.master)
+        win.title("Пересчёт смен")
+        win.resizable(False, False)
+        lbl = ttk.Label(win, text="Пересчёт смен…"); lbl.pack(padx=10, pady=(10, 4))
+        bar = ttk.Progressbar(win, length=300, mode="determinate"); bar.pack(padx=10, pady=(0, 10))
+        def progress(done, total):
+            bar.config(maximum=max(total, 1), value=done)
+            lbl.config(text=f"Пересчёт смен: {done} из {total}")
+            win.update_idletasks()
+        try:
+            model = self.model
+            result = payroll.reprice_shifts(self.conn, since.isoformat(), model.rates, model.holidays_set,
+                                            model.required_minutes, model.lunch_min, progress=progress)
+            self._forget_months()  # изменились суммы многих месяцев
+            return result
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось пересчитать смены: {e}")
+            return None
+        finally:
+            win.destroy()
+
     def _on_settings(self):
-        dlg = tk.Toplevel(self.master)
-        dlg.title("Настройки Вида")
-        dlg.resizable(False, False)
-        dlg.geometry("500x600")
-        center_window(dlg, 500, 600)
-        colors = self.colors.copy()
-        entries = {}
-        row = 0
-        for k in sorted(colors):
-            rus_names = {
-                "gold": "Дни с переработкой, учтённой в зарплате",
-                "other_month": "Дни другого месяца",
-                "weekday_ok": "Обычный рабочий день",
-                "future_current_month": "Будущие дни текущего месяца",
-                "past_no_data": "Прошлый день без записи",
-                "today": "Сегодняшний день",
-                "weekend": "Выходной или праздник",
-                "undertime": "День с недоработкой",
-                "header_bg": "Фон заголовков и недели",
-                "weekly_overtime": "Неделя с переработкой",
-                "weekly_undertime": "Неделя с недоработкой",
-            }
-
-            row = 0
-            for k in sorted(colors):
-                rus_text = rus_names.get(k, k)  # если вдруг добавится новый цвет — покажем английское имя
-                ttk.Label(dlg, text=rus_text).grid(row=row, column=0, sticky="w", padx=10, pady=8)
-                ent = ttk.Entry(dlg, width=15)
-                ent.insert(0, colors[k])
-                ent.grid(row=row, column=1, padx=10, pady=8)
-                entries[k] = ent
-
-                def choose(color_key=k, entry=ent):
-                    col = colorchooser.askcolor(color=colors[color_key])[1]
-                    if col:
-                        entry.delete(0, tk.END)
-                        entry.insert(0, col)
-
-                ttk.Button(dlg, text="Выбрать цвет", command=choose).grid(row=row, column=2, padx=10, pady=8)
-                row += 1
-        def on_save():
-            for k, ent in entries.items():
-                color = ent.get().strip()
-                if color and len(color) == 7 and color.startswith('#'):  # Basic hex validation
-                    self.manager.save_setting(self.conn, f"color_{k}", color)
-            self.colors = self.manager.load_colors(self.conn)
-            self._draw_calendar()
-            dlg.destroy()
-        ttk.Button(dlg, text="Сохранить", command=on_save).grid(row=row, column=0, columnspan=3, pady=5)
-        dlg.grab_set()
-        self.master.wait_window(dlg)
+        if self._settings_dialog is None:
+            self._settings_dialog = widgets.ColorSettingsDialog(
+                self.master, self.colors, on_preview=self._preview_colors,
+                on_save=lambda colors: self.settings.update(color_settings(colors)),  # перекраску делает подписчик
+                on_cancel=lambda: self._apply_colors(self._saved_colors()))
+            dlg = self._settings_dialog; dlg.update_idletasks()
+            center_window(dlg, dlg.winfo_reqwidth(), dlg.winfo_reqheight())
+        self._settings_dialog.open(self.colors)
+
+    def _saved_colors(self):
+        return self.settings.colors(self.manager.default_colors())
+
+    def _preview_colors(self, colors):
+        # несохранённые цвета из диалога поверх сохранённых; дифф рендерера перекрасит только нужные клетки
+        self._apply_colors(dict(self._saved_colors(), **colors))
+
+    def _apply_colors(self, colors):
+        changed = {k: v for k, v in colors.items() if self.colors.get(k) != v}
+        if not changed: return
+        self.colors.update(changed)
+        if "header_bg" in changed:
+            self.renderer.set_header_bg(changed["header_bg"])
+        if "other_month" in changed:
+            self.renderer.set_background(changed["other_month"])
+        if "past_no_data" in changed:
+            self._show_year()  # пустые дни обзора года
+        self._invalidate("grid", "weeks")
 
     def _logout(self):
-        if self.after_id is not None:
-            self.master.after_cancel(self.after_id)
-            self.after_id = None
-        self.master.destroy()
+        # все профили закрываются (с отправкой на шару), окно прячется до выбора следующего
+        self._detach()
+        self.sessions.close_all()
+        self.master.withdraw()
+        name = self.manager.choose_profile_window(self.master)
+        if not name:
+            self.master.destroy(); return
+        self._attach(self.sessions.get(name))
+        self.master.deiconify()
 
     def _prev_month(self):
         if self.cur_month == 1:
             self.cur_month = 12; self.cur_year -= 1
         else:
             self.cur_month -= 1
-        self._draw_calendar()
+        self._invalidate("header", "grid", "weeks", "salary")
 
     def _next_month(self):
         if self.cur_month == 12:
             self.cur_month = 1; self.cur_year += 1
         else:
             self.cur_month += 1
-        self._draw_calendar()
+        self._invalidate("header", "grid", "weeks", "salary")
 
     def _on_spin(self):
         try:
             self.cur_year = int(self.spin_year.get())
-            self._draw_calendar()
+            self._invalidate("header", "grid", "weeks", "salary")
         except:
             pass
 
     def _on_combo(self, event):
         self.cur_month = self.cmb_month.current() + 1
-        self._draw_calendar()
+        self._invalidate("header", "grid", "weeks", "salary")
+
+    def _create_canvas_grid(self):
+        # вся сетка - один холст; щелчки и подсказки по CanvasGridRenderer.cell_at
+        canvas = tk.Canvas(self.cal_frame, highlightthickness=0, bg=self.colors["other_month"])
+        canvas.pack(fill="both", expand=True)
+        renderer = CanvasGridRenderer(canvas, self.colors["header_bg"])
+        canvas.bind("<Configure>", lambda e: renderer.resize(e.width, e.height))
+        canvas.bind("<Motion>", self._on_grid_motion)
+        canvas.bind("<Leave>", lambda e: self._on_grid_motion(e, leave=True))
+        canvas.bind("<Button-1>", self._on_grid_click)
+        return renderer
+
+    def _on_grid_motion(self, event, leave=False):
+        rc = None if leave else self.renderer.cell_at(event.x, event.y)
+        if rc == self._hover_rc: return
+        self._hover_rc = rc
+        if rc: self._show_tooltip(event, rc)
+        else: self._hide_tooltip()
+
+    def _on_grid_click(self, event):
+        d = self.cell_dates.get(self.renderer.cell_at(event.x, event.y))
+        if d: self._on_day_click(d)
 
     def _create_calendar_grid(self):
         # Настраиваем растягивание клеток
@@ -385,6 +516,7 @@ class CalendarApp:
 
         # Заголовки дней недели (Пн-Вс в столбцах 1-7)
         days_headers = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+        headers = []
         for c, txt in enumerate(days_headers):
             lbl = tk.Label(
                 self.cal_frame,
@@ -395,6 +527,7 @@ class CalendarApp:
                 font=("Segoe UI", 10, "bold")
             )
             lbl.grid(row=0, column=c + 1, sticky="nsew")
+            headers.append(lbl)
 
         # Заголовок "Неделя" справа
         week_header = tk.Label(
@@ -406,8 +539,10 @@ class CalendarApp:
             font=("Segoe UI", 10, "bold")
         )
         week_header.grid(row=0, column=8, sticky="nsew")
+        headers.append(week_header)
 
         # Кнопки дней и метки недель
+        buttons = {}; week_labels = {}
         for r in range(1, 7):
             # Метка недели справа (столбец 8)
             week_lbl = tk.Label(
@@ -419,6 +554,7 @@ class CalendarApp:
                 font=("Segoe UI", 10)
             )
             week_lbl.grid(row=r, column=8, sticky="nsew")
+            week_labels[r] = week_lbl
 
             # Кнопки дней (столбцы 1-7)
             for c in range(1, 8):
@@ -428,229 +564,291 @@ class CalendarApp:
                     width=12,
                     height=6,  # ← увеличил высоту
                     relief="flat",
-                    command=lambda row=r, col=c: self._on_day_click(self.day_buttons[(row, col)]["date"])
+                    command=lambda rc=(r, c): self._on_day_click(self.cell_dates[rc])
                 )
                 btn.grid(row=r, column=c, sticky="nsew")
-                self.day_buttons[(r, c)] = {"btn": btn, "date": None}  # ← исправлено: было c+1
+                buttons[(r, c)] = btn
                 btn.bind("<Enter>", lambda e, rc=(r, c): self._show_tooltip(e, rc))  # ← исправлено: было c+1
                 btn.bind("<Leave>", lambda e: self._hide_tooltip())
-
-
-    def _draw_calendar(self):
-        self.lbl_month.config(text=f"{calendar.month_name[self.cur_month]} {self.cur_year}")
-        self.spin_year.delete(0, "end")
-        self.spin_year.insert(0, str(self.cur_year))
-        self.cmb_month.current(self.cur_month - 1)
-
-        cal = calendar.Calendar()
-        weeks = cal.monthdatescalendar(self.cur_year, self.cur_month)
-        num_weeks = len(weeks)  # 4, 5 или 6
-
+        return GridRenderer(buttons, week_labels, headers)
+
+
+    def _visible_weeks(self):
+        return self.model.visible_weeks(self.cur_year, self.cur_month)
+
+    def _draw_calendar(self, reload=False):
+        self._invalidate(*VIEW_PARTS, reload=reload)
+
+    def _invalidate(self, *parts, reload=False):
+        """Помечает части вида устаревшими; все пометки до простоя Tk дают один проход _render."""
+        self._dirty.update(parts or VIEW_PARTS)
+        self._reload_month = self._reload_month or reload
+        if self._render_id is None:
+            self._render_id = self.master.after_idle(self._render)
+
+    def _cancel_render(self):
+        if self._render_id is not None:
+            self.master.after_cancel(self._render_id)
+            self._render_id = None
+        self._dirty.clear()
+
+    def _render(self):
+        self._render_id = None
+        parts, reload = self._dirty, self._reload_month
+        self._dirty = set(); self._reload_month = False
+        self.render_stats["passes"] += 1
+        self.render_stats["invalidations"] += len(parts)
+        if "header" in parts:
+            self.lbl_month.config(text=f"{calendar.month_name[self.cur_month]} {self.cur_year}")
+            self.spin_year.delete(0, "end")
+            self.spin_year.insert(0, str(self.cur_year))
+            self.cmb_month.current(self.cur_month - 1)
+        if reload:
+            self._forget_info()
+        if "grid" in parts or "weeks" in parts or reload:
+            weeks = self._visible_weeks()
+            start, end = weeks[0][0], weeks[-1][-1]
+            loaded = self.shifts.holds(start, end)
+            if reload or (not loaded and ("month", start, end) not in self._loading):
+                self._request_month(start, end)  # один запрос на все видимые недели, в фоне
+            self._render_grid(weeks, placeholder=not loaded)
+        if "salary" in parts:
+            self._update_info_labels()
+        if "today" in parts:
+            self._update_today_panel()
+        if "grid" in parts or "salary" in parts:
+            self._prefetch_neighbours()
+
+    def _month_range(self, year, month):
+        weeks = self.model.visible_weeks(year, month)
+        return weeks[0][0], weeks[-1][-1]
+
+    def _request_month(self, start, end, tag="month"):
+        if tag == "month":
+            self.queries.cancel("month")  # пользователь уже ушёл с прежнего месяца
+            for key in [k for k, t in self._loading.items() if t == "month"]: del self._loading[key]
+        seq = self.shifts.seq
+        if ("month", start, end) in self._loading:  # прежний запрос того же диапазона ещё может ответить
+            seq = min(seq, self._month_seqs.get((start, end), seq))
+        self._loading[("month", start, end)] = tag
+        self._month_seqs[(start, end)] = seq
+        self.queries.submit(ShiftCache.fetch, start.isoformat(), end.isoformat(), tag=tag,
+                            on_result=lambda res: self._on_month_loaded(start, end, res, seq),
+                            on_error=self._on_query_error)
+
+    def _on_month_loaded(self, start, end, result, seq=None):
+        self._loading.pop(("month", start, end), None)
+        self.shifts.fill(start, end, *result, seq=seq)
+        self._prune_written()
+        weeks = self._visible_weeks()
+        if (weeks[0][0], weeks[-1][-1]) == (start, end):
+            self._invalidate("grid", "weeks", "today")
+
+    def _prune_written(self):
+        # номера записей нужны fill() только против ответов, запрошенных раньше них
+        self._month_seqs = {k: s for k, s in self._month_seqs.items() if ("month", *k) in self._loading}
+        self.shifts.prune_written(min(self._month_seqs.values(), default=self.shifts.seq))
+
+    def _prefetch_neighbours(self):
+        """Фоновая загрузка соседних месяцев и их сумм, чтобы ◀/▶ рисовались из памяти.
+
+        Предзагрузки для месяцев, которые больше не соседние (прыжок по году),
+        снимаются с очереди пула.
+        """
+        y, m = self.cur_year, self.cur_month
+        neighbours = [(y - 1, 12) if m == 1 else (y, m - 1), (y + 1, 1) if m == 12 else (y, m + 1)]
+        wanted = {("month",) + self._month_range(*ym) for ym in neighbours} | {("info",) + ym for ym in neighbours}
+        current = {("month",) + self._month_range(y, m), ("info", y, m)}  # их предзагрузка тоже пригодится
+        for key, tag in list(self._loading.items()):
+            if tag != "month" and key not in wanted and key not in current:
+                self.queries.cancel(tag)
+                del self._loading[key]
+        for key in sorted(wanted - current):
+            if key in self._loading: continue
+            if key[0] == "month":
+                if not self.shifts.holds(*key[1:], touch=False):
+                    self._request_month(*key[1:], tag=("prefetch",) + key)
+            elif key[1:] not in self._info_cache:
+                self._request_info(*key[1:], tag=("prefetch",) + key)
+
+    def _request_info(self, year, month, tag):
+        self._loading[("info", year, month)] = tag
+        gen = self._info_gen
+        def done(info):
+            self._loading.pop(("info", year, month), None)
+            self._remember_info(year, month, info, gen)
+            self._on_info_loaded(year, month, info)  # пользователь мог уже перейти на этот месяц
+        self.queries.submit(fetch_period_info, year, month, self.model.today.isoformat(), tag=tag,
+                            on_result=done, on_error=self._on_query_error)
+
+    def _remember_info(self, year, month, info, gen):
+        if gen != self._info_gen: return  # суммы посчитаны до записи, которая их изменила
+        self._info_cache[(year, month)] = info
+        self._info_cache.move_to_end((year, month))
+        while len(self._info_cache) > INFO_CACHE_SIZE:
+            self._info_cache.popitem(last=False)
+
+    def _forget_months(self):
+        """Сбросить загруженные и загружаемые месяцы; видимый перечитается при отрисовке."""
+        for key in [k for k in self._loading if k[0] == "month"]:
+            self.queries.cancel(self._loading.pop(key))
+        self.shifts.clear()
+
+    def _forget_info(self):
+        self._info_cache.clear(); self._info_gen += 1
+        for key in [k for k in self._loading if k[0] == "info"]:
+            self.queries.cancel(self._loading.pop(key))
+
+    def _on_query_error(self, error):
+        messagebox.showerror("Ошибка чтения", f"Не удалось загрузить данные: {error}")
+
+    def _render_grid(self, weeks, placeholder=False):
+        cells, week_states = self._month_model(weeks, placeholder)
+        self.renderer.apply(cells, week_states, len(weeks))
+
+    def _month_model(self, weeks, placeholder=False):
+        """Переводит CalendarModel.month_view в опции виджетов сетки."""
+        # placeholder: данные месяца ещё не пришли - показываем только числа
+        view = self.model.month_view(self.cur_year, self.cur_month, weeks, placeholder)
+        cells = {}; week_states = {}
         for r in range(1, 7):
-            if r > num_weeks:  # скрываем лишние строки
-                for c in range(9):
-                    widget = self.cal_frame.grid_slaves(row=r, column=c)
-                    if widget:
-                        widget[0].grid_remove()  # скрываем
+            if r - 1 >= len(view):
+                # Если неделя закончилась — отключаем кнопки
+                for c in range(1, 8):
+                    self.cell_dates[(r, c)] = None
+                    cells[(r, c)] = {"text": "", "state": "disabled", "bg": self.colors["other_month"]}  # серый фон для дней вне месяца
+                week_states[r] = {"bg": self.colors["header_bg"], "text": ""}
                 continue
-
-        for r in range(1, 7):
-            weekly_total_min = 0
-            for c in range(1, 8):
-                btn_dict = self.day_buttons[(r, c)]
-                btn = btn_dict["btn"]
-
-                # Если неделя закончилась — отключаем кнопку
-                if r - 1 >= len(weeks):
-                    btn.config(
-                        text="",
-                        state="disabled",
-                        bg=self.colors["other_month"]  # серый фон для дней вне месяца
-                    )
-                    continue
-
-                d = weeks[r - 1][c - 1]
-                btn_dict["date"] = d
-
-                # Определяем цвет дня
-                color = self._color_for_day(d)
-
-                # Применяем настройки кнопки
-                btn.config(
-                    text=str(d.day),
-                    state="normal",
-                    bg=color,
-                    fg="black",  # цвет текста (можно менять)
-                    relief="flat"  # плоский вид, как у ttk
-                )
-
-                # Считаем время за неделю
-                # Считаем время за неделю (без обеда)
-                shift = database.load_shift(self.conn, d.isoformat())
-                if shift:
-                    work_min = shift[2] or 0
-                    if work_min > 480:  # если больше 8 часов — вычитаем обед
-                        work_min -= self.lunch_min
-                    weekly_total_min += work_min
-
-            # Обновляем метку недели справа
-            week_lbl = self.cal_frame.grid_slaves(row=r, column=8)[0]
-            if weekly_total_min > 0:
-                week_color = (self.colors["weekly_overtime"] if weekly_total_min > 5 * 480 else
-                              self.colors["weekly_undertime"] if weekly_total_min < 5 * 480 else
-                              self.colors["header_bg"])
-                week_lbl.config(bg=week_color, text=format_minutes_hhmm(weekly_total_min))
-            else:
-                week_lbl.config(bg=self.colors["header_bg"], text="")
-
-        self._update_info_labels()
-
-    def _color_for_day(self, d):
-        if d.month != self.cur_month:
-            return self.colors["other_month"]
-        if d > self.today and d.month == self.cur_month:
-            return self.colors["future_current_month"]  # новый цвет
-        if d == self.today:
-            return self.colors["today"]
-        if d < self.today:
-            return self.colors["past_no_data"] if not shift else (
-                self.colors["undertime"] if (shift[3] or 0) > 0 else self.colors["weekday_ok"] if not is_weekend else
-                self.colors["weekend"])
-        # Будущие дни
-        if shift:
-            return self.colors["undertime"] if (shift[3] or 0) > 0 else self.colors["weekday_ok"] if not is_weekend else \
-            self.colors["weekend"]
-        return self.colors["weekday_ok"] if not is_weekend else self.colors["weekend"]
+            row = view[r - 1]
+            for c, cell in enumerate(row.days, start=1):
+                self.cell_dates[(r, c)] = cell.date
+                cells[(r, c)] = {
+                    "text": str(cell.date.day),
+                    "state": "normal",
+                    "bg": self.colors[cell.kind],
+                    "fg": "black",  # цвет текста (можно менять)
+                    "relief": "flat",  # плоский вид, как у ttk
+                }
+            # Метка недели справа: время без обеда
+            week_states[r] = {"bg": self.colors[row.kind or "header_bg"],
+                              "text": format_minutes_hhmm(row.total_min) if row.kind else ""}
+        return cells, week_states
 
     def _show_tooltip(self, event, rc):
-        d = self.day_buttons[rc]["date"]
-        if not d: return
-        shift = database.load_shift(self.conn, d.isoformat())
-        lines = self._tooltip_lines_for_day(d, shift)
-        if not lines: return
-        self.tooltip = widgets.Tooltip(self.master, lines, lambda: self._on_day_click(d))
-        x, y = event.x_root + 10, event.y_root + 10
-        self.tooltip.show_at(x, y)
+        d = self.cell_dates.get(rc)
+        if not d:
+            self.tooltip.leave(); return
+        self.tooltip.hover(("day", d), lambda: self._day_tooltip_lines(d), event.x_root + 10, event.y_root + 10,
+                           action=lambda: self._on_day_click(d))
+
+    def _day_tooltip_lines(self, d):
+        # только из кэша месяца: пока он грузится, подсказки нет
+        known, shift = self.shifts.peek(d)
+        if not known or not self.shifts.covers(d): return None
+        return self.model.day_lines(d, shift, self.shifts.ledger_for(d))
 
     def _hide_tooltip(self):
-        if self.tooltip: self.tooltip.close(); self.tooltip = None
-
-    def _tooltip_lines_for_day(self, d, shift):
-        lines = [d.strftime("%d %B %Y")]
-        if d in self.holidays_names:
-            lines.append(self.holidays_names[d])
-        if shift:
-            act = shift[0] or "Нет"
-            end = shift[1] or "Нет"
-            duration = format_minutes_hhmm(shift[2] or 0)
-            undertime = format_minutes_hhmm(shift[3] or 0)
-            overtime = format_minutes_hhmm(shift[4] or 0)
-            day_pay = cents_to_money(shift[5] or 0)  # ← исправлено: было 6
-            ot_pay = cents_to_money(shift[6] or 0)  # ← исправлено: было 7
-            notes = shift[7] or "Нет заметок"  # ← исправлено: было 8
-            lines += [
-                f"Активация: {act}",
-                f"Окончание: {end}",
-                f"Длительность: {duration}",
-                f"Недоработка: {undertime}",
-                f"Переработка: {overtime}",
-                f"Оплата дня: {day_pay} руб",
-                f"Оплата ОТ: {ot_pay} руб",
-                f"Заметки: {notes[:50]}..." if len(notes or "") > 50 else f"Заметки: {notes}"
-            ]
-        return lines
+        self.tooltip.leave()
 
     def _on_day_click(self, d):
-        if self.tooltip: self.tooltip.close()
-        existing = database.load_shift(self.conn, d.isoformat()) or {}
+        self.tooltip.hide()
+        existing = self.shifts.get(d) or {}
         existing_dict = {"activation": existing[0], "end": existing[1], "notes": existing[7]} if existing else {}
-        dlg = widgets.EditShiftDialog(self.master, d, existing_dict, self.conn, self.lunch_min)
+        dlg = widgets.EditShiftDialog(self.master, d, existing_dict, self.model.lunch_min)
         self.master.wait_window(dlg)
         if not dlg.result: return
         if dlg.result.get("deleted"):
-            self._draw_calendar()
-            return
-        activation = dlg.result["activation"]
-        end = dlg.result["end"]
-        notes = dlg.result["notes"]
-        duration_min = self._calculate_duration(activation, end)
-        hourly = calculations.hourly_rate_for_month(d.year, d.month, self.holidays_set, self.base_amount)
-        is_weekend = d.weekday() >= 5 or d in self.holidays_set
-        if not is_weekend:
-            undertime_min = max(0, self.required_minutes - duration_min)
-            overtime_min = max(0, duration_min - self.required_minutes)
-            day_pay_cents = calculations.day_base_pay(hourly)
-            overtime_pay_cents = calculations.calc_overtime_pay_minutes(overtime_min, hourly)
+            self.model.delete_shift(d)
         else:
-            undertime_min = 0
-            overtime_min = 0
-            day_pay_cents = calculations.weekend_pay_for_duration(duration_min, hourly, self.lunch_min)
-            overtime_pay_cents = 0
-        database.save_shift(self.conn, d.isoformat(), activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes)
-        self._draw_calendar()
-
-    def _calculate_duration(self, act, end):
-        if not act or not end: return 0
-        try:
-            act_dt = datetime.strptime(act, "%H:%M")
-            end_dt = datetime.strptime(end, "%H:%M")
-            if end_dt < act_dt: end_dt += timedelta(days=1)
-            return int((end_dt - act_dt).total_seconds() / 60)
-        except:
-            return 0
+            self.model.record_shift(d, dlg.result["activation"], dlg.result["end"], dlg.result["notes"])
+        self._invalidate("grid", "weeks", "salary", "today")
+
+    def _on_year_view(self):
+        if self._year_window is None:
+            self._year_window = widgets.YearOverviewWindow(self.master, self.colors["past_no_data"], on_year=self._load_year,
+                                                           on_metric=self._show_year, on_month=self._open_month)
+        self._year_window.deiconify(); self._year_window.lift()
+        self._load_year(self.cur_year)
+
+    def _load_year(self, year, flush=True):
+        # год целиком - два запроса в пуле (смены по дням и суммы pay_periods)
+        if flush: self.shifts.flush()  # несохранённые смены должны попасть в итоги
+        self._year_window.set_loading(year)
+        self.queries.cancel("year")
+        self.queries.submit(fetch_year_overview, year, tag="year",
+                            on_result=lambda overview: self._on_year_loaded(year, overview), on_error=self._on_query_error)
+
+    def _on_year_loaded(self, year, overview):
+        self._year_data = (year, overview)
+        self._show_year()
+
+    def _show_year(self):
+        if self._year_data is None: return
+        year, overview = self._year_data
+        self._year_window.show(year, self.model.year_view(year, overview, self._year_window.metric.get()),
+                               self.colors["past_no_data"])
+
+    def _open_month(self, year, month):
+        self.cur_year, self.cur_month = year, month
+        self._invalidate("header", "grid", "weeks", "salary")
+        self.master.lift()
 
     def _update_info_labels(self):
-        # Расчёт зарплаты за периоды
-        prev_month = self.cur_month - 1
-        prev_year = self.cur_year
-        if prev_month == 0:
-            prev_month = 12
-            prev_year -= 1
-
-        # Зарплата за 16-30(31) предыдущего месяца (выплата 14-го текущего)
-        last_day_prev = calendar.monthrange(prev_year, prev_month)[1]
-        second_start_prev = date(prev_year, prev_month, 16).isoformat()
-        second_end_prev = date(prev_year, prev_month, last_day_prev).isoformat()
-        second_shifts_prev = database.list_shifts_between(self.conn, second_start_prev, second_end_prev)
-        salary_second_prev = sum(cents_to_money(s[5] + s[6] or 0) for s in second_shifts_prev)  # day_pay + overtime_pay
-
-        # Зарплата за 1-15 текущего месяца (выплата 29-го)
-        first_start = date(self.cur_year, self.cur_month, 1).isoformat()
-        first_end = date(self.cur_year, self.cur_month, 15).isoformat()
-        first_shifts = database.list_shifts_between(self.conn, first_start, first_end)
-        salary_first = sum(cents_to_money(s[5] + s[6] or 0) for s in first_shifts)
-
-        pending = database.find_pending_overtimes(self.conn, self.cur_year, self.cur_month)
-        pending_ot = sum(row[1] or 0 for row in pending)
-
-        self.lbl_salary_second_prev.config(text=f"{salary_second_prev:.2f} руб")
-        self.lbl_salary_first.config(text=f"{salary_first:.2f} руб")
-        self.lbl_pending_overtime.config(text=f"Нераспределенная переработка: {format_minutes_hhmm(pending_ot)}")
-
+        # Суммы за периоды считаются в пуле запросов; до ответа показываем заглушки
+        year, month = self.cur_year, self.cur_month
+        self.queries.cancel("info")
+        if (year, month) in self._info_cache:
+            self._info_cache.move_to_end((year, month))
+            self._on_info_loaded(year, month, self._info_cache[(year, month)])
+            return
+        for lbl in (self.lbl_salary_second_prev, self.lbl_salary_first):
+            if not lbl.cget("text"): lbl.config(text="…")
+        if ("info", year, month) in self._loading: return  # уже считается предзагрузкой
+        gen = self._info_gen
+        def done(info):
+            self._remember_info(year, month, info, gen)
+            self._on_info_loaded(year, month, info)
+        self.queries.submit(fetch_period_info, year, month, self.model.today.isoformat(), tag="info",
+                            on_result=done, on_error=self._on_query_error)
+
+    def _on_info_loaded(self, year, month, info):
+        if (year, month) != (self.cur_year, self.cur_month): return
+        self.lbl_salary_second_prev.config(text=f"{format_cents(info['second_prev_cents'])} руб")
+        self.lbl_salary_first.config(text=f"{format_cents(info['first_cents'])} руб")
+        self.lbl_pending_overtime.config(text=f"Нераспределенная переработка: {format_minutes_hhmm(info['pending_ot'])}")
+        self.lbl_allocated.config(text=f"Закрыто переработкой за месяц: {format_minutes_hhmm(info['allocated_min'])}"
+                                       f", доп.оплата: {format_cents(info['extra_cents'])} руб")
+        self._today_row = info["today"]
+        self._update_today_panel()
+
+    def _today_shift(self):
+        known, today_shift = self.shifts.peek(self.model.today)
+        return today_shift if known else self._today_row
+
+    def _update_today_panel(self):
         # Ожидаемый конец смены и заработок сегодня
-        today_iso = self.today.isoformat()
-        today_shift = database.load_shift(self.conn, today_iso)
-
-        if today_shift and today_shift[0]:  # есть время активации
-            try:
-                act_time = datetime.strptime(today_shift[0], "%H:%M")
-                expected = act_time + timedelta(hours=8) + timedelta(minutes=self.lunch_min)
-                self.lbl_expected_end.config(text=expected.strftime("%H:%M"))
+        status = self.model.today_status(self._today_shift(), datetime.now())
+        self.lbl_expected_end.config(text=status.expected_end or "—")
+        self.lbl_today_earn.config(text=f"{format_cents(status.earn_cents)} руб")
+        self._schedule_clock()
 
-                earn_today = cents_to_money((today_shift[5] or 0) + (today_shift[6] or 0))
-                self.lbl_today_earn.config(text=f"{earn_today:.2f} руб")
-            except:
-                self.lbl_expected_end.config(text="—")
-                self.lbl_today_earn.config(text="0.00 руб")
-        else:
-            self.lbl_expected_end.config(text="—")
-            self.lbl_today_earn.config(text="0.00 руб")
-
-    def _start_timer(self):
+    def _schedule_clock(self):
         if self.after_id is not None:
             self.master.after_cancel(self.after_id)
-        self._draw_calendar()
-        self.after_id = self.master.after(60000, self._start_timer)
+        now = datetime.now()
+        delay_ms = int((self.model.next_wakeup(self._today_shift(), now) - now).total_seconds() * 1000) + 50
+        self.after_id = self.master.after(max(delay_ms, 50), self._on_clock)
+
+    def _on_clock(self):
+        self.after_id = None
+        if self.model.roll_date(date.today()):
+            # полночь: меняются только клетки вчера/сегодня, остальное отсечёт дифф рендерера
+            self._today_row = None
+            self._forget_info()
+            self._invalidate("grid", "weeks", "salary", "today")
+        else:
+            self._invalidate("today")
+        self._schedule_clock()
 
 if __name__ == "__main__":
     # For testing, but use run.py
@@ -0,0 +1,280 @@
+"""Модель календаря без Tk: расчёт смен, вид месяца, итоги недель, зарплаты и статус дня.
+
+Возвращает простые данные (кортежи, словари, ключи цветов); CalendarApp
+только переводит их в виджеты. Модуль можно импортировать без дисплея,
+поэтому им пользуются пакетные задачи и замеры.
+"""
+import calendar
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from . import calculations, database
+from .constants import format_cents, format_minutes_hhmm
+from .shift_cache import ShiftCache
+
+DayCell = namedtuple("DayCell", "date kind shift")  # kind - ключ цвета из настроек профиля
+WeekRow = namedtuple("WeekRow", "days total_min kind")
+TodayStatus = namedtuple("TodayStatus", "expected_end earn_cents running")
+YearMonthRow = namedtuple("YearMonthRow", "month days total_min salary_cents")  # days: [(дата, минуты, уровень)]
+
+WEEK_NORM_MIN = 5 * 480
+# Границы уровней тепловой карты года (минуты): уровень 0 - нет данных или ноль
+HEAT_THRESHOLDS = {"worked": (1, 241, 481, 601), "undertime": (1, 31, 121, 241), "overtime": (1, 31, 121, 241)}
+
+@lru_cache(maxsize=8)
+def load_holidays(years):
+    """(множество праздничных дат, {дата: название}) за годы years.
+
+    Результат общий для всех профилей с теми же годами: не изменять.
+    """
+    hset = set(); names = {}
+    for y in years:
+        for mday in range(1, 10):
+            hset.add(date(y, 1, mday)); names[date(y, 1, mday)] = "Новогодние каникулы"
+        names[date(y, 1, 7)] = "Рождество"; hset.add(date(y, 1, 7))
+        names[date(y, 2, 23)] = "День защитника Отечества"; hset.add(date(y, 2, 23))
+        names[date(y, 3, 8)] = "Международный женский день"; hset.add(date(y, 3, 8))
+        names[date(y, 5, 1)] = "Праздник труда"; hset.add(date(y, 5, 1))
+        names[date(y, 5, 9)] = "День Победы"; hset.add(date(y, 5, 9))
+        names[date(y, 6, 12)] = "День России"; hset.add(date(y, 6, 12))
+        names[date(y, 11, 4)] = "День единства"; hset.add(date(y, 11, 4))
+        names[date(y, 12, 31)] = "Новый год"; hset.add(date(y, 12, 31))
+    return hset, names
+
+def calculate_duration(act, end) -> int:
+    """Минуты между HH:MM активации и окончания; смена может переходить через полночь."""
+    if not act or not end: return 0
+    try:
+        act_dt = datetime.strptime(act, "%H:%M")
+        end_dt = datetime.strptime(end, "%H:%M")
+        if end_dt < act_dt: end_dt += timedelta(days=1)
+        return int((end_dt - act_dt).total_seconds() / 60)
+    except ValueError:
+        return 0
+
+def fetch_period_info(conn, year, month, today_iso):
+    """Данные нижней панели за один заход в базу; может выполняться в пуле QueryExecutor.
+
+    Суммы берутся из итогов полумесяцев pay_periods (их ведут триггеры на shifts).
+    С today_iso=None смена «сегодня» не читается (отчёты), в ответе None.
+    """
+    prev_year, prev_month = (year - 1, 12) if month == 1 else (year, month - 1)
+    month_end = date(year, month, calendar.monthrange(year, month)[1]).isoformat()
+    allocated_min, extra_cents = database.ledger_summary_between(conn, date(year, month, 1).isoformat(), month_end)
+    periods = database.load_pay_periods(conn, (prev_year, prev_month), (year, month))
+    empty = (0, 0, 0, 0, 0)
+    halves = [periods.get((year, month, half), empty) for half in (1, 2)]
+    second_prev = periods.get((prev_year, prev_month, 2), empty)
+    return {
+        # Зарплата 14 числа: 16-30(31) предыдущего месяца; 29 числа: 1-15 текущего
+        "second_prev_cents": second_prev[0] + second_prev[1],
+        "first_cents": halves[0][0] + halves[0][1],
+        "pending_ot": halves[0][2] + halves[1][2],
+        "undertime_min": halves[0][3] + halves[1][3],
+        "allocated_min": allocated_min,
+        "extra_cents": extra_cents,
+        "today": database.load_shift(conn, today_iso) if today_iso else None,
+    }
+
+def fetch_year_overview(conn, year):
+    """Данные обзора года двумя запросами: минуты смен по дням и суммы месяцев из pay_periods."""
+    return database.year_day_minutes(conn, year), database.month_pay_totals(conn, year)
+
+class CalendarModel:
+    """Данные и правила одного профиля поверх ShiftCache.
+
+    Настройки оплаты (оклад, обед) передаются явно; праздники строятся
+    load_holidays за holiday_years. today - текущая дата модели, её
+    сдвигает roll_date().
+    """
+    def __init__(self, shifts:ShiftCache, base_amount:Decimal, lunch_min:int,
+                 holiday_years=range(2024, 2028), today:date=None):
+        self.shifts = shifts
+        self.holidays_set, self.holidays_names = load_holidays(holiday_years)
+        self.base_amount = base_amount
+        self.lunch_min = lunch_min
+        self.required_minutes = 480 + lunch_min  # 8h + lunch
+        self.rates = calculations.RateTable(self.holidays_set, base_amount)
+        self.today = today or date.today()
+
+    def set_pay_settings(self, base_amount:Decimal, lunch_min:int):
+        self.base_amount = base_amount
+        self.rates.set_base_amount(base_amount)
+        self.lunch_min = lunch_min
+        self.required_minutes = 480 + lunch_min
+
+    def roll_date(self, today:date) -> bool:
+        """Переход на новую дату; True, если она сменилась."""
+        if today == self.today: return False
+        self.today = today
+        return True
+
+    def is_weekend(self, d:date) -> bool:
+        return d.weekday() >= 5 or d in self.holidays_set
+
+    # --- смены ---
+
+    def price_day(self, d:date, duration_min:int):
+        """(недоработка, переработка, оплата дня, оплата ОТ) для смены длиной duration_min."""
+        rate_cents = self.rates.hourly_rate_cents(d.year, d.month)
+        if not self.is_weekend(d):
+            undertime_min = max(0, self.required_minutes - duration_min)
+            overtime_min = max(0, duration_min - self.required_minutes)
+            day_pay_cents = calculations.day_base_pay_int(rate_cents)
+            overtime_pay_cents = calculations.calc_overtime_pay_minutes_int(overtime_min, rate_cents)
+        else:
+            undertime_min = 0
+            overtime_min = 0
+            day_pay_cents = calculations.weekend_pay_for_duration_int(duration_min, rate_cents, self.lunch_min)
+            overtime_pay_cents = 0
+        return undertime_min, overtime_min, day_pay_cents, overtime_pay_cents
+
+    def record_shift(self, d:date, activation, end, notes):
+        """Считает и сохраняет смену; возвращает строку в порядке database.load_shift."""
+        duration_min = calculate_duration(activation, end)
+        row = (activation, end, duration_min) + self.price_day(d, duration_min) + (notes,)
+        self.shifts.save(d, *row)
+        return row
+
+    def delete_shift(self, d:date):
+        self.shifts.delete(d)
+
+    # --- вид месяца ---
+
+    @staticmethod
+    def visible_weeks(year:int, month:int):
+        return calendar.Calendar().monthdatescalendar(year, month)
+
+    def day_kind(self, d:date, shift, month:int) -> str:
+        is_weekend = self.is_weekend(d)
+        if d.month != month:
+            return "other_month"
+        if d > self.today:
+            return "future_current_month"
+        if d == self.today:
+            return "today"
+        if not shift:
+            return "past_no_data"
+        return "undertime" if (shift[3] or 0) > 0 else "weekend" if is_weekend else "weekday_ok"
+
+    def worked_minutes(self, shift) -> int:
+        """Время смены без обеда (обед вычитается, если смена длиннее 8 часов)."""
+        return self.net_minutes(shift[2] or 0)
+
+    def net_minutes(self, duration_min:int) -> int:
+        if duration_min > 480:
+            duration_min -= self.lunch_min
+        return duration_min
+
+    @staticmethod
+    def week_kind(total_min:int):
+        if total_min <= 0: return None
+        return ("weekly_overtime" if total_min > WEEK_NORM_MIN else
+                "weekly_undertime" if total_min < WEEK_NORM_MIN else "header_bg")
+
+    def month_view(self, year:int, month:int, weeks=None, placeholder=False):
+        """Недели месяца: WeekRow(days=[DayCell], total_min, kind).
+
+        placeholder: данные месяца ещё не загружены - только даты, без смен.
+        """
+        rows = []
+        for week in weeks or self.visible_weeks(year, month):
+            days = []; total = 0
+            for d in week:
+                if placeholder:
+                    days.append(DayCell(d, "other_month" if d.month != month else "past_no_data", None))
+                    continue
+                shift = self.shifts.get(d)
+                days.append(DayCell(d, self.day_kind(d, shift, month), shift))
+                if shift: total += self.worked_minutes(shift)
+            rows.append(WeekRow(days, total, self.week_kind(total)))
+        return rows
+
+    def day_lines(self, d:date, shift, ledger=(0, 0, 0)):
+        """Строки подсказки дня."""
+        lines = [d.strftime("%d %B %Y")]
+        if d in self.holidays_names:
+            lines.append(self.holidays_names[d])
+        if shift:
+            notes = shift[7] or "Нет заметок"
+            lines += [
+                f"Активация: {shift[0] or 'Нет'}",
+                f"Окончание: {shift[1] or 'Нет'}",
+                f"Длительность: {format_minutes_hhmm(shift[2] or 0)}",
+                f"Недоработка: {format_minutes_hhmm(shift[3] or 0)}",
+                f"Переработка: {format_minutes_hhmm(shift[4] or 0)}",
+                f"Оплата дня: {format_cents(shift[5] or 0)} руб",
+                f"Оплата ОТ: {format_cents(shift[6] or 0)} руб",
+                f"Заметки: {notes[:50]}..." if len(notes) > 50 else f"Заметки: {notes}"
+            ]
+        closed_min, used_min, extra_cents = ledger
+        if closed_min:
+            lines.append(f"Закрыто переработкой: {format_minutes_hhmm(closed_min)}")
+        if used_min:
+            lines.append(f"Использовано для закрытия: {format_minutes_hhmm(used_min)}")
+        if extra_cents:
+            lines.append(f"Доп.оплата: {format_cents(extra_cents)} руб")
+        return lines
+
+    def year_view(self, year:int, overview, metric:str="worked"):
+        """12 строк YearMonthRow тепловой карты года по метрике worked/undertime/overtime.
+
+        overview - результат fetch_year_overview; уровень дня 0-4 по HEAT_THRESHOLDS.
+        """
+        day_minutes, months = overview
+        thresholds = HEAT_THRESHOLDS[metric]
+        column = {"undertime": 1, "overtime": 2}.get(metric)
+        rows = []
+        for month in range(1, 13):
+            first = date(year, month, 1).toordinal()
+            days = []; total = 0
+            for n in range(first, first + calendar.monthrange(year, month)[1]):
+                minutes = day_minutes.get(n)
+                if not minutes:
+                    value = 0
+                elif column is None:
+                    value = self.net_minutes(minutes[0] or 0)
+                else:
+                    value = minutes[column] or 0
+                days.append((date.fromordinal(n), value, bisect_right(thresholds, value)))
+                total += value
+            rows.append(YearMonthRow(month, days, total, (months.get(month) or (0,))[0]))
+        return rows
+
+    # --- зарплата и текущий день ---
+
+    def period_info(self, year:int, month:int):
+        return fetch_period_info(self.shifts.conn, year, month, self.today.isoformat())
+
+    def today_status(self, today_shift, now:datetime) -> TodayStatus:
+        """Ожидаемый конец смены и заработок за сегодня."""
+        if not today_shift or not today_shift[0]:
+            return TodayStatus(None, 0, False)
+        try:
+            act_time = datetime.strptime(today_shift[0], "%H:%M")
+        except ValueError:
+            return TodayStatus(None, 0, False)
+        expected = (act_time + timedelta(minutes=self.required_minutes)).strftime("%H:%M")
+        if today_shift[1]:
+            return TodayStatus(expected, (today_shift[5] or 0) + (today_shift[6] or 0), False)
+        # смена идёт: сколько было бы начислено, если закончить сейчас
+        worked = calculate_duration(today_shift[0], now.strftime("%H:%M"))
+        return TodayStatus(expected, sum(self.price_day(self.today, worked)[2:]), True)
+
+    def next_wakeup(self, today_shift, now:datetime) -> datetime:
+        """Ближайший момент, когда вид может измениться сам по себе."""
+        candidates = [datetime.combine(self.today + timedelta(days=1), datetime.min.time())]  # полночь
+        if today_shift and today_shift[0] and not today_shift[1]:
+            # смена идёт: заработок растёт поминутно, плюс момент ожидаемого конца
+            candidates.append(now.replace(second=0, microsecond=0) + timedelta(minutes=1))
+            try:
+                act_time = datetime.strptime(today_shift[0], "%H:%M").time()
+                expected = datetime.combine(self.today, act_time) + timedelta(minutes=self.required_minutes)
+                if expected > now: candidates.append(expected)
+            except ValueError:
+                pass
+        # не дольше часа: таймер Tk не знает о сне системы и переводе часов
+        return min(min(candidates), now + timedelta(hours=1))
@@ -0,0 +1,115 @@
+"""Пакетный расчёт оплаты за период.
+
+Столбцы одинаковой длины (даты, длительности, признаки выходного, ставки в
+копейках) обрабатываются за один проход без Decimal. Правила те же, что у
+функций calculations.*_int: на будни первые 120 минут переработки по 1.5,
+остальное по 2.0; выходной день оплачивается по 2.0, от смены длиннее 240
+минут отнимается обед. Оплата минут считается той же функцией
+calculations.calc_overtime_pay_minutes_int, поэтому совпадает со скалярным
+путём до копейки.
+"""
+from collections import namedtuple
+from datetime import date
+
+from . import calculations, database
+
+PayColumns = namedtuple("PayColumns", "undertime overtime day_pay overtime_pay")
+RepriceResult = namedtuple("RepriceResult", "scanned changed delta_cents")
+
+def weekend_flags(days, holidays_set) -> list:
+    """Признак выходного или праздника для каждой даты."""
+    return [d.weekday() >= 5 or d in holidays_set for d in days]
+
+def month_rate_cents(days, rates) -> list:
+    """Ставка в копейках для каждой даты; RateTable спрашивается один раз на месяц."""
+    by_month = {}; out = []
+    for d in days:
+        key = (d.year, d.month)
+        rate = by_month.get(key)
+        if rate is None:
+            rate = by_month[key] = rates.hourly_rate_cents(d.year, d.month)
+        out.append(rate)
+    return out
+
+def price_shifts(durations, weekend, rate_cents, required_minutes:int, lunch_min:int) -> PayColumns:
+    """Недоработка, переработка, оплата дня и оплата переработки для каждой смены.
+
+    durations - минуты (None считается нулём), weekend - признаки выходного,
+    rate_cents - ставка каждой смены в копейках.
+    """
+    n = len(durations)
+    if not (len(weekend) == len(rate_cents) == n):
+        raise ValueError("столбцы разной длины")
+    undertime = [0] * n; overtime = [0] * n; day_pay = [0] * n; ot_pay = [0] * n
+    pay = calculations.calc_overtime_pay_minutes_int
+    for i in range(n):
+        minutes = durations[i] or 0; rate = rate_cents[i]
+        if weekend[i]:
+            if minutes > 240: minutes -= lunch_min
+            if minutes > 0: day_pay[i] = pay(minutes, rate, True)
+            continue
+        day_pay[i] = rate * 8
+        if minutes < required_minutes:
+            undertime[i] = required_minutes - minutes
+            continue
+        over = minutes - required_minutes
+        if over <= 0: continue
+        overtime[i] = over
+        ot_pay[i] = pay(over, rate)
+    return PayColumns(undertime, overtime, day_pay, ot_pay)
+
+def price_days(days, durations, rates, holidays_set, required_minutes:int, lunch_min:int) -> PayColumns:
+    """price_shifts для дат: признаки выходного и ставки берутся из праздников и RateTable."""
+    return price_shifts(durations, weekend_flags(days, holidays_set), month_rate_cents(days, rates),
+                        required_minutes, lunch_min)
+
+def reprice_shifts(conn, since_iso:str, rates, holidays_set, required_minutes:int, lunch_min:int,
+                   chunk_size:int=1000, progress=None) -> RepriceResult:
+    """Пересчитывает сохранённые смены начиная с since_iso по текущим окладу и обеду.
+
+    Смены читаются порциями по day_num, считаются price_days и записываются
+    executemany одной транзакцией; незавершённые смены (без длительности) не
+    трогаются. Учёт из ledger сохраняется: закрытые минуты вычитаются из новой
+    недоработки, использованные - из новой переработки, доп.оплата добавляется
+    к оплате ОТ. Переработка, которая не была оплачена (ушла на закрытие
+    недоработок или ждёт распределения), остаётся неоплаченной.
+    progress(сделано, всего) вызывается после каждой порции.
+    """
+    cur = conn.cursor()
+    start = database.day_key(since_iso)
+    cur.execute("SELECT COUNT(*) FROM shifts WHERE day_num >= ? AND duration_min IS NOT NULL", (start,))
+    total = cur.fetchone()[0]
+    ledger = database.ledger_totals_between(conn, since_iso, "9999-12-31")
+    scanned = changed = delta = 0; last = start - 1
+    if progress: progress(0, total)
+    with conn:
+        while True:
+            cur.execute("""
+                SELECT day_num, day, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents
+                FROM shifts WHERE day_num > ? AND duration_min IS NOT NULL ORDER BY day_num LIMIT ?
+            """, (last, chunk_size))
+            rows = cur.fetchall()
+            if not rows: break
+            last = rows[-1][0]
+            days = [date.fromordinal(r[0]) for r in rows]
+            priced = price_days(days, [r[2] for r in rows], rates, holidays_set, required_minutes, lunch_min)
+            updates = []
+            for i, (_, day_iso, _, old_under, old_over, old_pay, old_ot_pay) in enumerate(rows):
+                closed, used, extra = ledger.get(day_iso, (0, 0, 0))
+                under = max(0, priced.undertime[i] - closed)
+                over = max(0, priced.overtime[i] - used)
+                old_ot_pay = old_ot_pay or 0
+                unpaid = used > 0 or ((old_over or 0) > 0 and old_ot_pay - extra <= 0)
+                ot_pay = extra + (0 if unpaid else priced.overtime_pay[i])
+                new = (under, over, priced.day_pay[i], ot_pay)
+                if new != (old_under or 0, old_over or 0, old_pay or 0, old_ot_pay):
+                    updates.append(new + (day_iso,))
+                    delta += priced.day_pay[i] + ot_pay - (old_pay or 0) - old_ot_pay
+            if updates:
+                conn.executemany("""
+                    UPDATE shifts SET undertime_min=?, overtime_min=?, day_pay_cents=?, overtime_pay_cents=?
+                    WHERE day=?
+                """, updates)
+            scanned += len(rows); changed += len(updates)
+            if progress: progress(scanned, total)
+    return RepriceResult(scanned, changed, delta)
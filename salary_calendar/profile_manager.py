@@ -1,10 +1,10 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
 import os
-import json
 from decimal import Decimal
 import sqlite3
 from .database import init_db
+from .replica import LocalReplica
+from . import settings
+from .registry import LockTimeout, PinStore, ProfileRegistry, move_no_replace
 
 def parse_hhmm_to_min(s):
     if not s: return 0
@@ -20,28 +20,87 @@ class ProfileManager:
     profiles_dir = r"\\mdc\Public\Калмыков Владимир Алексеевич\Calendar"
     pin_dir = os.path.join(profiles_dir, "Pin")
     pin_file = os.path.join(pin_dir, "pins.json")
+    index_file = os.path.join(pin_dir, "profiles_index.json")  # не в каталоге профилей: запись не меняет его mtime
+    # Локальные копии профилей: работа идёт с диска, на шару изменения уходят в фоне
+    replica_mode = True
+    cache_dir = os.path.join(os.path.expanduser("~"), ".salary_calendar", "cache")
+    replica_sync_interval = 60.0
 
     def __init__(self):
         if not os.path.exists(self.profiles_dir):
             os.makedirs(self.profiles_dir)
         if not os.path.exists(self.pin_dir):
             os.makedirs(self.pin_dir)
+        self.registry = ProfileRegistry(self.profiles_dir, self.index_file)
+        self.pin_store = PinStore(self.pin_file)
         self.pins = self.load_pins()
 
     def load_pins(self):
-        if os.path.exists(self.pin_file):
-            with open(self.pin_file, 'r') as f:
-                return json.load(f)
-        return {}
+        return self.pin_store.load()
 
     def save_pins(self):
-        with open(self.pin_file, 'w') as f:
-            json.dump(self.pins, f)
+        # только свои изменения поверх актуального файла, под блокировкой;
+        # LockTimeout/OSError - у вызывающего, несохранённое уйдёт со следующим save_pins
+        self.pins = self.pin_store.save(self.pins)
+
+    def refresh_pins(self):
+        """Пин-коды других клиентов. Свои несохранённые изменения (save_pins упал) сначала
+        дописываются; если запись снова не удалась, они остаются в памяти, файл не перечитывается."""
+        if any(self.pin_store.changes(self.pins)):
+            try:
+                self.save_pins()
+            except (LockTimeout, OSError):
+                pass
+            return
+        self.pins = self.load_pins()
 
     def get_profiles(self):
-        return [f.replace('.db', '') for f in os.listdir(self.profiles_dir) if f.endswith('.db')]
+        """Список для показа; он может отставать на revalidate_s, наличие имени проверяет profile_exists."""
+        return self.registry.names()
+
+    def profile_path(self, name):
+        return os.path.join(self.profiles_dir, f"{name}.db")
+
+    def profile_exists(self, name):
+        return os.path.exists(self.profile_path(name))
+
+    def rename_profile(self, old, new):
+        """Переименовывает закрытый файл профиля; FileExistsError, если имя уже занято."""
+        move_no_replace(self.profile_path(old), self.profile_path(new))
+        self.registry.invalidate()
+
+    def open_replica(self, name):
+        """Локальная копия профиля или None, если replica_mode выключен."""
+        if not self.replica_mode:
+            return None
+        replica = LocalReplica(self.profile_path(name), self.cache_dir)
+        replica.open()
+        replica.start_background(self.replica_sync_interval)
+        return replica
+
+    # Окна импортируют Tk сами: без них модуль нужен пакетным задачам на машинах без дисплея
+    def choose_profile_window(self, master):
+        """Стартовый выбор: создать профиль или войти в существующий; имя профиля или None."""
+        import tkinter as tk
+        from tkinter import ttk
+        profile = None
+        dlg = tk.Toplevel(master)
+        dlg.title("Календарь")
+        dlg.resizable(False, False)
+        def select():
+            nonlocal profile
+            profile = self.select_profile_window(dlg)
+            if profile:
+                dlg.destroy()
+        ttk.Button(dlg, text="Создать профиль", command=lambda: self.create_profile_window(dlg)).pack(padx=10, pady=5)
+        ttk.Button(dlg, text="Выбрать существующий", command=select).pack(padx=10, pady=5)
+        dlg.grab_set()
+        master.wait_window(dlg)
+        return profile
 
     def create_profile_window(self, master):
+        import tkinter as tk
+        from tkinter import ttk, messagebox
         dlg = tk.Toplevel(master)
         dlg.title("Создать профиль")
         dlg.resizable(False, False)
@@ -60,7 +119,7 @@ class ProfileManager:
             if not name:
                 messagebox.showerror("Ошибка", "Введите имя")
                 return
-            if name in self.get_profiles():
+            if self.profile_exists(name):
                 messagebox.showerror("Ошибка", "Профиль существует")
                 return
             try:
@@ -82,15 +141,29 @@ class ProfileManager:
             if not pin.isdigit():
                 messagebox.showerror("Ошибка", "Пин должен быть цифрами")
                 return
-            db_path = os.path.join(self.profiles_dir, f"{name}.db")
+            db_path = self.profile_path(name)
+            try:
+                # O_EXCL: из двух клиентов, создающих одно имя, файл получит только один
+                os.close(os.open(db_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                messagebox.showerror("Ошибка", "Профиль существует")
+                return
             conn = sqlite3.connect(db_path)
             init_db(conn)
-            self.save_setting(conn, 'salary', str(salary))
-            self.save_setting(conn, 'lunch_min', str(lunch_min))
-            self.save_default_colors(conn)
+            settings.save_settings(conn, dict(settings.color_settings(self.default_colors()),
+                                              salary=str(salary), lunch_min=str(lunch_min)))
             conn.close()
+            self.registry.invalidate()
             self.pins[name] = pin
-            self.save_pins()
+            try:
+                self.save_pins()
+            except (LockTimeout, OSError) as e:
+                # без пин-кода в профиль не войти: файл убираем, профиль можно создать заново
+                self.pins.pop(name, None)
+                os.remove(db_path)
+                self.registry.invalidate()
+                messagebox.showerror("Ошибка", f"Не удалось сохранить пин-код, профиль не создан:\n{e}")
+                return
             messagebox.showinfo("Успех", "Профиль создан")
             dlg.destroy()
         ttk.Button(dlg, text="Создать", command=on_create).grid(row=5, column=0, columnspan=2, pady=5)
@@ -98,6 +171,8 @@ class ProfileManager:
         master.wait_window(dlg)
 
     def select_profile_window(self, master):
+        import tkinter as tk
+        from tkinter import ttk, messagebox
         profiles = self.get_profiles()
         if not profiles:
             messagebox.showinfo("Нет профилей", "Создайте профиль сначала")
@@ -114,6 +189,7 @@ class ProfileManager:
             nonlocal selected
             name = cmb.get()
             pin = ent_pin.get()
+            self.refresh_pins()  # пин мог смениться на другом компьютере; файл читается, только если менялся
             if name in self.pins and self.pins[name] == pin:
                 selected = name
                 dlg.destroy()
@@ -124,10 +200,15 @@ class ProfileManager:
         master.wait_window(dlg)
         return selected
 
-    def save_setting(self, conn, key, value):
-        cur = conn.cursor()
-        cur.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
-        conn.commit()
+    def save_setting(self, conn, key, value, commit=True):
+        settings.save_settings(conn, {key: value}, commit)
+
+    def save_settings(self, conn, values, commit=True):
+        settings.save_settings(conn, values, commit)
+
+    def settings_store(self, conn, writer=None):
+        """Кэш настроек профиля: одна выборка при открытии, дальше чтение из памяти."""
+        return settings.SettingsStore(conn, writer)
 
     def load_setting(self, conn, key, default=None):
         cur = conn.cursor()
@@ -151,14 +232,7 @@ class ProfileManager:
         }
 
     def save_default_colors(self, conn):
-        colors = self.default_colors()
-        for k, v in colors.items():
-            self.save_setting(conn, f"color_{k}", v)
+        settings.save_settings(conn, settings.color_settings(self.default_colors()))
 
     def load_colors(self, conn):
-        colors = self.default_colors()
-        for k in colors:
-            v = self.load_setting(conn, f"color_{k}")
-            if v:
-                colors[k] = v
-        return colors
\ No newline at end of file
+        return settings.colors_from(settings.load_settings(conn), self.default_colors())
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""Реестр профилей и пин-коды на общей шаре.
+
+Список профилей (имя, путь, размер, время изменения) держится в памяти и в
+индексном файле рядом с pins.json. Проверка свежести - один stat каталога
+профилей: пока его mtime не менялся, каталог не перечитывается. Индекс и
+пин-коды пишутся через временный файл и os.replace под файлом-блокировкой,
+поэтому несколько клиентов могут работать с ними одновременно.
+"""
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+ProfileEntry = namedtuple("ProfileEntry", "name path size mtime")
+
+class LockTimeout(Exception):
+    """Файл-блокировка занят другим клиентом дольше timeout."""
+
+
+@contextmanager
+def file_lock(path, timeout=10.0, stale=30.0, poll=0.05):
+    """Блокировка через создание path + '.lock' (O_EXCL работает и на SMB-шаре).
+
+    Блокировка старше stale секунд считается брошенной упавшим клиентом и снимается
+    (см. _break_stale).
+    """
+    lock_path = path + ".lock"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if _break_stale(lock_path, stale):
+                continue
+            if time.monotonic() > deadline:
+                raise LockTimeout(lock_path)
+            time.sleep(poll)
+    mine = None
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        mine = os.fstat(fd)
+        os.close(fd)
+        yield
+    finally:
+        # снимаем только свою: если её забрали как брошенную, под этим именем уже чужая
+        try:
+            if mine is None or _same_file(os.stat(lock_path), mine): os.remove(lock_path)
+        except OSError: pass
+
+def _break_stale(lock_path, stale):
+    """Снимает брошенную блокировку; True - можно сразу пробовать создать её снова.
+
+    Возраст считается по часам файлового сервера (_share_time), а не по
+    локальным: у клиента с убежавшими вперёд часами все блокировки выглядели
+    бы брошенными. Блокировка не удаляется, а переименовывается под
+    уникальное имя: rename атомарен, и из нескольких ждущих клиентов её
+    забирает только один. Удаляется только тот файл, который был признан
+    брошенным; чужая свежая блокировка возвращается на место, а если место
+    уже занято - остаётся под новым именем (её владелец снимет свою
+    блокировку только по совпадению файла, см. file_lock).
+    """
+    try:
+        st = os.stat(lock_path)
+    except OSError:
+        return True  # блокировку только что сняли
+    if time.time() - st.st_mtime <= stale:
+        return False  # отстающие часы клиента только продлят ожидание
+    if _share_time(os.path.dirname(lock_path)) - st.st_mtime <= stale:
+        return False
+    taken = f"{lock_path}.{os.getpid()}.{threading.get_ident()}.stale"
+    try:
+        os.rename(lock_path, taken)
+    except OSError:
+        return True  # её забрал другой клиент
+    try:
+        now = os.stat(taken)
+    except OSError:
+        return True
+    if _same_file(now, st):
+        try: os.remove(taken)
+        except OSError: pass
+        return True
+    try:
+        move_no_replace(taken, lock_path)
+    except OSError:
+        return False  # на месте уже другая блокировка; забранную не трогаем
+    return True
+
+def _same_file(a, b):
+    return (a.st_ino, a.st_mtime_ns) == (b.st_ino, b.st_mtime_ns)
+
+def _share_time(dir_path):
+    """Текущее время по часам сервера: mtime только что записанного в dir_path файла."""
+    probe = os.path.join(dir_path, f".clock.{os.getpid()}.{threading.get_ident()}")
+    try:
+        with open(probe, "w") as f:
+            f.write("0")
+        return os.stat(probe).st_mtime
+    except OSError:
+        return time.time()
+    finally:
+        try: os.remove(probe)
+        except OSError: pass
+
+def move_no_replace(src, dst):
+    """Переименование без перезаписи: FileExistsError, если dst уже есть (os.rename на POSIX перезаписывает)."""
+    if os.name == "nt":
+        os.rename(src, dst)
+    else:
+        os.link(src, dst)
+        os.remove(src)
+
+def read_json(path, default=None):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+def write_json_atomic(path, data):
+    """Запись во временный файл рядом и os.replace: читатели видят старый или новый файл целиком."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class ProfileRegistry:
+    """Кэш списка профилей с проверкой по mtime каталога.
+
+    entries() в пределах revalidate_s секунд отвечает из памяти без обращения
+    к шаре; дальше делает stat каталога. При изменившемся mtime сначала
+    пробует индексный файл (его мог обновить другой клиент), и только если
+    он тоже устарел - перечитывает каталог через os.scandir и сохраняет индекс.
+    Размер и время изменения - на момент последнего сканирования.
+    stats - счётчики для замеров.
+    """
+    def __init__(self, profiles_dir, index_path, revalidate_s=2.0):
+        self.profiles_dir = profiles_dir
+        self.index_path = index_path
+        self.revalidate_s = revalidate_s
+        self._entries = {}
+        self._dir_mtime = None
+        self._checked = None
+        self.stats = {"scans": 0, "index_loads": 0, "stats": 0, "hits": 0}
+
+    def entries(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.revalidate_s:
+            self.stats["hits"] += 1
+            return list(self._entries.values())
+        self._checked = now
+        self.stats["stats"] += 1
+        dir_mtime = os.stat(self.profiles_dir).st_mtime_ns
+        if dir_mtime != self._dir_mtime and not self._load_index(dir_mtime):
+            self._scan(dir_mtime)
+        return list(self._entries.values())
+
+    def names(self):
+        return sorted(e.name for e in self.entries())
+
+    def invalidate(self):
+        """После создания или переименования профиля этим клиентом."""
+        self._checked = None; self._dir_mtime = None
+
+    def _load_index(self, dir_mtime):
+        try:
+            index = read_json(self.index_path)
+        except (OSError, ValueError):
+            return False
+        if not index or index.get("dir_mtime_ns") != dir_mtime: return False
+        self._set(dir_mtime, [ProfileEntry(name, os.path.join(self.profiles_dir, f"{name}.db"), size, mtime)
+                              for name, size, mtime in index["profiles"]])
+        self.stats["index_loads"] += 1
+        return True
+
+    def _scan(self, dir_mtime):
+        entries = []
+        with os.scandir(self.profiles_dir) as it:
+            for e in it:
+                if not e.name.endswith(".db") or not e.is_file(): continue
+                st = e.stat()  # на Windows берётся из ответа на листинг, без отдельного запроса
+                entries.append(ProfileEntry(e.name[:-len(".db")], e.path, st.st_size, st.st_mtime))
+        self._set(dir_mtime, entries)
+        self.stats["scans"] += 1
+        try:
+            with file_lock(self.index_path, timeout=1.0):
+                write_json_atomic(self.index_path, {"dir_mtime_ns": dir_mtime,
+                                                    "profiles": [[e.name, e.size, e.mtime] for e in entries]})
+        except (OSError, LockTimeout):
+            pass  # индекс - только ускорение; его перепишет следующий клиент
+
+    def _set(self, dir_mtime, entries):
+        self._entries = {e.name: e for e in entries}
+        self._dir_mtime = dir_mtime
+
+class PinStore:
+    """Пин-коды профилей из pins.json с перечитыванием по mtime файла.
+
+    save(pins) пишет под блокировкой только то, что этот клиент поменял с
+    последнего чтения, поверх актуального файла: изменения других клиентов
+    не затираются.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+        self._loaded = {}
+
+    def load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._mtime = None; self._loaded = {}
+            return {}
+        if mtime != self._mtime:
+            self._loaded = read_json(self.path, {})
+            self._mtime = mtime
+        return dict(self._loaded)
+
+    def changes(self, pins):
+        """(изменённые, удалённые) в pins относительно последнего прочитанного или записанного файла."""
+        return {k: v for k, v in pins.items() if self._loaded.get(k) != v}, [k for k in self._loaded if k not in pins]
+
+    def save(self, pins):
+        changed, removed = self.changes(pins)
+        with file_lock(self.path):
+            self._mtime = None
+            current = self.load()
+            current.update(changed)
+            for k in removed: current.pop(k, None)
+            write_json_atomic(self.path, current)
+            self._loaded = current
+            self._mtime = os.stat(self.path).st_mtime_ns
+        return dict(current)
@@ -0,0 +1,167 @@
+class GridRenderer:
+    """Применяет модель месяца к сетке виджетов, трогая только изменившиеся.
+
+    Хранит последнее применённое состояние каждой клетки, метки недели и
+    видимость строк. apply() сравнивает с новой моделью и вызывает config()
+    только с изменившимися опциями. stats - счётчики обновлений виджетов.
+    """
+    def __init__(self, cell_widgets, week_widgets, header_widgets=()):
+        self.cell_widgets = cell_widgets  # (row, col) -> виджет дня
+        self.week_widgets = week_widgets  # row -> метка недели
+        self.header_widgets = list(header_widgets)  # заголовки дней недели и столбца недель
+        self.cells = {}
+        self.weeks = {}
+        self.visible_rows = {r: True for r in week_widgets}
+        self.stats = {"redraws": 0, "updates": 0, "last_updates": 0, "last_rows": 0}
+
+    def apply(self, cells, weeks, num_rows):
+        """cells: {(row, col): {опция: значение}}, weeks: {row: {опция: значение}}."""
+        updates = 0; row_changes = 0
+        for r, visible in self.visible_rows.items():
+            want = r <= num_rows
+            if want == visible: continue
+            widgets = [self.week_widgets[r]] + [w for (row, _), w in self.cell_widgets.items() if row == r]
+            for w in widgets:
+                w.grid() if want else w.grid_remove()
+            self.visible_rows[r] = want; row_changes += 1
+        for key, state in cells.items():
+            updates += self._diff(self.cell_widgets[key], self.cells, key, state)
+        for key, state in weeks.items():
+            updates += self._diff(self.week_widgets[key], self.weeks, key, state)
+        self.stats["redraws"] += 1
+        self.stats["updates"] += updates
+        self.stats["last_updates"] = updates
+        self.stats["last_rows"] = row_changes
+        return updates
+
+    def invalidate(self):
+        """Забыть применённое состояние: следующий apply() перенастроит всё."""
+        self.cells.clear(); self.weeks.clear()
+
+    def set_header_bg(self, color):
+        for w in self.header_widgets: w.config(bg=color)
+
+    def set_background(self, color):
+        pass  # кнопки и метки закрывают всю сетку, фон рамки не виден
+
+    @staticmethod
+    def _diff(widget, applied, key, state):
+        old = applied.get(key, {})
+        changed = {k: v for k, v in state.items() if old.get(k) != v}
+        if not changed: return 0
+        widget.config(**changed)
+        applied[key] = dict(old, **changed)
+        return 1
+
+class CanvasGridRenderer:
+    """Сетка месяца на одном tk.Canvas: каждая клетка - прямоугольник и текст.
+
+    Интерфейс как у GridRenderer: apply(cells, weeks, num_rows), invalidate(),
+    stats. Из опций клеток учитываются text, bg, fg и state (у недоступной
+    клетки серый текст), relief не нужен. Элементы создаются один раз и
+    меняются itemconfigure только по изменившимся опциям; строки скрываются
+    и растягиваются перерасчётом координат. cell_at() - клетка дня под точкой
+    холста, по нему интерфейс обрабатывает щелчки и подсказки.
+    """
+    HEADERS = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс", "Неделя")
+    WEEK_COLUMN = 8
+    DISABLED_FG = "#a3a3a3"
+
+    def __init__(self, canvas, header_bg, font=("Segoe UI", 10), header_font=("Segoe UI", 10, "bold"),
+                 header_height=28, outline="#d9d9d9"):
+        self.canvas = canvas
+        self.header_height = header_height
+        self.items = {}  # (row, col) -> (прямоугольник, текст); строка 0 - заголовки, столбец 8 - недели
+        for c, title in enumerate(self.HEADERS, start=1):
+            self.items[(0, c)] = self._create(header_bg, title, header_font, outline)
+        for r in range(1, 7):
+            for c in range(1, self.WEEK_COLUMN + 1):
+                self.items[(r, c)] = self._create(header_bg, "", font, outline)
+        self.cells = {}
+        self.weeks = {}
+        self.num_rows = 6
+        self.hidden_rows = set()  # строки, элементы которых сейчас в state="hidden"
+        self.size = (1, 1)
+        self.stats = {"redraws": 0, "updates": 0, "last_updates": 0, "last_rows": 0, "items": 2 * len(self.items)}
+
+    def _create(self, bg, text, font, outline):
+        return (self.canvas.create_rectangle(0, 0, 1, 1, fill=bg, outline=outline),
+                self.canvas.create_text(0, 0, text=text, font=font, fill="black"))
+
+    def resize(self, width, height):
+        """Вызывается из <Configure> холста."""
+        if (width, height) == self.size: return
+        self.size = (width, height)
+        self._layout()
+
+    def apply(self, cells, weeks, num_rows):
+        """cells: {(row, col): {опция: значение}}, weeks: {row: {опция: значение}}."""
+        updates = 0; row_changes = abs(num_rows - self.num_rows)
+        if row_changes:
+            self.num_rows = num_rows
+            self._layout()
+        for key, state in cells.items():
+            updates += self._diff(key, self.cells, key, state)
+        for r, state in weeks.items():
+            updates += self._diff((r, self.WEEK_COLUMN), self.weeks, r, state)
+        self.stats["redraws"] += 1
+        self.stats["updates"] += updates
+        self.stats["last_updates"] = updates
+        self.stats["last_rows"] = row_changes
+        return updates
+
+    def invalidate(self):
+        """Забыть применённое состояние: следующий apply() перенастроит всё."""
+        self.cells.clear(); self.weeks.clear()
+
+    def set_header_bg(self, color):
+        for c in range(1, self.WEEK_COLUMN + 1):
+            self.canvas.itemconfigure(self.items[(0, c)][0], fill=color)
+
+    def set_background(self, color):
+        """Фон холста - виден в промежутках между клетками."""
+        self.canvas.configure(bg=color)
+
+    def cell_at(self, x, y):
+        """(row, col) клетки дня под точкой холста или None (заголовки, недели, скрытые строки)."""
+        width, height = self.size
+        body = height - self.header_height
+        if body <= 0 or not (0 <= x < width and self.header_height <= y < height): return None
+        c = int(x * self.WEEK_COLUMN // width) + 1
+        r = int((y - self.header_height) * self.num_rows // body) + 1
+        if c >= self.WEEK_COLUMN or r > self.num_rows: return None
+        return r, c
+
+    def _diff(self, item_key, applied, key, state):
+        old = applied.get(key, {})
+        changed = {k: v for k, v in state.items() if old.get(k) != v}
+        if not changed: return 0
+        new = applied[key] = dict(old, **changed)
+        rect, text = self.items[item_key]
+        if "bg" in changed:
+            self.canvas.itemconfigure(rect, fill=changed["bg"])
+        options = {}
+        if "text" in changed:
+            options["text"] = changed["text"]
+        if "fg" in changed or "state" in changed:
+            options["fill"] = self.DISABLED_FG if new.get("state") == "disabled" else new.get("fg", "black")
+        if options:
+            self.canvas.itemconfigure(text, **options)
+        return 1
+
+    def _layout(self):
+        width, height = self.size
+        col_w = width / self.WEEK_COLUMN
+        row_h = max(0, height - self.header_height) / max(1, self.num_rows)
+        for (r, c), (rect, text) in self.items.items():
+            hide = r > self.num_rows
+            if hide != (r in self.hidden_rows):  # state меняется только у строк, которые появились или пропали
+                state = "hidden" if hide else "normal"
+                self.canvas.itemconfigure(rect, state=state); self.canvas.itemconfigure(text, state=state)
+            if hide: continue
+            x0, x1 = round((c - 1) * col_w), round(c * col_w) - 1
+            y0, y1 = ((0, self.header_height - 1) if r == 0 else
+                      (self.header_height + round((r - 1) * row_h), self.header_height + round(r * row_h) - 1))
+            self.canvas.coords(rect, x0, y0, x1, y1)
+            self.canvas.coords(text, (x0 + x1) / 2, (y0 + y1) / 2)
+        self.hidden_rows = set(range(self.num_rows + 1, 7))
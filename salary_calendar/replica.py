@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+class ReplicaConflict(Exception):
+    """База на шаре изменилась с момента последней синхронизации."""
+
+
+def _file_state(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+_HEADER = 100  # заголовок файла SQLite: в копии backup API у него другой счётчик изменений
+
+def _checksum(path):
+    """SHA-1 базы без заголовка: у копии через backup API та же сумма, что у источника."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        f.seek(_HEADER)
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _backup(src_path, dst_path, pages):
+    # Копирование через backup API по pages страниц за шаг: блокировка снимается между шагами
+    src = sqlite3.connect(src_path, timeout=30)
+    dst = sqlite3.connect(dst_path, timeout=30)
+    try:
+        src.backup(dst, pages=pages, sleep=0.005)
+    finally:
+        dst.close(); src.close()
+
+def _temp_path(dir_path):
+    fd, path = tempfile.mkstemp(suffix=".tmp", dir=dir_path)
+    os.close(fd)
+    return path
+
+def _remove(path):
+    try: os.remove(path)
+    except OSError: pass
+
+def _snapshot(src_path, dir_path, pages):
+    """Согласованная копия базы во временный файл в dir_path: (путь, контрольная сумма копии)."""
+    path = _temp_path(dir_path)
+    try:
+        _backup(src_path, path, pages)
+        return path, _checksum(path)
+    except BaseException:
+        _remove(path); raise
+
+
+class LocalReplica:
+    """Локальная копия базы профиля с синхронизацией обратно на шару.
+
+    open() копирует базу с шары в cache_dir, приложение работает с local_path.
+    sync() отправляет изменения обратно, если локальная копия менялась; если
+    файл на шаре изменился после последней синхронизации (mtime/размер, затем
+    контрольная сумма), поднимается ReplicaConflict.
+
+    Копирование в обе стороны идёт через снимок во временном файле: суммы в
+    meta - это суммы ровно того, что было отправлено или получено, а записи,
+    сделанные в локальную базу во время sync(), уйдут следующей синхронизацией.
+    """
+    def __init__(self, share_path, cache_dir, pages=256):
+        self.share_path = share_path
+        self.cache_dir = cache_dir
+        self.local_path = os.path.join(cache_dir, os.path.basename(share_path))
+        self.meta_path = self.local_path + ".sync.json"
+        self.pages = pages
+        self.meta = {}
+        self.conflict = False
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def open(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._lock:
+            if self._has_unsynced_local():
+                # прошлая сессия не успела отправить изменения: не затираем их, отправим при sync()
+                self.meta = self._read_meta()
+            elif os.path.exists(self.share_path):
+                self._pull()
+            else:
+                sqlite3.connect(self.local_path).close()
+                self.meta = {}
+        return self.local_path
+
+    def is_dirty(self):
+        return self.meta.get("local_sum") != _checksum(self.local_path)
+
+    def share_changed(self):
+        if not os.path.exists(self.share_path):
+            return bool(self.meta.get("share_sum"))
+        mtime, size = _file_state(self.share_path)
+        if (mtime, size) == (self.meta.get("share_mtime"), self.meta.get("share_size")):
+            return False
+        return _checksum(self.share_path) != self.meta.get("share_sum")
+
+    def sync(self, force=False):
+        """Отправляет локальные изменения на шару. Возвращает True, если что-то записано."""
+        with self._lock:
+            if not self.is_dirty():
+                return False
+            snapshot, local_sum = _snapshot(self.local_path, self.cache_dir, self.pages)
+            try:
+                if local_sum == self.meta.get("local_sum"):
+                    return False  # файл читался посреди записи, содержимое то же
+                self._check_share(force)
+                tmp = _temp_path(os.path.dirname(self.share_path) or ".")
+                try:
+                    shutil.copyfile(snapshot, tmp)
+                    state = _file_state(tmp)  # os.replace сохраняет mtime и размер
+                    self._check_share(force)  # шару могли изменить, пока шло копирование
+                    os.replace(tmp, self.share_path)
+                except BaseException:
+                    _remove(tmp); raise
+            finally:
+                _remove(snapshot)
+            self._remember_sync(state, local_sum)
+            self.conflict = False
+            return True
+
+    def reload(self):
+        """Отбрасывает локальные изменения и заново копирует базу с шары."""
+        with self._lock:
+            self._pull()
+            self.conflict = False
+
+    def keep_conflict_copy(self):
+        path = f"{self.local_path[:-3]}.conflict-{time.strftime('%Y%m%d-%H%M%S')}.db"
+        with self._lock:
+            shutil.copy2(self.local_path, path)
+        return path
+
+    def start_background(self, interval=60.0):
+        if self._thread is not None: return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name="replica-sync", daemon=True)
+        self._thread.start()
+
+    def stop_background(self):
+        if self._thread is None: return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _loop(self, interval):
+        while not self._stop.wait(interval):
+            if self.conflict: continue  # решает пользователь при выходе
+            try:
+                self.sync()
+                self.last_error = None
+            except ReplicaConflict:
+                pass
+            except Exception as e:
+                self.last_error = e
+
+    def _check_share(self, force):
+        if not force and self.share_changed():
+            self.conflict = True
+            raise ReplicaConflict(self.share_path)
+
+    def _pull(self):
+        # mtime/размер шары до снимка: запись другого клиента во время копирования даст проверку по сумме
+        state = _file_state(self.share_path)
+        snapshot, share_sum = _snapshot(self.share_path, self.cache_dir, self.pages)
+        try:
+            os.replace(snapshot, self.local_path)
+        except BaseException:
+            _remove(snapshot); raise
+        self._remember_sync(state, share_sum)
+
+    def _has_unsynced_local(self):
+        if not os.path.exists(self.local_path) or not os.path.exists(self.meta_path):
+            return False
+        return self._read_meta().get("local_sum") != _checksum(self.local_path)
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _remember_sync(self, share_state, checksum):
+        """После sync/open/reload локальная копия и шара совпадают с одним снимком."""
+        mtime, size = share_state
+        self.meta = {"share_mtime": mtime, "share_size": size, "share_sum": checksum, "local_sum": checksum}
+        with open(self.meta_path, "w") as f:
+            json.dump(self.meta, f)
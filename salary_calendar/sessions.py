@@ -0,0 +1,104 @@
+"""Открытые профили для переключения в одном окне.
+
+ProfileSession - всё, что CalendarApp берёт из базы профиля: соединение,
+фоновые писатель и пул запросов, кэш настроек, модель с кэшем смен и суммы
+нижней панели. Виджетов в сессии нет, окно только подключает к себе
+активную. SessionPool держит несколько недавних профилей открытыми, и
+возврат к ним не требует ни нового соединения, ни чтения настроек.
+"""
+import sqlite3
+from collections import OrderedDict
+from decimal import Decimal
+
+from . import database
+from .background import QueryExecutor, WriteBehindWriter
+from .model import CalendarModel
+from .settings import color_settings
+from .shift_cache import ShiftCache
+
+def pay_settings(settings):
+    """(оклад, обед в минутах) из кэша настроек профиля."""
+    return Decimal(settings.get('salary', '90610.5')), int(settings.get('lunch_min', '60'))
+
+class ProfileSession:
+    """Открытый профиль. on_commit/on_error - обработчики окна, пока сессия активна."""
+    def __init__(self, manager, name, master):
+        self.name = name
+        self.on_commit = None; self.on_error = None
+        self.conn = self.writer = self.queries = None
+        self.replica = manager.open_replica(name)
+        try:
+            self._open(manager, master)
+        except BaseException:
+            # недооткрытая сессия не попадает в пул: закрываем уже запущенное здесь же
+            self.close()
+            if self.replica: self.replica.stop_background()  # изменения копии уйдут при следующем открытии
+            raise
+
+    def _open(self, manager, master):
+        self.db_path = self.replica.local_path if self.replica else manager.profile_path(self.name)
+        self.conn = sqlite3.connect(self.db_path)
+        is_new = self.conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' LIMIT 1").fetchone() is None
+        database.init_db(self.conn)  # для старых профилей создаёт журнал и переносит в него заметки
+        self.writer = WriteBehindWriter(master, self.db_path, on_commit=self._committed, on_error=self._failed)
+        self.settings = manager.settings_store(self.conn, self.writer)  # вся таблица settings одним запросом
+        if is_new:
+            self.settings.update(color_settings(manager.default_colors()))
+        self.queries = QueryExecutor(master, self.db_path)
+        self.model = CalendarModel(ShiftCache(self.conn, self.writer), *pay_settings(self.settings))
+        self.info_cache = OrderedDict()  # (год, месяц) -> суммы нижней панели
+        self.view = None  # (год, месяц), на котором профиль оставили
+
+    def park(self):
+        """Уход в фон: очередь записи дописана (её итог ещё получает окно), запросы сняты."""
+        self.writer.flush()
+        self.queries.cancel()
+        self.on_commit = None; self.on_error = None
+
+    def close(self):
+        """Закрывает базу; локальную копию синхронизирует вызывающий."""
+        self.on_commit = None; self.on_error = None
+        if self.writer: self.writer.close()
+        if self.queries: self.queries.close()
+        if self.conn: self.conn.close()
+
+    def _committed(self):
+        if self.on_commit: self.on_commit()
+
+    def _failed(self, errors):
+        if self.on_error: self.on_error(errors)
+
+class SessionPool:
+    """Недавно открытые профили, не больше maxsize (LRU).
+
+    get() возвращает открытую сессию или открывает её через open_session(имя);
+    вытесненные закрываются через close_session(сессия). stats - счётчики.
+    """
+    def __init__(self, open_session, close_session, maxsize=3):
+        self.open_session = open_session
+        self.close_session = close_session
+        self.maxsize = maxsize
+        self.sessions = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, name):
+        session = self.sessions.get(name)
+        if session is None:
+            session = self.sessions[name] = self.open_session(name)
+            self.stats["misses"] += 1
+        else:
+            self.stats["hits"] += 1
+        self.sessions.move_to_end(name)
+        while len(self.sessions) > self.maxsize:
+            _, old = self.sessions.popitem(last=False)
+            self.close_session(old)
+            self.stats["evictions"] += 1
+        return session
+
+    def close(self, name):
+        session = self.sessions.pop(name, None)
+        if session is not None: self.close_session(session)
+
+    def close_all(self):
+        while self.sessions:
+            self.close(next(iter(self.sessions)))
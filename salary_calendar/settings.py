@@ -0,0 +1,95 @@
+"""Настройки профиля (таблица settings) в памяти.
+
+Таблица читается целиком одним запросом; изменения пишутся одним
+executemany в одной транзакции, а подписчики получают изменившиеся ключи
+без повторного чтения с диска.
+"""
+COLOR_PREFIX = "color_"
+
+def load_settings(conn) -> dict:
+    cur = conn.cursor()
+    cur.execute("SELECT key, value FROM settings")
+    return dict(cur.fetchall())
+
+def save_settings(conn, values, commit=True):
+    """Записывает {ключ: значение}; с commit=False подходит для WriteBehindWriter."""
+    conn.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", list(values.items()))
+    if commit: conn.commit()
+
+def color_settings(colors) -> dict:
+    """{ключ цвета: значение} -> ключи таблицы settings."""
+    return {f"{COLOR_PREFIX}{k}": v for k, v in colors.items()}
+
+def colors_from(values, defaults) -> dict:
+    """Цвета профиля: сохранённые значения поверх defaults, неизвестные ключи не берутся."""
+    return {k: values.get(COLOR_PREFIX + k) or v for k, v in defaults.items()}
+
+class SettingsStore:
+    """Кэш настроек одного соединения профиля.
+
+    get() отвечает из памяти. update() сравнивает с кэшем, пишет только
+    изменившиеся ключи (через writer, если он есть, иначе сразу с commit) и
+    вызывает подписчиков с {ключ: новое значение}. Если фоновая запись не
+    удалась, её ключи возвращаются к значениям из базы и подписчики получают откат.
+    stats - счётчики для замеров.
+    """
+    def __init__(self, conn, writer=None):
+        self.conn = conn
+        self.writer = writer
+        self.values = load_settings(conn)
+        self.listeners = []
+        self.stats = {"loads": 1, "writes": 0}
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def colors(self, defaults) -> dict:
+        return colors_from(self.values, defaults)
+
+    def update(self, values) -> dict:
+        changed = {k: v for k, v in values.items() if self.values.get(k) != v}
+        if not changed: return changed
+        if self.writer is not None:
+            self.writer.submit(save_settings, changed, on_error=lambda _: self._write_failed(changed))
+        else:
+            try:
+                save_settings(self.conn, changed)
+            except Exception:
+                self.conn.rollback(); raise
+        self.values.update(changed)
+        self.stats["writes"] += 1
+        self._notify(changed)
+        return changed
+
+    def reload(self) -> dict:
+        """Перечитать таблицу (файл менялся в обход кэша); подписчики получают разницу."""
+        fresh = load_settings(self.conn)
+        changed = {k: v for k, v in fresh.items() if self.values.get(k) != v}
+        self.values = fresh
+        self.stats["loads"] += 1
+        if changed: self._notify(changed)
+        return changed
+
+    def _write_failed(self, changed):
+        # откатываются только ключи, которые с тех пор не переписал более поздний update();
+        # более ранние записи очереди к этому моменту уже в базе
+        stale = [k for k, v in changed.items() if self.values.get(k) == v]
+        if not stale: return
+        fresh = load_settings(self.conn)
+        for k in stale:
+            if k in fresh: self.values[k] = fresh[k]
+            else: self.values.pop(k, None)
+        self.stats["loads"] += 1
+        restored = {k: fresh[k] for k in stale if k in fresh}
+        if restored: self._notify(restored)
+
+    def subscribe(self, fn):
+        self.listeners.append(fn)
+        return fn
+
+    def unsubscribe(self, fn):
+        if fn in self.listeners: self.listeners.remove(fn)
+
+    def _notify(self, changed):
+        for fn in list(self.listeners):
+            fn(changed)
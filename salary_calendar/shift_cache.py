@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from datetime import date, timedelta
+from . import database
+
+def _days(start:date, end:date):
+    for i in range((end - start).days + 1):
+        yield start + timedelta(days=i)
+
+class ShiftCache:
+    """Смены нескольких недавно показанных месяцев, каждый загружен одним запросом.
+
+    Ключ - datetime.date, значение - кортеж в порядке database.load_shift.
+    Рядом хранятся итоги журнала (ledger) по тем же дням. Загруженные
+    диапазоны (видимые недели месяца) держатся в LRU на maxsize штук;
+    соседние диапазоны пересекаются, поэтому дни хранятся общим словарём,
+    а при вытеснении удаляются только дни, не покрытые другими диапазонами.
+    Дни вне загруженных диапазонов читаются из базы напрямую.
+    Если задан writer (WriteBehindWriter), записи уходят в фоновый поток, а
+    до подтверждения кэш держит их значения поверх прочитанных из базы.
+    """
+    def __init__(self, conn, writer=None, maxsize=12):
+        self.conn = conn
+        self.writer = writer
+        self.maxsize = maxsize
+        self.ranges = OrderedDict()  # (start, end) -> None, от давно использованных к недавним
+        self.cover = {}  # date -> сколько загруженных диапазонов его покрывают
+        self.shifts = {}
+        self.ledger = {}
+        self.unsaved = {}  # date -> [число записей в очереди, последняя строка или None]
+        self.seq = 0  # номер последней записи через кэш
+        self.written = {}  # date -> seq записи; старее ответы запросов её не затирают
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def fetch(conn, start_iso, end_iso):
+        """Чтение диапазона; может выполняться в пуле QueryExecutor."""
+        return (database.load_shifts_between(conn, start_iso, end_iso),
+                database.ledger_totals_between(conn, start_iso, end_iso))
+
+    def load(self, start:date, end:date):
+        self.fill(start, end, *self.fetch(self.conn, start.isoformat(), end.isoformat()))
+
+    def fill(self, start:date, end:date, rows, totals, seq=None):
+        """Кладёт прочитанный диапазон. seq - значение self.seq в момент запроса:
+        дни, записанные после него, сохраняют значение из кэша."""
+        rows = {date.fromisoformat(day): row for day, row in rows.items()}
+        totals = {date.fromisoformat(day): row for day, row in totals.items()}
+        key = (start, end)
+        if key in self.ranges:
+            self.ranges.move_to_end(key)
+        else:
+            self.ranges[key] = None
+            for d in _days(start, end): self.cover[d] = self.cover.get(d, 0) + 1
+        for d in _days(start, end):
+            if seq is not None and self.written.get(d, -1) > seq: continue
+            self._put(d, rows.get(d))
+            if d in totals: self.ledger[d] = totals[d]
+            else: self.ledger.pop(d, None)
+        for d, (_, row) in self.unsaved.items():
+            if start <= d <= end: self._put(d, row)
+        while len(self.ranges) > self.maxsize:
+            self._evict(*self.ranges.popitem(last=False)[0])
+
+    def holds(self, start:date, end:date, touch=True) -> bool:
+        """Загружен ли диапазон; при touch отмечает его как недавно использованный."""
+        key = (start, end)
+        if not touch: return key in self.ranges
+        if key in self.ranges:
+            self.ranges.move_to_end(key); self.stats["hits"] += 1
+            return True
+        self.stats["misses"] += 1
+        return False
+
+    def clear(self):
+        """Забыть все загруженные диапазоны (после массовых изменений в базе)."""
+        self.ranges.clear(); self.cover.clear()
+        self.shifts.clear(); self.ledger.clear(); self.written.clear()
+
+    def _evict(self, start, end):
+        self.stats["evictions"] += 1
+        for d in _days(start, end):
+            left = self.cover.get(d, 0) - 1
+            if left > 0:
+                self.cover[d] = left; continue
+            self.cover.pop(d, None); self.shifts.pop(d, None); self.ledger.pop(d, None)
+
+    def peek(self, d:date):
+        """(известно ли значение без запроса, строка смены)."""
+        if d in self.unsaved:
+            return True, self.unsaved[d][1]
+        if self.covers(d):
+            return True, self.shifts.get(d)
+        return False, None
+
+    def ledger_for(self, d:date):
+        """(закрыто минут, использовано минут, доп.оплата в копейках)."""
+        if self.covers(d):
+            return self.ledger.get(d, (0, 0, 0))
+        return database.ledger_totals_between(self.conn, d.isoformat(), d.isoformat()).get(d.isoformat(), (0, 0, 0))
+
+    def covers(self, d:date) -> bool:
+        return d in self.cover
+
+    def get(self, d:date):
+        if d in self.unsaved:
+            return self.unsaved[d][1]
+        if self.covers(d):
+            return self.shifts.get(d)
+        return database.load_shift(self.conn, d.isoformat())
+
+    def refresh(self, d:date):
+        if self.covers(d):
+            row = database.load_shift(self.conn, d.isoformat())
+            self._put(d, row)
+            totals = database.ledger_totals_between(self.conn, d.isoformat(), d.isoformat())
+            if totals: self.ledger[d] = totals[d.isoformat()]
+            else: self.ledger.pop(d, None)
+
+    def forget(self, d:date):
+        self.shifts.pop(d, None)
+
+    def save(self, d:date, activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes):
+        row = (activation, end, duration_min, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents, notes)
+        self._write(d, row, database.save_shift, d.isoformat(), *row)
+
+    def delete(self, d:date):
+        self._write(d, None, database.delete_shift, d.isoformat())
+
+    def flush(self):
+        if self.writer: self.writer.flush()
+
+    def prune_written(self, seq):
+        """Забывает номера записей не новее seq - самого раннего ещё не полученного запроса:
+        ответы запросов, начатых после записи, её значение и так не затирают."""
+        self.written = {d: s for d, s in self.written.items() if s > seq}
+
+    def _put(self, d, row):
+        if row: self.shifts[d] = row
+        else: self.shifts.pop(d, None)
+
+    def _write(self, d, row, fn, *args):
+        # значение кладётся и вне загруженных диапазонов: его найдёт fill запроса, начатого до записи
+        self.seq += 1; self.written[d] = self.seq
+        self._put(d, row)
+        if not self.writer:
+            fn(self.conn, *args)
+            return
+        entry = self.unsaved.setdefault(d, [0, None])
+        entry[0] += 1; entry[1] = row
+        self.writer.submit(fn, *args, on_done=lambda _: self._written(d), on_error=lambda _: self.discard_unsaved(d))
+
+    def _written(self, d):
+        entry = self.unsaved.get(d)
+        if entry:
+            entry[0] -= 1
+            if entry[0] <= 0: del self.unsaved[d]
+
+    def discard_unsaved(self, d:date):
+        """Запись дня d не удалась: её значение забывается, правда - в базе.
+
+        Если за днём в очереди есть более поздние записи, их значение остаётся.
+        """
+        entry = self.unsaved.get(d)
+        if entry is None: return
+        entry[0] -= 1
+        if entry[0] <= 0:
+            del self.unsaved[d]
+            self.refresh(d)
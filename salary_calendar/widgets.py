@@ -1,37 +1,281 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, colorchooser
 from datetime import datetime, timedelta
+import calendar
 
-class Tooltip(tk.Toplevel):
-    def __init__(self, parent, lines, edit_callback):
-        super().__init__(parent)
-        self.wm_overrideredirect(True)
-        self.attributes("-topmost", True)
-        frm = ttk.Frame(self, relief="solid", borderwidth=1)
+from .constants import format_cents, format_minutes_hhmm
+
+class HoverTooltip:
+    """Одна подсказка на всё окно: Toplevel создаётся один раз и переиспользуется.
+
+    hover() запоминает, над чем мышь, и через delay_ms вызывает provider(),
+    который возвращает строки подсказки (или None). Пока мышь быстро
+    пересекает сетку, provider не вызывается и окно не трогается.
+    leave() прячет подсказку через hide_ms, чтобы до кнопки «Редактировать»
+    можно было дотянуться мышью. stats - счётчики для замеров.
+    """
+    def __init__(self, master, delay_ms=350, hide_ms=250):
+        self.master = master
+        self.delay_ms = delay_ms
+        self.hide_ms = hide_ms
+        self.window = None
+        self.key = None  # над чем сейчас мышь
+        self.shown = None  # что показано в окне
+        self.action = None
+        self._show_id = None; self._hide_id = None
+        self.stats = {"windows": 0, "shows": 0, "provided": 0, "hovers": 0}
+
+    def hover(self, key, provider, x, y, action=None, background=None):
+        self.stats["hovers"] += 1
+        self._cancel_hide()
+        if key == self.shown and key is not None: return
+        self._cancel_show()
+        self.key = key
+        self._show_id = self.master.after(self.delay_ms, lambda: self._show(key, provider, x, y, action, background))
+
+    def leave(self):
+        self._cancel_show()
+        self.key = None
+        if self.shown is not None and self._hide_id is None:
+            self._hide_id = self.master.after(self.hide_ms, self.hide)
+
+    def hide(self):
+        self._cancel_show(); self._cancel_hide()
+        self.key = None
+        if self.shown is not None:
+            self.shown = None
+            self._withdraw()
+
+    def _show(self, key, provider, x, y, action, background):
+        self._show_id = None
+        if key != self.key: return
+        self.stats["provided"] += 1
+        lines = provider()
+        if not lines:
+            self.hide(); return
+        if self.window is None:
+            self._build(); self.stats["windows"] += 1
+        self.action = action
+        self._update(lines, action is not None, background)
+        self._place(x, y)
+        self.shown = key; self.stats["shows"] += 1
+
+    def _cancel_show(self):
+        if self._show_id is not None:
+            self.master.after_cancel(self._show_id); self._show_id = None
+
+    def _cancel_hide(self):
+        if self._hide_id is not None:
+            self.master.after_cancel(self._hide_id); self._hide_id = None
+
+    def _on_action(self):
+        action = self.action
+        self.hide()
+        if action: action()
+
+    # --- окно ---
+
+    def _build(self):
+        self.window = tk.Toplevel(self.master)
+        self.window.wm_overrideredirect(True)
+        self.window.attributes("-topmost", True)
+        self.window.withdraw()
+        frm = tk.Frame(self.window, relief="solid", borderwidth=1)
         frm.pack(fill="both", expand=True)
-        for ln in lines:
-            ttk.Label(frm, text=ln).pack(anchor="w", padx=6, pady=0)
-        ttk.Button(frm, text="Редактировать", command=edit_callback).pack(padx=6, pady=6)
-    def show_at(self, x, y):
+        self.label = tk.Label(frm, justify="left", anchor="w")
+        self.label.pack(fill="x", padx=6, pady=(2, 0))
+        self.default_bg = self.label.cget("background")
+        self.button = ttk.Button(frm, text="Редактировать", command=self._on_action)
+        # мышь над подсказкой не даёт ей спрятаться
+        self.window.bind("<Enter>", lambda e: self._cancel_hide())
+        self.window.bind("<Leave>", lambda e: self.leave())
+
+    def _update(self, lines, with_button, background):
+        self.label.config(text="\n".join(lines), background=background or self.default_bg)
+        if with_button: self.button.pack(padx=6, pady=6)
+        else: self.button.pack_forget()
+
+    def _place(self, x, y):
         try:
-            sw = self.winfo_screenwidth(); sh = self.winfo_screenheight()
-            w = 320; h = 200
+            self.window.update_idletasks()
+            w = self.window.winfo_reqwidth(); h = self.window.winfo_reqheight()
+            sw = self.window.winfo_screenwidth(); sh = self.window.winfo_screenheight()
             if x + w > sw: x = max(0, sw - w - 10)
             if y + h > sh: y = max(0, sh - h - 10)
         except Exception:
             pass
-        self.wm_geometry(f"+{x}+{y}")
-    def close(self):
-        try: self.destroy()
-        except: pass
+        self.window.wm_geometry(f"+{x}+{y}")
+        self.window.deiconify(); self.window.lift()
+
+    def _withdraw(self):
+        self.window.withdraw()
+
+class YearOverviewWindow(tk.Toplevel):
+    """Обзор года: тепловая карта 12 месяцев по дням и итоги месяцев на одном холсте.
+
+    Окно строится один раз; show() только перекрашивает клетки и меняет
+    тексты. Данные готовит вызывающий (CalendarModel.year_view): on_year(год)
+    просит загрузить год, on_metric() - перестроить вид по выбранной метрике,
+    on_month(год, месяц) - открыть месяц в календаре. Закрытие прячет окно.
+    """
+    METRICS = (("worked", "Отработано"), ("undertime", "Недоработка"), ("overtime", "Переработка"))
+    HEAT_COLORS = {"worked": ("#d8f0dc", "#a8dcb2", "#6cc07f", "#2e8b47"),
+                   "undertime": ("#fde0dc", "#f9a89c", "#f0614f", "#b52a1c"),
+                   "overtime": ("#fff3c4", "#ffe082", "#ffc107", "#c79100")}
+    CELL = 22; GAP = 2; LEFT = 90; TOP = 22; ROW = 26
+
+    def __init__(self, parent, empty_color, on_year, on_metric, on_month):
+        super().__init__(parent)
+        self.title("Обзор года")
+        self.resizable(False, False)
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+        self.empty_color = empty_color
+        self.on_year = on_year; self.on_month = on_month
+        self.year = None
+        self.metric = tk.StringVar(value="worked")
+        top = ttk.Frame(self, padding=(8, 6)); top.pack(fill="x")
+        ttk.Button(top, text="◀", width=3, command=lambda: self.on_year(self.year - 1)).pack(side="left")
+        self.lbl_year = ttk.Label(top, text="", font=("Segoe UI", 12, "bold"), width=6, anchor="center")
+        self.lbl_year.pack(side="left", padx=8)
+        ttk.Button(top, text="▶", width=3, command=lambda: self.on_year(self.year + 1)).pack(side="left")
+        for value, text in reversed(self.METRICS):
+            ttk.Radiobutton(top, text=text, value=value, variable=self.metric, command=on_metric).pack(side="right", padx=4)
+        step = self.CELL + self.GAP
+        days_right = self.LEFT + 31 * step
+        width = days_right + 220
+        self.canvas = tk.Canvas(self, width=width, height=self.TOP + 12 * self.ROW + 8, highlightthickness=0, bg="white")
+        self.canvas.pack(padx=8, pady=(0, 8))
+        font = ("Segoe UI", 9)
+        for day in range(1, 32):
+            self.canvas.create_text(self.LEFT + (day - 1) * step + self.CELL / 2, self.TOP / 2, text=str(day), font=font)
+        self.canvas.create_text(days_right + 60, self.TOP / 2, text="Итого", font=font)
+        self.canvas.create_text(days_right + 160, self.TOP / 2, text="Начислено", font=font)
+        self.cells = {}  # (месяц, день) -> прямоугольник
+        self.totals = {}; self.salaries = {}
+        for month in range(1, 13):
+            y = self.TOP + (month - 1) * self.ROW
+            self.canvas.create_text(self.LEFT - 8, y + self.CELL / 2, text=calendar.month_name[month], anchor="e", font=font)
+            for day in range(1, 32):
+                x = self.LEFT + (day - 1) * step
+                self.cells[(month, day)] = self.canvas.create_rectangle(
+                    x, y, x + self.CELL, y + self.CELL, fill=empty_color, outline="", tags=(f"m{month}",))
+                self.canvas.tag_bind(self.cells[(month, day)], "<Button-1>", lambda e, m=month: self._on_click(m))
+            self.totals[month] = self.canvas.create_text(days_right + 60, y + self.CELL / 2, text="", font=font)
+            self.salaries[month] = self.canvas.create_text(days_right + 200, y + self.CELL / 2, text="", anchor="e", font=font)
+        self.withdraw()
+
+    def show(self, year, rows, empty_color=None):
+        """rows - 12 строк CalendarModel.year_view для выбранной метрики;
+        empty_color - цвет дней без данных из текущих цветов профиля."""
+        self.year = year
+        if empty_color: self.empty_color = empty_color
+        self.lbl_year.config(text=str(year))
+        colors = self.HEAT_COLORS[self.metric.get()]
+        for row in rows:
+            for day in range(1, 32):
+                if day > len(row.days):
+                    self.canvas.itemconfigure(self.cells[(row.month, day)], state="hidden"); continue
+                level = row.days[day - 1][2]
+                self.canvas.itemconfigure(self.cells[(row.month, day)], state="normal",
+                                          fill=colors[level - 1] if level else self.empty_color)
+            self.canvas.itemconfigure(self.totals[row.month], text=format_minutes_hhmm(row.total_min) if row.total_min else "")
+            self.canvas.itemconfigure(self.salaries[row.month],
+                                      text=f"{format_cents(row.salary_cents)} руб" if row.salary_cents else "")
+
+    def set_loading(self, year):
+        self.year = year
+        self.lbl_year.config(text=f"{year}…")
+
+    def _on_click(self, month):
+        if self.year is not None: self.on_month(self.year, month)
+
+COLOR_NAMES = {
+    "gold": "Дни с переработкой, учтённой в зарплате",
+    "other_month": "Дни другого месяца",
+    "weekday_ok": "Обычный рабочий день",
+    "future_current_month": "Будущие дни текущего месяца",
+    "past_no_data": "Прошлый день без записи",
+    "today": "Сегодняшний день",
+    "weekend": "Выходной или праздник",
+    "undertime": "День с недоработкой",
+    "header_bg": "Фон заголовков и недели",
+    "weekly_overtime": "Неделя с переработкой",
+    "weekly_undertime": "Неделя с недоработкой",
+}
+
+def valid_color(value) -> bool:
+    return len(value) == 7 and value.startswith("#") and all(ch in "0123456789abcdefABCDEF" for ch in value[1:])
+
+class ColorSettingsDialog(tk.Toplevel):
+    """Настройки цветов. Окно строится один раз, open() только заполняет поля.
+
+    Каждая правка сразу уходит в on_preview(цвета) - календарь перекрашивается
+    без записи. «Сохранить» вызывает on_save(цвета), «Отмена» и закрытие
+    окна - on_cancel(). В цвета попадают только поля вида #rrggbb.
+    """
+    def __init__(self, parent, keys, on_preview, on_save, on_cancel):
+        super().__init__(parent)
+        self.title("Настройки Вида")
+        self.resizable(False, False)
+        self.protocol("WM_DELETE_WINDOW", self._on_cancel)
+        self.on_preview = on_preview; self.on_save = on_save; self.on_cancel = on_cancel
+        self.vars = {}; self.swatches = {}
+        self._filling = False
+        for row, k in enumerate(sorted(keys)):
+            # если добавится новый цвет - покажем английское имя
+            ttk.Label(self, text=COLOR_NAMES.get(k, k)).grid(row=row, column=0, sticky="w", padx=10, pady=8)
+            swatch = tk.Label(self, width=3, relief="ridge"); swatch.grid(row=row, column=1)
+            var = tk.StringVar(self)
+            var.trace_add("write", lambda *args: self._on_edit())
+            ttk.Entry(self, width=15, textvariable=var).grid(row=row, column=2, padx=10, pady=8)
+            ttk.Button(self, text="Выбрать цвет", command=lambda key=k: self._choose(key)).grid(row=row, column=3, padx=10, pady=8)
+            self.vars[k] = var; self.swatches[k] = swatch
+        btns = ttk.Frame(self); btns.grid(row=len(self.vars), column=0, columnspan=4, pady=5)
+        ttk.Button(btns, text="Сохранить", command=self._on_save).pack(side="left", padx=6)
+        ttk.Button(btns, text="Отмена", command=self._on_cancel).pack(side="left", padx=6)
+        self.withdraw()
+
+    def open(self, colors):
+        self._filling = True
+        for k, var in self.vars.items(): var.set(colors.get(k, ""))
+        self._filling = False
+        self._update_swatches(self.colors())
+        self.deiconify(); self.lift(); self.grab_set()
+
+    def colors(self):
+        """{ключ: цвет} для полей с корректным значением."""
+        values = {k: var.get().strip() for k, var in self.vars.items()}
+        return {k: v for k, v in values.items() if valid_color(v)}
+
+    def _on_edit(self):
+        if self._filling: return
+        colors = self.colors()
+        self._update_swatches(colors)
+        self.on_preview(colors)
+
+    def _update_swatches(self, colors):
+        for k, color in colors.items(): self.swatches[k].config(bg=color)
+
+    def _choose(self, key):
+        col = colorchooser.askcolor(color=self.colors().get(key), parent=self)[1]
+        if col: self.vars[key].set(col)
+
+    def _hide(self):
+        self.grab_release(); self.withdraw()
+
+    def _on_save(self):
+        colors = self.colors()
+        self._hide(); self.on_save(colors)
+
+    def _on_cancel(self):
+        self._hide(); self.on_cancel()
 
 class EditShiftDialog(tk.Toplevel):
-    def __init__(self, parent, day, existing, conn, lunch_min):
+    def __init__(self, parent, day, existing, lunch_min):
         super().__init__(parent)
         self.title(f"Редактирование {day.isoformat()}")
         self.resizable(False, False)
         self.result = None
-        self.conn = conn
         self.lunch_min = lunch_min
         frm = ttk.Frame(self, padding=10); frm.pack(fill="both", expand=True)
         ttk.Label(frm, text="Время активации (HH:MM):").grid(row=0, column=0, sticky="w")
@@ -66,9 +310,8 @@ class EditShiftDialog(tk.Toplevel):
         self._on_save()
 
     def _on_delete(self):
-        from . import database
+        # саму запись удаляет вызывающий код (через кэш смен и фоновую запись)
         if not messagebox.askyesno("Подтвердить", "Удалить запись?"): return
-        database.delete_shift(self.conn, self.day.isoformat())
         self.result = {"deleted": True}; self.destroy()
 
     def _on_save(self):
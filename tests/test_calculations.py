@@ -0,0 +1,51 @@
+"""Сверка целочисленного расчёта оплаты (копейки) с исходным на Decimal.
+
+    python -m unittest tests.test_calculations
+"""
+import unittest
+from decimal import Decimal
+
+from salary_calendar import calculations
+from salary_calendar.constants import cents_to_money, format_cents
+
+# Округление зависит от остатков ставки и минут по модулю 120 (знаменатель дроби минут),
+# поэтому перебираются все остатки ставки на нескольких порядках, все остатки минут
+# дважды и дальше до конца суток с шагом 7.
+RATES = [base + r for base in (0, 120 * 50, 120 * 450, 120 * 1700, 120 * 3100) for r in range(120)]
+MINUTES = [*range(-5, 241), *range(241, 24 * 60 + 1, 7)]
+LUNCHES = (0, 30, 60)
+
+def real_rates():
+    """Ставки в копейках, которые реально получаются из оклада."""
+    rates = set()
+    for salary in range(20000, 300001, 2500):
+        for y, m in ((2025, 1), (2025, 2), (2025, 3), (2025, 5), (2025, 12)):
+            rate = calculations.hourly_rate_for_month(y, m, set(), Decimal(salary) + Decimal("0.5"))
+            rates.add(calculations.rate_to_cents(rate))
+    return sorted(rates)
+
+class IntegerPayTest(unittest.TestCase):
+    def check(self, rates, minutes):
+        for rate_c in rates:
+            rate = Decimal(rate_c) / 100
+            self.assertEqual(calculations.day_base_pay_int(rate_c), calculations.day_base_pay(rate), rate_c)
+            for m in minutes:
+                for weekend in (False, True):
+                    self.assertEqual(calculations.calc_overtime_pay_minutes_int(m, rate_c, weekend),
+                                     calculations.calc_overtime_pay_minutes(m, rate, weekend), (rate_c, m, weekend))
+                for lunch in LUNCHES:
+                    self.assertEqual(calculations.weekend_pay_for_duration_int(m, rate_c, lunch),
+                                     calculations.weekend_pay_for_duration(m, rate, lunch), (rate_c, m, lunch))
+
+    def test_all_rate_residues(self):
+        self.check(RATES, MINUTES)
+
+    def test_rates_from_real_salaries(self):
+        self.check(real_rates(), range(0, 16 * 60 + 1, 7))
+
+    def test_format_cents(self):
+        for c in range(-1000, 100001):
+            self.assertEqual(format_cents(c), f"{cents_to_money(c):.2f}", c)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""Схема профиля: итоги pay_periods из триггеров и миграция базы исходной схемы.
+
+    python -m unittest tests.test_database
+"""
+import random
+import sqlite3
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+from salary_calendar import database, events
+
+def periods(conn):
+    """pay_periods без строк, обнулившихся после удаления смен (пересборка их не создаёт)."""
+    return conn.execute("SELECT * FROM pay_periods WHERE day_pay_cents OR overtime_pay_cents OR pending_ot_min"
+                        " OR undertime_min OR shifts ORDER BY year, month, half").fetchall()
+
+class PayPeriodsTest(unittest.TestCase):
+    def test_triggers_match_rebuild(self):
+        rnd = random.Random(17)
+        conn = sqlite3.connect(":memory:")
+        database.init_db(conn)
+        days = [(date(2024, 1, 1) + timedelta(days=i)).isoformat() for i in range(120)]
+        for step in range(1500):
+            day = rnd.choice(days); op = rnd.random()
+            if op < 0.45:
+                over = rnd.choice([0, 0, 30, 150])
+                database.save_shift(conn, day, "09:00", "18:00", rnd.randint(0, 700), rnd.choice([0, 0, 20, 90]), over,
+                                    rnd.randint(0, 500000), rnd.choice([0, 0, 2500]) if over else 0, "", commit=False)
+            elif op < 0.6:
+                database.delete_shift(conn, day, commit=False)
+            elif op < 0.7:
+                events.add_overtime_pay(conn, day, rnd.randint(1, 5000))
+            elif op < 0.8:
+                # INSERT без day_num: номер дня заполняет триггер
+                conn.execute("INSERT OR IGNORE INTO shifts(day, undertime_min, overtime_min, day_pay_cents, overtime_pay_cents)"
+                             " VALUES(?, ?, ?, ?, 0)", (day, rnd.randint(0, 60), rnd.randint(0, 60), rnd.randint(0, 9000)))
+            elif op < 0.9:
+                conn.execute("UPDATE shifts SET undertime_min = ?, overtime_pay_cents = ? WHERE day = ?",
+                             (rnd.randint(0, 120), rnd.choice([0, 700]), day))
+            else:
+                # перенос смены на другой день меняет полумесяц
+                target = rnd.choice(days)
+                if not conn.execute("SELECT 1 FROM shifts WHERE day = ?", (target,)).fetchone():
+                    conn.execute("UPDATE shifts SET day = ?, day_num = ? WHERE day = ?", (target, database.day_key(target), day))
+            if step % 100 == 99:
+                conn.commit()
+                kept = periods(conn)
+                database.rebuild_pay_periods(conn)
+                self.assertEqual(kept, periods(conn), step)
+        for day, day_num in conn.execute("SELECT day, day_num FROM shifts"):
+            self.assertEqual(day_num, database.day_key(day), day)
+
+# схема и служебные заметки профиля до миграций (без schema_version, ledger и day_num)
+BASELINE_SCHEMA = """
+CREATE TABLE shifts (day TEXT PRIMARY KEY, activation TEXT, end TEXT, duration_min INTEGER, undertime_min INTEGER,
+                     overtime_min INTEGER, day_pay_cents INTEGER, overtime_pay_cents INTEGER, notes TEXT);
+CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT);
+"""
+BASELINE_SHIFTS = [
+    ("2024-03-04", "08:00", "18:30", 630, 0, 60, 412400, 0, "Использовано для закрытия: 2024-03-05:30min\nУшёл позже"),
+    ("2024-03-05", "08:00", "16:30", 510, 0, 0, 412400, 0, "Обед с клиентом\nЗакрыто переработкой 30 мин (источник 2024-03-04)"),
+    ("2024-03-06", "08:00", "18:00", 600, 0, 60, 412400, 2550, "Добавлена доп.оплата: 25.50 руб"),
+    ("2024-03-20", "08:00", "17:00", 540, 0, 0, 412400, None, "обычная заметка"),
+]
+
+def baseline_db():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO shifts VALUES(?,?,?,?,?,?,?,?,?)", BASELINE_SHIFTS)
+    conn.execute("INSERT INTO settings VALUES('salary', '90000')")
+    conn.commit()
+    return conn
+
+class MigrateTest(unittest.TestCase):
+    def ledger(self, conn):
+        return conn.execute("SELECT source_day, target_day, minutes, cents FROM ledger ORDER BY id").fetchall()
+
+    def test_upgrade_from_baseline(self):
+        conn = baseline_db()
+        self.assertEqual(database.migrate(conn), [1, 2, 3, 4])
+        self.assertEqual(database.schema_version(conn), database.SCHEMA_VERSION)
+        self.assertEqual([v for v, in conn.execute("SELECT version FROM schema_version ORDER BY version")], [1, 2, 3, 4])
+        # служебные строки перенесены в журнал, заметки пользователя остались
+        self.assertEqual(sorted(self.ledger(conn), key=str),
+                         sorted([("2024-03-04", "2024-03-05", 30, 0), (None, "2024-03-06", 0, 2550)], key=str))
+        self.assertEqual(dict(conn.execute("SELECT day, notes FROM shifts")),
+                         {"2024-03-04": "Ушёл позже", "2024-03-05": "Обед с клиентом", "2024-03-06": "", "2024-03-20": "обычная заметка"})
+        for day, day_num, ot_pay in conn.execute("SELECT day, day_num, overtime_pay_cents FROM shifts"):
+            self.assertEqual(day_num, database.day_key(day))
+            self.assertIsNotNone(ot_pay)
+        self.assertEqual(conn.execute("SELECT value FROM settings WHERE key='salary'").fetchone(), ("90000",))
+        kept = periods(conn)
+        database.rebuild_pay_periods(conn)
+        self.assertEqual(kept, periods(conn))
+
+    def test_rerun_changes_nothing(self):
+        conn = baseline_db()
+        database.migrate(conn)
+        ledger = self.ledger(conn); shifts = conn.execute("SELECT * FROM shifts ORDER BY day").fetchall()
+        self.assertEqual(database.migrate(conn), [])
+        self.assertEqual(database.migrate_notes_to_ledger(conn), 0)
+        self.assertEqual(self.ledger(conn), ledger)
+        self.assertEqual(conn.execute("SELECT * FROM shifts ORDER BY day").fetchall(), shifts)
+
+    def test_failed_step_rolls_back_with_its_version(self):
+        conn = baseline_db()
+        with mock.patch.object(database, "add_ledger_entries", side_effect=sqlite3.OperationalError("disk I/O error")):
+            with self.assertRaises(sqlite3.OperationalError):
+                database.migrate(conn)
+        self.assertEqual(database.schema_version(conn), 1)
+        self.assertIsNone(conn.execute("SELECT 1 FROM sqlite_master WHERE name='ledger'").fetchone())
+        self.assertEqual([r[-1] for r in conn.execute("SELECT * FROM shifts ORDER BY day")], [r[-1] for r in BASELINE_SHIFTS])
+        self.assertEqual(database.migrate(conn), [2, 3, 4])
+        self.assertEqual(len(self.ledger(conn)), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Распределение переработок месяца за один проход против поштучного.
+
+    python -m unittest tests.test_events
+"""
+import calendar
+import random
+import sqlite3
+import unittest
+from datetime import date
+
+from salary_calendar import database, events
+
+def make_db(rows):
+    conn = sqlite3.connect(":memory:")
+    database.init_db(conn)
+    for day_iso, under, over, ot_pay in rows:
+        database.save_shift(conn, day_iso, "09:00", "18:00", 540, under, over, 0, ot_pay, "", commit=False)
+    conn.commit()
+    return conn
+
+def reference(conn, year, month):
+    """Прежний обработчик кнопки: distribute_overtime_minutes для каждого дня find_pending_overtimes."""
+    for day_iso, ot_min in database.find_pending_overtimes(conn, year, month):
+        if ot_min > 0:
+            half = 1 if day_iso <= f"{year}-{month:02d}-15" else 2
+            events.distribute_overtime_minutes(conn, year, month, half, day_iso, ot_min)
+
+def snapshot(conn):
+    shifts = conn.execute("SELECT day, undertime_min, overtime_min FROM shifts ORDER BY day").fetchall()
+    ledger = conn.execute("SELECT source_day, target_day, minutes FROM ledger ORDER BY id").fetchall()
+    return shifts, ledger
+
+def random_month(rnd, year, month):
+    rows = []
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        kind = rnd.random()
+        if kind < 0.3: continue
+        under = rnd.choice([0, 0, 5, 30, 90, 240]) if kind < 0.65 else 0
+        over = rnd.choice([0, 15, 45, 120, 300]) if kind >= 0.55 else 0
+        ot_pay = rnd.choice([0, 0, 0, 1500]) if over else 0
+        rows.append((date(year, month, day).isoformat(), under, over, ot_pay))
+    return rows
+
+class AllocateMonthOvertimeTest(unittest.TestCase):
+    def check(self, rows, year, month):
+        ref = make_db(rows); reference(ref, year, month)
+        conn = make_db(rows); plan = events.allocate_month_overtime(conn, year, month)
+        expected_shifts, expected_ledger = snapshot(ref)
+        shifts, ledger = snapshot(conn)
+        self.assertEqual(shifts, expected_shifts)
+        self.assertEqual(ledger, expected_ledger)
+        self.assertEqual([tuple(a) for a in plan.allocations], expected_ledger)
+        by_day = {d: (u, o) for d, u, o in shifts}
+        for target, under in plan.undertime.items(): self.assertEqual(by_day[target][0], under)
+        for source, over in plan.overtime.items(): self.assertEqual(by_day[source][1], over)
+
+    def test_table(self):
+        cases = [
+            [],  # пустой месяц
+            [("2024-03-04", 60, 0, 0), ("2024-03-05", 0, 90, 0)],  # источник после цели
+            [("2024-03-04", 0, 30, 0), ("2024-03-05", 20, 0, 0), ("2024-03-06", 40, 0, 0)],  # частичное закрытие
+            [("2024-03-14", 0, 120, 0), ("2024-03-18", 60, 0, 0)],  # разные половины месяца
+            [("2024-03-04", 0, 120, 1500), ("2024-03-05", 60, 0, 0)],  # оплаченная переработка не тратится
+            [("2024-03-04", 30, 60, 0), ("2024-03-05", 45, 0, 0)],  # день с обоими значениями
+        ]
+        for rows in cases:
+            with self.subTest(rows=rows):
+                self.check(rows, 2024, 3)
+
+    def test_random_months(self):
+        rnd = random.Random(2)
+        for _ in range(200):
+            year, month = rnd.choice([2023, 2024]), rnd.randint(1, 12)
+            rows = random_month(rnd, year, month)
+            with self.subTest(year=year, month=month, rows=rows):
+                self.check(rows, year, month)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+"""Пакетный расчёт payroll.price_days против поштучного, как в CalendarApp._price_day.
+
+    python -m unittest tests.test_payroll
+"""
+import random
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from salary_calendar import calculations, payroll
+
+def price_one(d, duration, rates, holidays, required, lunch):
+    rate_c = rates.hourly_rate_cents(d.year, d.month)
+    if d.weekday() >= 5 or d in holidays:
+        return 0, 0, calculations.weekend_pay_for_duration_int(duration, rate_c, lunch), 0
+    return (max(0, required - duration), max(0, duration - required), calculations.day_base_pay_int(rate_c),
+            calculations.calc_overtime_pay_minutes_int(max(0, duration - required), rate_c))
+
+class PriceDaysTest(unittest.TestCase):
+    def test_batch_matches_scalar(self):
+        rnd = random.Random(5)
+        days = [date(2016, 1, 1) + timedelta(days=i) for i in range((date(2026, 1, 1) - date(2016, 1, 1)).days)]
+        # длительности около границ: обед (240), норма, 120 минут переработки
+        durations = [rnd.choice([0, 200, 241, 480, 540, 545, 660, 725, 900]) + rnd.randint(0, 30) for _ in days]
+        holidays = {date(y, 1, m) for y in range(2016, 2026) for m in range(1, 9)}
+        for salary, required, lunch in ((Decimal("75000.00"), 540, 60), (Decimal("123456.78"), 480, 30)):
+            rates = calculations.RateTable(holidays, salary)
+            batch = payroll.price_days(days, durations, rates, holidays, required, lunch)
+            for i, d in enumerate(days):
+                got = (batch.undertime[i], batch.overtime[i], batch.day_pay[i], batch.overtime_pay[i])
+                self.assertEqual(got, price_one(d, durations[i], rates, holidays, required, lunch), (salary, d, durations[i]))
+
+    def test_missing_duration_and_column_lengths(self):
+        got = payroll.price_shifts([None, None], [False, True], [50000, 50000], 540, 60)
+        self.assertEqual(got, payroll.PayColumns([540, 0], [0, 0], [400000, 0], [0, 0]))
+        with self.assertRaises(ValueError):
+            payroll.price_shifts([1], [False, True], [1], 540, 60)
+
+if __name__ == "__main__":
+    unittest.main()